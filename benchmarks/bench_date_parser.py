@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: oil bar date parsing, regex fast path vs the strptime loop.
+
+Run from the project root:
+    python benchmarks/bench_date_parser.py [--bars 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.fetcher import _parse_date_string_to_iso, _parse_date_string_to_iso_slow  # noqa: E402
+
+
+def make_bar_dates(n):
+    start = date(2000, 1, 3)
+    return [(start + timedelta(days=i)).strftime("%a %b %d 00:00:00 %Y") for i in range(n)]
+
+
+def best_of(repeat, fn, values):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for v in values:
+            fn(v)
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bars", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    values = make_bar_dates(args.bars)
+    assert [_parse_date_string_to_iso(v, "oil") for v in values] == [_parse_date_string_to_iso_slow(v) for v in values]
+
+    slow = best_of(args.repeat, _parse_date_string_to_iso_slow, values)
+    fast = best_of(args.repeat, lambda v: _parse_date_string_to_iso(v, "oil"), values)
+
+    print(f"bars: {args.bars}")
+    print(f"strptime loop: {slow * 1000:8.2f} ms  ({slow / args.bars * 1e6:.2f} us/bar)")
+    print(f"fast path:     {fast * 1000:8.2f} ms  ({fast / args.bars * 1e6:.2f} us/bar)")
+    print(f"speedup:       {slow / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
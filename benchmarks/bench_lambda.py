@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: lambda_handler against local API and AWS stand-ins.
+
+Runs the handler repeatedly for each scenario and reports wall time and per-stage
+time (p50/p99) and peak traced allocations (tracemalloc, in a separate pass):
+  - single:   the daily run (one oil request, one exchange request, one put)
+  - backfill: a {"backfill": ...} event over --backfill-days
+  - multi:    --sources markets configured under "sources" in the SSM store
+
+The oil and exchange APIs are served by a local HTTP server (benchmarks/harness.py)
+with configurable latency, payload size and failure rate; DynamoDB, SSM, Secrets
+Manager and S3 are emulated in-process by moto. Environment variables the function
+reads (IDEMPOTENT_WRITES, ROLLING_AGGREGATES, OIL_STREAMING, ...) apply as usual.
+
+With --baseline, exits with status 1 if any scenario's p50 wall time or peak
+allocations grew by more than --tolerance compared to a previous --json report.
+
+Run from the project root:
+    python benchmarks/bench_lambda.py [--scenarios single,backfill,multi] [--iterations 20]
+        [--latency-ms 20] [--aws-latency-ms 5] [--failure-rate 0.05] [--bars 365]
+        [--json report.json] [--baseline report.json]
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import ROOT, FakeApis, StageTimer, local_aws, percentile, reset_warm_state  # noqa: E402
+
+from src import app, fetcher, sources  # noqa: E402
+
+SCENARIOS = ("single", "backfill", "multi")
+
+# (module, attribute, stage) wrapped by the stage timer; the secret is timed where
+# it is read, so a lookup made inside an exchange request counts in both stages
+_STAGES = (
+    (app, "get_store_urls", "ssm"),
+    (fetcher, "get_secret", "secret"),
+    (app, "fetch_oil_data", "oil"),
+    (app, "fetch_oil_series", "oil"),
+    (app, "fetch_exchange_data", "exchange"),
+    (app, "fetch_exchange_rates", "exchange"),
+    (app, "get_stored_day", "ddb_read"),
+    (app, "find_gaps", "ddb_read"),
+    (app, "save_to_dynamodb", "ddb_write"),
+    (app, "write_batch", "ddb_write"),
+    (app, "write_items", "ddb_write"),
+    (app, "_publish_snapshot", "snapshot"),
+)
+
+
+class BenchContext:
+    """
+    Minimal Lambda context: a fixed remaining time, so retries have a deadline.
+    """
+
+    def __init__(self, remaining_ms=60000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def build_scenario(name, args, base_url, fetch_date):
+    """
+    (store, event) for a scenario.
+    """
+    store = {"exchange_api": f"{base_url}/convert?from=USD&to=MAD"}
+    if args.rates_api:
+        store["exchange_rates_api"] = f"{base_url}/rates/{{date}}?base=USD"
+    if name == "multi":
+        store["sources"] = [{"name": f"m{i}", "url": f"{base_url}/oil/m{i}"} for i in range(args.sources)]
+        return store, {}
+    store["oil_api"] = f"{base_url}/oil"
+    if name == "backfill":
+        start = date.fromisoformat(fetch_date) - timedelta(days=args.backfill_days - 1)
+        return store, {"backfill": {"start_date": start.isoformat(), "end_date": fetch_date}}
+    return store, {}
+
+
+def run_scenario(name, args, apis, set_store, timer):
+    # The handler's metrics records (EMF lines on stdout) are still built, but not shown
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return _run_scenario(name, args, apis, set_store, timer)
+
+
+def _run_scenario(name, args, apis, set_store, timer):
+    store, event = build_scenario(name, args, apis.base_url, apis.end_date)
+    set_store(store)
+    reset_warm_state()
+    context = BenchContext()
+    # One untimed run creates connections and caches, as in a warm container
+    app.lambda_handler(event, context)
+    timer.take()
+
+    walls, stages, statuses = [], [], {}
+    for _ in range(args.iterations):
+        if args.cold:
+            reset_warm_state()
+        start = time.perf_counter()
+        result = app.lambda_handler(event, context)
+        walls.append(time.perf_counter() - start)
+        stages.append(timer.take())
+        statuses[result.get("status")] = statuses.get(result.get("status"), 0) + 1
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(args.alloc_iterations):
+            if args.cold:
+                reset_warm_state()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            app.lambda_handler(event, context)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+    finally:
+        tracemalloc.stop()
+        timer.take()
+
+    report = {
+        "runs": args.iterations,
+        "statuses": statuses,
+        "wall_ms": _summary([w * 1000 for w in walls]),
+        "stages": {},
+        "peak_alloc_kib": _summary([p / 1024 for p in peaks]) if peaks else None,
+    }
+    for stage in sorted({s for run in stages for s in run}):
+        times = [run.get(stage, (0.0, 0))[0] * 1000 for run in stages]
+        calls = sum(run.get(stage, (0.0, 0))[1] for run in stages) / len(stages)
+        report["stages"][stage] = dict(_summary(times), calls=round(calls, 2))
+    return report
+
+
+def _summary(values):
+    return {"p50": round(percentile(values, 50), 3), "p99": round(percentile(values, 99), 3)}
+
+
+def print_report(name, report, cold):
+    statuses = ", ".join(f"{k} {v}" for k, v in sorted(report["statuses"].items(), key=str))
+    print(f"\n{name}: {report['runs']} runs ({'cold' if cold else 'warm'}), status: {statuses}")
+    print(f"  {'stage':<10} {'calls':>6} {'p50 ms':>10} {'p99 ms':>10}")
+    print(f"  {'wall':<10} {'':>6} {report['wall_ms']['p50']:>10.2f} {report['wall_ms']['p99']:>10.2f}")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<10} {s['calls']:>6} {s['p50']:>10.2f} {s['p99']:>10.2f}")
+    alloc = report["peak_alloc_kib"]
+    if alloc:
+        print(f"  peak allocations: p50 {alloc['p50']:.1f} KiB, p99 {alloc['p99']:.1f} KiB")
+
+
+def compare(reports, baseline, tolerance):
+    """
+    Regressions of p50 wall time and peak allocations against a baseline report.
+    """
+    regressions = []
+    for name, report in reports.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric in ("wall_ms", "peak_alloc_kib"):
+            old, new = (before.get(metric) or {}).get("p50"), (report.get(metric) or {}).get("p50")
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{name} {metric} p50: {old:.2f} -> {new:.2f} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--alloc-iterations", type=int, default=5, help="runs of the tracemalloc pass")
+    parser.add_argument("--cold", action="store_true", help="drop caches and connections before every run")
+    parser.add_argument("--bars", type=int, default=365, help="bars in every oil response")
+    parser.add_argument("--backfill-days", type=int, default=60)
+    parser.add_argument("--sources", type=int, default=3, help="markets in the multi scenario")
+    parser.add_argument("--currencies", default="", help="EXCHANGE_CURRENCIES, e.g. MAD,EUR,GBP")
+    parser.add_argument("--rates-api", action="store_true", help="configure a multi-symbol exchange_rates_api")
+    parser.add_argument("--snapshot", action="store_true", help="publish S3 snapshots (SNAPSHOT_BUCKET)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every API response")
+    parser.add_argument("--aws-latency-ms", type=float, default=0.0, help="added to every AWS call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of API requests failing with 503")
+    parser.add_argument("--pad-bytes", type=int, default=0, help="filler added to every exchange response")
+    parser.add_argument("--gzip", action="store_true", help="serve oil responses gzip-encoded")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 growth over the baseline")
+    parser.add_argument("--verbose", action="store_true", help="keep the function's log output")
+    args = parser.parse_args()
+
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    os.chdir(ROOT)
+    if args.currencies:
+        os.environ["EXCHANGE_CURRENCIES"] = args.currencies
+    bucket = "bench-snapshots" if args.snapshot else None
+    if bucket:
+        os.environ["SNAPSHOT_BUCKET"] = bucket
+
+    fetch_date = fetcher.get_fetch_date()
+    apis = FakeApis(
+        fetch_date, bars=max(args.bars, args.backfill_days), latency_ms=args.latency_ms,
+        failure_rate=args.failure_rate, pad_bytes=args.pad_bytes, gzip_body=args.gzip, seed=args.seed,
+    ).start()
+    timer = StageTimer()
+    for owner, attr, stage in _STAGES:
+        timer.wrap(owner, attr, stage)
+    timer.wrap(sources._parsers, None, "oil", key="bars")
+
+    reports = {}
+    try:
+        with local_aws(latency_ms=args.aws_latency_ms, bucket=bucket) as set_store:
+            for name in names:
+                reports[name] = run_scenario(name, args, apis, set_store, timer)
+                print_report(name, reports[name], args.cold)
+    finally:
+        timer.restore()
+        apis.stop()
+
+    print(f"\noil payload: {apis.oil_size / 1e3:.1f} KB, API requests: {apis.requests}, injected failures: {apis.failures}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"config": vars(args), "scenarios": reports}, fh, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(reports, json.load(fh), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
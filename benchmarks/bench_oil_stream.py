@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: full-document oil parse vs streaming tail parse.
+
+Serves a synthetic multi-year 'bars' payload from a local HTTP server and compares
+peak traced allocations (tracemalloc) and wall time of
+  - _fetch_json + parse_oil_price (whole body and object tree in memory)
+  - fetch_oil_tail(url, 1)         (streamed, only the last bar kept)
+
+Run from the project root:
+    python benchmarks/bench_oil_stream.py [--bars 100000] [--gzip]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.fetcher import _fetch_json, fetch_oil_tail, parse_oil_price  # noqa: E402
+
+
+def make_payload(n):
+    start = date(1990, 1, 1)
+    bars = [[(start + timedelta(days=i)).strftime("%a %b %d 00:00:00 %Y"), 600 + (i % 500) * 0.25] for i in range(n)]
+    return json.dumps({"bars": bars, "marketId": 5910762}).encode()
+
+
+def serve(body, compressed):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = 64 * 1024
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            if compressed:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}/bars"
+
+
+def measure(fn):
+    tracemalloc.start()
+    t = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bars", type=int, default=100000)
+    parser.add_argument("--gzip", action="store_true", help="serve the payload gzip-encoded")
+    args = parser.parse_args()
+
+    payload = make_payload(args.bars)
+    body = gzip.compress(payload) if args.gzip else payload
+    httpd, url = serve(body, args.gzip)
+    try:
+        full, full_time, full_peak = measure(lambda: parse_oil_price(_fetch_json(url)))
+        tail, tail_time, tail_peak = measure(lambda: fetch_oil_tail(url, 1)[-1])
+    finally:
+        httpd.shutdown()
+    assert full == tail, (full, tail)
+
+    print(f"bars: {args.bars}  payload: {len(payload) / 1e6:.2f} MB  on the wire: {len(body) / 1e6:.2f} MB")
+    print(f"full document: peak {full_peak / 1e6:8.2f} MB  {full_time * 1000:8.1f} ms")
+    print(f"streaming:     peak {tail_peak / 1e6:8.2f} MB  {tail_time * 1000:8.1f} ms")
+    print(f"peak memory reduced {full_peak / tail_peak:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
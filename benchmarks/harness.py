@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for end-to-end benchmarks of lambda_handler.
+
+- FakeApis: a threaded HTTP server emulating the oil and exchange APIs, with
+  configurable latency, payload size and failure rate.
+- local_aws(): DynamoDB, SSM, Secrets Manager and S3 emulated in-process by moto
+  (requests still go through botocore), with optional added latency per call.
+- StageTimer: wraps the functions lambda_handler calls to time each stage.
+
+Used by benchmarks/bench_lambda.py.
+"""
+import contextlib
+import gzip
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src import aws_clients, http_client, storage, ttl_cache  # noqa: E402
+
+TABLE_NAME = "OilPrices"
+SECRET_NAME = "/bench/exchange-api-key"
+API_KEY = "bench-key"
+
+
+def make_bars(end_date, n):
+    """
+    `n` daily bars ending at end_date (ISO), in the oil API's ctime format.
+    """
+    end = date.fromisoformat(end_date)
+    return [
+        [(end - timedelta(days=i)).strftime("%a %b %d 00:00:00 %Y"), 600 + (i % 500) * 0.25]
+        for i in range(n - 1, -1, -1)
+    ]
+
+
+class FakeApis:
+    """
+    Oil and exchange APIs on 127.0.0.1.
+
+      GET /oil[/<name>]               {"bars": [[ctime, price], ...]}, newest bar on end_date
+      GET /convert?to=MAD&date=D      single-rate exchange response for D
+      GET /rates/D?symbols=MAD,EUR    multi-symbol exchange response for D
+
+    Parameters:
+      - end_date: date of the newest oil bar (the date the function expects)
+      - bars: number of bars in every oil response
+      - latency_ms: delay added before every response
+      - failure_rate: fraction of requests answered with HTTP 503 (retried by the client)
+      - pad_bytes: filler added to every exchange response
+      - gzip_body: serve oil responses gzip-encoded
+      - seed: seed for failure injection, so runs are comparable
+    """
+
+    def __init__(self, end_date, bars=365, latency_ms=0.0, failure_rate=0.0, pad_bytes=0,
+                 gzip_body=False, seed=1):
+        self.end_date = end_date
+        self.latency = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self.pad = "x" * pad_bytes
+        self.gzip_body = gzip_body
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        payload = json.dumps({"bars": make_bars(end_date, bars), "marketId": 5910762}).encode()
+        self.oil_body = gzip.compress(payload) if gzip_body else payload
+        self.oil_size = len(payload)
+        self._httpd = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.failures += 1
+                return True
+            return False
+
+    def _exchange(self, path, query):
+        day = query.get("date", [self.end_date])[0]
+        if path.startswith("/rates/"):
+            day = path[len("/rates/"):]
+            symbols = query.get("symbols", ["MAD"])[0].split(",")
+            rates = {s: round(9.4 + i * 0.1, 6) for i, s in enumerate(symbols)}
+            return {"base": "USD", "date": day, "rates": rates, "success": True, "pad": self.pad}
+        to = query.get("to", ["MAD"])[0]
+        rate = 9.490092 if to == "MAD" else 0.911
+        return {
+            "date": day,
+            "info": {"rate": rate},
+            "query": {"from": "USD", "to": to, "amount": 1},
+            "result": rate,
+            "success": True,
+            "pad": self.pad,
+        }
+
+    def start(self):
+        apis = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = 64 * 1024
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, encoding=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if apis.latency:
+                    time.sleep(apis.latency)
+                if apis._should_fail():
+                    self._send(503, b'{"error": "unavailable"}')
+                    return
+                parsed = urllib.parse.urlsplit(self.path)
+                if parsed.path.startswith("/oil"):
+                    self._send(200, apis.oil_body, "gzip" if apis.gzip_body else None)
+                elif parsed.path.startswith(("/convert", "/rates/")):
+                    if self.headers.get("apikey") != API_KEY:
+                        self._send(401, b'{"error": "invalid key"}')
+                        return
+                    body = apis._exchange(parsed.path, urllib.parse.parse_qs(parsed.query))
+                    self._send(200, json.dumps(body).encode())
+                else:
+                    self._send(404, b'{"error": "not found"}')
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def _store_param():
+    with open(os.path.join(ROOT, "config", "store_ssm.json"), encoding="utf-8") as fh:
+        return json.load(fh)["store_param"]
+
+
+def _add_latency(events, latency):
+    def delay(**kwargs):
+        time.sleep(latency)
+    events.register("before-call", delay)
+
+
+def _register_clients(latency):
+    """
+    Create the shared clients inside the mock so every later get_client/get_resource
+    call goes to moto, and hook the added latency onto them.
+    """
+    for service in ("ssm", "secretsmanager", "s3"):
+        client = aws_clients.get_client(service)
+        if latency:
+            _add_latency(client.meta.events, latency)
+    resource = aws_clients.get_resource("dynamodb")
+    if latency:
+        _add_latency(resource.meta.client.meta.events, latency)
+
+
+@contextlib.contextmanager
+def local_aws(latency_ms=0.0, bucket=None):
+    """
+    Run the block against in-process AWS stand-ins (moto): the OilPrices table,
+    the SSM store parameter named in config/store_ssm.json, the exchange API key
+    secret and, if `bucket` is given, an S3 bucket for snapshots.
+
+    `latency_ms` is added to every AWS call to approximate network round trips.
+    Yields set_store(dict), which writes the store JSON to the SSM parameter.
+    """
+    from moto import mock_aws
+
+    env = {
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "AWS_SESSION_TOKEN": "bench",
+        "AWS_DEFAULT_REGION": "eu-west-1",
+        "DDB_TABLE_NAME": TABLE_NAME,
+        "EXCHANGE_API_KEY_SECRET": SECRET_NAME,
+    }
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    aws_clients.reset()
+    try:
+        with mock_aws():
+            import boto3
+
+            boto3.client("dynamodb").create_table(
+                TableName=TABLE_NAME,
+                KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "date", "KeyType": "RANGE"}],
+                AttributeDefinitions=[
+                    {"AttributeName": "pk", "AttributeType": "S"},
+                    {"AttributeName": "date", "AttributeType": "S"},
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            boto3.client("secretsmanager").create_secret(Name=SECRET_NAME, SecretString=json.dumps({"key": API_KEY}))
+            if bucket:
+                boto3.client("s3").create_bucket(
+                    Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"},
+                )
+            param = _store_param()
+            ssm = boto3.client("ssm")
+            _register_clients(latency_ms / 1000.0)
+
+            def set_store(store):
+                ssm.put_parameter(Name=param, Value=json.dumps(store), Type="String", Overwrite=True)
+
+            yield set_store
+    finally:
+        aws_clients.reset()
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def reset_warm_state():
+    """
+    Forget everything a warm container keeps between invocations: TTL caches
+    (store, secret), pooled HTTP connections and the storage module's caches.
+    AWS clients are kept, since they are bound to the stand-ins.
+    """
+    for cache in ttl_cache._registry.values():
+        cache.invalidate()
+    with http_client._session_lock:
+        if http_client._session is not None:
+            http_client._session.close()
+        http_client._session = None
+    storage._known_items.clear()
+    storage._published_hashes.clear()
+    storage._aggregates.clear()
+
+
+class StageTimer:
+    """
+    Time the stages of an invocation by wrapping module attributes.
+
+    Each stage accumulates the wall time of its calls (summed across threads, so a
+    concurrent stage can exceed the invocation's wall time) and a call count.
+    Stages nest: "exchange" includes a secret lookup made inside it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._patched = []
+        self.current = {}
+
+    def wrap(self, owner, name, stage, key=None):
+        """
+        Replace owner.name (or owner[key] for dicts) with a timed wrapper.
+        """
+        original = owner[key] if key is not None else getattr(owner, name)
+        timer = self
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with timer._lock:
+                    total, calls = timer.current.get(stage, (0.0, 0))
+                    timer.current[stage] = (total + elapsed, calls + 1)
+
+        if key is not None:
+            owner[key] = timed
+        else:
+            setattr(owner, name, timed)
+        self._patched.append((owner, name, key, original))
+
+    def take(self):
+        """
+        Return and reset the stage times of the invocation that just ran.
+        """
+        with self._lock:
+            current, self.current = self.current, {}
+        return current
+
+    def restore(self):
+        for owner, name, key, original in reversed(self._patched):
+            if key is not None:
+                owner[key] = original
+            else:
+                setattr(owner, name, original)
+        self._patched.clear()
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+import logging
+import os
+from bisect import bisect_left
+from collections import deque
+from decimal import Decimal
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_WINDOWS = (7, 30, 90)
+
+# Attributes aggregated for each stored day
+AGGREGATE_ATTRIBUTES = ("oil_price", "exchange_rate")
+
+# Means are rounded like the stored prices
+_MEAN_QUANTUM = Decimal("0.0001")
+
+
+def aggregate_windows():
+    """
+    Window sizes (in stored days) from AGGREGATE_WINDOWS, e.g. "7,30,90" (the default).
+    """
+    raw = os.environ.get("AGGREGATE_WINDOWS")
+    if not raw:
+        return DEFAULT_WINDOWS
+    try:
+        windows = sorted({int(w) for w in raw.split(",") if w.strip()})
+    except ValueError:
+        logger.warning("Invalid AGGREGATE_WINDOWS %r — using %s", raw, DEFAULT_WINDOWS)
+        return DEFAULT_WINDOWS
+    return tuple(w for w in windows if w > 0) or DEFAULT_WINDOWS
+
+
+class RollingWindow:
+    """
+    Sum, min and max over the last `size` values of a sequence.
+
+    Values are pushed with an increasing sequence number. The sum is adjusted by
+    the value leaving the window, and min/max come from monotonic deques of
+    (seq, value), so each push is O(1) amortized.
+    """
+
+    __slots__ = ("size", "total", "count", "mins", "maxs")
+
+    def __init__(self, size, total=Decimal(0), count=0, mins=None, maxs=None):
+        self.size = size
+        self.total = total
+        self.count = count
+        self.mins = deque(mins or ())
+        self.maxs = deque(maxs or ())
+
+    def push(self, seq, value, leaving=None):
+        """
+        Add `value` as element `seq`; `leaving` is the value pushed `size` steps
+        earlier (None while the window is not full).
+        """
+        self.total += value
+        self.count += 1
+        if leaving is not None:
+            self.total -= leaving
+            self.count -= 1
+
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        self.mins.append((seq, value))
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.maxs.append((seq, value))
+
+        oldest = seq - self.size
+        while self.mins[0][0] <= oldest:
+            self.mins.popleft()
+        while self.maxs[0][0] <= oldest:
+            self.maxs.popleft()
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": (self.total / self.count).quantize(_MEAN_QUANTUM),
+            "min": self.mins[0][1],
+            "max": self.maxs[0][1],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "count": self.count,
+            "mins": [[seq, value] for seq, value in self.mins],
+            "maxs": [[seq, value] for seq, value in self.maxs],
+        }
+
+    @classmethod
+    def from_dict(cls, size, data):
+        return cls(
+            size,
+            total=Decimal(data["total"]),
+            count=int(data["count"]),
+            mins=[(int(seq), Decimal(value)) for seq, value in data["mins"]],
+            maxs=[(int(seq), Decimal(value)) for seq, value in data["maxs"]],
+        )
+
+
+class SeriesAggregates:
+    """
+    Rolling aggregates of one stored series (one partition key), per attribute
+    and window: mean/min/max over the last N stored days, the latest value and
+    the change from the previous stored day.
+
+    A new latest day is applied in O(1) per window. Rewriting or inserting a
+    day inside the retained history (the largest window) replays that history;
+    days older than it are ignored.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(sorted(windows))
+        self.history = deque(maxlen=self.windows[-1])
+        self.seq = {attr: 0 for attr in AGGREGATE_ATTRIBUTES}
+        self.values = {attr: deque(maxlen=self.windows[-1]) for attr in AGGREGATE_ATTRIBUTES}
+        self.rolling = {
+            attr: {w: RollingWindow(w) for w in self.windows} for attr in AGGREGATE_ATTRIBUTES
+        }
+
+    @property
+    def last_date(self):
+        return self.history[-1][0] if self.history else None
+
+    def _append(self, date_str, values):
+        self.history.append((date_str, values))
+        for attr in AGGREGATE_ATTRIBUTES:
+            value = values.get(attr)
+            if value is None:
+                continue
+            past = self.values[attr]
+            self.seq[attr] += 1
+            for w, window in self.rolling[attr].items():
+                leaving = past[-w] if len(past) >= w else None
+                window.push(self.seq[attr], value, leaving)
+            past.append(value)
+
+    def push(self, date_str, values):
+        """
+        Apply one stored day: `values` maps attribute names to Decimals (missing
+        or None attributes are skipped). Returns False if the day is older than
+        the retained history and was ignored.
+        """
+        numeric = {}
+        for attr in AGGREGATE_ATTRIBUTES:
+            try:
+                numeric[attr] = Decimal(str(values[attr]))
+            except (KeyError, TypeError, ArithmeticError):
+                continue
+        values = {a: v for a, v in numeric.items() if v.is_finite()}
+        last = self.last_date
+        if last is None or date_str > last:
+            self._append(date_str, values)
+            return True
+
+        if len(self.history) == self.history.maxlen and date_str < self.history[0][0]:
+            logger.info("Day %s is older than the aggregated history — ignored", date_str)
+            return False
+
+        # Rewritten or late day: rebuild from the retained history
+        days = list(self.history)
+        dates = [d for d, _ in days]
+        i = bisect_left(dates, date_str)
+        if i < len(days) and dates[i] == date_str:
+            days[i] = (date_str, values)
+        else:
+            days.insert(i, (date_str, values))
+        self._replay(days[-self.windows[-1]:])
+        return True
+
+    def _replay(self, days):
+        fresh = SeriesAggregates(self.windows)
+        for date_str, values in days:
+            fresh._append(date_str, values)
+        self.history, self.seq, self.values, self.rolling = fresh.history, fresh.seq, fresh.values, fresh.rolling
+
+    def summary(self) -> dict:
+        """
+        {attr: {"last": v, "change": v - previous, "7": {...}, "30": {...}, ...}}
+        for attributes that have values. Window keys are strings (DynamoDB map keys).
+        """
+        result = {}
+        for attr in AGGREGATE_ATTRIBUTES:
+            past = self.values[attr]
+            if not past:
+                continue
+            entry = {"last": past[-1]}
+            if len(past) >= 2:
+                entry["change"] = past[-1] - past[-2]
+            for w, window in self.rolling[attr].items():
+                entry[str(w)] = window.summary()
+            result[attr] = entry
+        return result
+
+    def to_dict(self) -> dict:
+        """
+        Serializable state (Decimals, lists and string keys only).
+        """
+        return {
+            "windows": list(self.windows),
+            "history": [[d, dict(v)] for d, v in self.history],
+            "seq": dict(self.seq),
+            "rolling": {
+                attr: {str(w): window.to_dict() for w, window in windows.items()}
+                for attr, windows in self.rolling.items()
+            },
+            "values": {attr: list(values) for attr, values in self.values.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, windows=None):
+        """
+        Restore from to_dict() output. If `windows` differs from the stored
+        windows, the state is rebuilt from the stored history.
+        """
+        stored_windows = tuple(int(w) for w in data["windows"])
+        history = [(d, {a: Decimal(v) for a, v in values.items()}) for d, values in data["history"]]
+        if windows is not None and tuple(sorted(windows)) != stored_windows:
+            aggregates = cls(windows)
+            aggregates._replay(history[-max(windows):])
+            return aggregates
+
+        aggregates = cls(stored_windows)
+        aggregates.history.extend(history)
+        for attr in AGGREGATE_ATTRIBUTES:
+            aggregates.seq[attr] = int(data["seq"].get(attr, 0))
+            aggregates.values[attr].extend(Decimal(v) for v in data["values"].get(attr, []))
+            rolling = data["rolling"].get(attr, {})
+            for w in stored_windows:
+                if str(w) in rolling:
+                    aggregates.rolling[attr][w] = RollingWindow.from_dict(w, rolling[str(w)])
+        return aggregates
@@ -3,97 +3,675 @@ import json
 import logging
 import traceback
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Support both Lambda (flat structure) and local dev (src. prefix)
 try:
-    from fetcher import fetch_oil_data, fetch_exchange_data, ExtractionError, get_fetch_date
-    from ssm_resolver import get_store_urls
-    from storage import save_to_dynamodb
+    from fetcher import (
+        fetch_oil_data, fetch_oil_series, fetch_exchange_data, fetch_exchange_rates,
+        get_exchange_api_key, ExtractionError, get_fetch_date,
+    )
+    from env import env_flag
+    from ssm_resolver import get_store_urls, invalidate_store_urls
+    from gaps import find_gaps
+    from rate_limit import configure_rate_limits
+    from metrics import add as add_metric, emit as emit_metrics, span, start_invocation
+    from snapshot import publish_snapshot, snapshot_key
+    from sources import load_sources
+    from storage import build_item, get_stored_day, save_to_dynamodb, write_batch, write_items
+    from retry import retry_count, set_deadline_from_context
+    from ttl_cache import cache_stats
 except ImportError:
-    from src.fetcher import fetch_oil_data, fetch_exchange_data, ExtractionError, get_fetch_date
-    from src.ssm_resolver import get_store_urls
-    from src.storage import save_to_dynamodb
+    from src.fetcher import (
+        fetch_oil_data, fetch_oil_series, fetch_exchange_data, fetch_exchange_rates,
+        get_exchange_api_key, ExtractionError, get_fetch_date,
+    )
+    from src.env import env_flag
+    from src.ssm_resolver import get_store_urls, invalidate_store_urls
+    from src.gaps import find_gaps
+    from src.rate_limit import configure_rate_limits
+    from src.metrics import add as add_metric, emit as emit_metrics, span, start_invocation
+    from src.snapshot import publish_snapshot, snapshot_key
+    from src.sources import load_sources
+    from src.storage import build_item, get_stored_day, save_to_dynamodb, write_batch, write_items
+    from src.retry import retry_count, set_deadline_from_context
+    from src.ttl_cache import cache_stats
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
+def speculative_enabled(event):
+    """
+    Speculative fetching is enabled by {"speculative": true} in the event,
+    falling back to the SPECULATIVE_FETCH environment variable.
+    """
+    if isinstance(event, dict) and "speculative" in event:
+        return bool(event["speculative"])
+    return env_flag("SPECULATIVE_FETCH")
+
+
+def exchange_currencies():
+    """
+    Quote currencies from EXCHANGE_CURRENCIES (comma-separated, e.g. "MAD,EUR,GBP").
+    Returns an empty list when unset, which keeps the single-rate mode.
+    """
+    currencies = []
+    for code in os.environ.get("EXCHANGE_CURRENCIES", "").split(","):
+        code = code.strip().upper()
+        if code and code not in currencies:
+            currencies.append(code)
+    return currencies
+
+
+def exchange_fetcher(exchange_api, rates_api, currencies):
+    """
+    Return fetch(date=None, api_key=None) -> (date_iso, exchange_rate, exchange_rates).
+
+    Without currencies this is fetch_exchange_data and exchange_rates is None.
+    With currencies every rate comes from fetch_exchange_rates (one batched request
+    when rates_api is configured), and the first currency is also returned as
+    exchange_rate so the single-rate attribute stays populated.
+    """
+    if not currencies:
+        def fetch(**kwargs):
+            date_iso, rate = fetch_exchange_data(exchange_api, **kwargs)
+            return date_iso, rate, None
+    else:
+        def fetch(**kwargs):
+            date_iso, rates = fetch_exchange_rates(exchange_api, currencies, rates_url=rates_api, **kwargs)
+            return date_iso, rates[currencies[0]], rates
+    return fetch
+
+
+def _publish_snapshot(ddb_table, pk=None, source_name=None):
+    """
+    Publish the S3 "latest" snapshot of a partition when SNAPSHOT_BUCKET is set.
+    The data is already persisted, so a failed publish is logged and reported
+    but does not fail the run.
+    Returns "uploaded", "unchanged", "error", or None when publishing is disabled.
+    """
+    bucket = os.environ.get("SNAPSHOT_BUCKET")
+    if not bucket:
+        return None
+    kwargs = {"pk": pk} if pk else {}
+    try:
+        with span("snapshot"):
+            return publish_snapshot(ddb_table, bucket, snapshot_key(source_name), **kwargs)
+    except Exception as e:
+        logger.error("Failed to publish snapshot for %s: %s", source_name or "default source", e)
+        return "error"
+
+
+def parse_backfill_range(backfill):
+    """
+    Validate the backfill event section {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}.
+    Returns (start_iso, end_iso). Raises ValueError on a malformed range.
+    """
+    if not isinstance(backfill, dict):
+        raise ValueError("backfill must be an object with start_date and end_date")
+    try:
+        start = datetime.strptime(backfill["start_date"], "%Y-%m-%d").date()
+        end = datetime.strptime(backfill["end_date"], "%Y-%m-%d").date()
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("backfill start_date and end_date must be YYYY-MM-DD dates")
+    if start > end:
+        raise ValueError("backfill start_date must not be after end_date")
+    return start.isoformat(), end.isoformat()
+
+
+def backfill_request(backfill, oil_api):
+    """
+    Validate a backfill event section against the store.
+    Returns ((start_iso, end_iso), None), or (None, error result).
+    """
+    try:
+        dates = parse_backfill_range(backfill)
+    except ValueError as e:
+        logger.error("Invalid backfill request: %s", e)
+        return None, {"status": "error", "message": f"invalid backfill request: {e}"}
+    if not oil_api:
+        logger.error("Backfill requires oil_api in the resolved store")
+        return None, {"status": "error", "message": "invalid backfill request: store has no oil_api"}
+    return dates, None
+
+
+def run_backfill(fetch_exchange, oil_api, ddb_table, start_date, end_date, only_dates=None, max_dates=None,
+                 source=None, history=None):
+    """
+    Persist every day in [start_date, end_date] for which the oil history has a bar
+    (restricted to `only_dates` when given, e.g. the gaps found by gaps.find_gaps,
+    and to the most recent `max_dates` of those days when given). With a `source`
+    (sources.Source), its URL is read instead of `oil_api` and the days are stored
+    under its partition key.
+
+    The oil history comes from a single request (the full 'bars' array, kept as
+    a compact OilSeries), or is the `history` OilSeries given by the caller
+    (e.g. the bars carried in a fan-out chunk), in which case the oil API is not
+    requested. The exchange rates for the matching dates are fetched
+    concurrently with one shared API key lookup, and all records are written in
+    batches.
+    """
+    if history is None:
+        history = fetch_oil_series(source.url if source is not None else oil_api)
+    oil_by_date, no_oil_price = select_backfill_dates(history, start_date, end_date, only_dates, max_dates)
+    if not oil_by_date:
+        return empty_backfill_result(start_date, end_date, only_dates, no_oil_price)
+
+    dates = sorted(oil_by_date)
+    api_key = get_exchange_api_key()
+    max_workers = int(os.environ.get("BACKFILL_MAX_WORKERS", "8"))
+    logger.info("Backfilling %d dates with %d workers", len(dates), max_workers)
+
+    def fetch_rate(date_str):
+        return fetch_exchange(date=date_str, api_key=api_key)
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [(d, pool.submit(fetch_rate, d)) for d in dates]
+        for date_str, future in futures:
+            try:
+                outcomes.append((date_str, future.result()))
+            except Exception as e:
+                outcomes.append((date_str, e))
+    return persist_backfill(ddb_table, oil_by_date, outcomes, start_date, end_date, only_dates, no_oil_price, source)
+
+
+def select_backfill_dates(history, start_date, end_date, only_dates=None, max_dates=None):
+    """
+    The backfill's {date: oil_price} (see run_backfill for only_dates/max_dates)
+    and, when only_dates is given, the requested days without an oil bar.
+    """
+    oil_by_date = dict(history.slice(start_date, end_date).items())
+    no_oil_price = []
+    if only_dates is not None:
+        no_oil_price = sorted(d for d in only_dates if d not in oil_by_date)
+        oil_by_date = {d: p for d, p in oil_by_date.items() if d in only_dates}
+    if max_dates is not None and len(oil_by_date) > max_dates:
+        keep = sorted(oil_by_date)[-max_dates:] if max_dates > 0 else []
+        oil_by_date = {d: oil_by_date[d] for d in keep}
+    return oil_by_date, no_oil_price
+
+
+def empty_backfill_result(start_date, end_date, only_dates, no_oil_price):
+    logger.info("No oil bars between %s and %s — nothing to backfill", start_date, end_date)
+    result = {
+        "status": "skipped",
+        "message": "no oil prices in backfill range",
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    if only_dates is not None:
+        result["no_oil_price"] = no_oil_price
+    return result
+
+
+def persist_backfill(ddb_table, oil_by_date, outcomes, start_date, end_date, only_dates=None, no_oil_price=None,
+                      source=None):
+    """
+    Write the backfilled days (under `source`'s partition key when given) and
+    build the run's result.
+    `outcomes` lists (date, (exchange_date, rate, rates) or the exception raised).
+    """
+    records = []
+    skipped = []
+    failed = []
+    for date_str, outcome in outcomes:
+        if isinstance(outcome, Exception):
+            logger.error("Exchange fetch failed for %s: %s", date_str, outcome)
+            failed.append(date_str)
+            continue
+        exchange_source_date, exchange_val, exchange_rates = outcome
+        if exchange_source_date != date_str:
+            logger.warning(
+                "Exchange rate date (%s) is not requested date (%s) — skipping",
+                exchange_source_date,
+                date_str,
+            )
+            skipped.append(date_str)
+            continue
+        if exchange_rates is None:
+            records.append((date_str, oil_by_date[date_str], exchange_val))
+        else:
+            records.append((date_str, oil_by_date[date_str], exchange_val, exchange_rates))
+
+    batch_kwargs = {"pk": source.pk} if source is not None else {}
+    write_stats = write_batch(ddb_table, records, **batch_kwargs) if records else {"written": 0, "failed": 0}
+    result = {
+        "status": "ok",
+        "mode": "backfill",
+        "start_date": start_date,
+        "end_date": end_date,
+        "written": write_stats["written"],
+        "write_failed": write_stats["failed"],
+        "skipped": skipped,
+        "failed": failed,
+    }
+    if only_dates is not None:
+        result["no_oil_price"] = no_oil_price
+    if source is not None:
+        result["source"] = source.name
+    if write_stats["written"]:
+        if source is not None:
+            snapshot = _publish_snapshot(ddb_table, pk=source.pk, source_name=source.name)
+        else:
+            snapshot = _publish_snapshot(ddb_table)
+        if snapshot is not None:
+            result["snapshot"] = snapshot
+    return result
+
+
+def _already_stored(stored, price, currencies):
+    """
+    True if a stored day (see get_stored_day) has this price, an exchange rate
+    and a rate for every configured currency.
+    """
+    if stored is None or stored.get("oil_price") != price or "exchange_rate" not in stored:
+        return False
+    stored_rates = stored.get("exchange_rates") or {}
+    return all(c in stored_rates for c in currencies)
+
+
+def _run_sources(sources, fetch_exchange, ddb_table, currencies, speculative=False, idempotent=False):
+    """
+    Persist the expected day for every configured source (see sources.load_sources).
+
+    Sources are fetched concurrently, at most SOURCES_MAX_WORKERS (default 4) at a
+    time. Sources whose latest price is not from the expected date are skipped,
+    the exchange rate is fetched once for the rest, and all their items are
+    written in one batch under each source's partition key.
+    """
+    expected_date = get_fetch_date()
+    max_workers = max(1, min(len(sources), int(os.environ.get("SOURCES_MAX_WORKERS", "4"))))
+    logger.info("Fetching %d sources with %d workers", len(sources), max_workers)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers + (1 if speculative else 0))
+    try:
+        exchange_future = pool.submit(fetch_exchange) if speculative else None
+        futures = [(source, pool.submit(source.fetch)) for source in sources]
+
+        outcomes = []
+        for source, future in futures:
+            try:
+                outcomes.append((source, future.result()))
+            except Exception as e:
+                outcomes.append((source, e))
+        matched, result = sort_source_outcomes(outcomes, expected_date, ddb_table, currencies, idempotent)
+        if not matched:
+            return no_source_result(result)
+
+        if exchange_future is not None:
+            exchange = exchange_future.result()
+        else:
+            exchange = fetch_exchange()
+        return persist_sources(ddb_table, expected_date, matched, exchange, result)
+    finally:
+        # Don't block on a discarded speculative exchange fetch
+        pool.shutdown(wait=False)
+
+
+def sort_source_outcomes(outcomes, expected_date, ddb_table, currencies, idempotent=False):
+    """
+    Split source fetch outcomes, (source, (date, price) or the exception raised),
+    into the sources to persist, [(source, price)], and the run's partial result
+    listing the skipped, failed and (idempotent mode) unchanged sources.
+    """
+    matched = []
+    skipped = []
+    failed = []
+    unchanged = []
+    for source, outcome in outcomes:
+        if isinstance(outcome, Exception):
+            logger.error("Fetch failed for source %s: %s", source.name, outcome)
+            failed.append(source.name)
+            continue
+        source_date, price = outcome
+        if source_date != expected_date:
+            logger.info(
+                "Source %s price date (%s) is not expected date (%s) — skipping",
+                source.name,
+                source_date,
+                expected_date,
+            )
+            skipped.append(source.name)
+            continue
+        if idempotent and _already_stored(get_stored_day(ddb_table, expected_date, pk=source.pk), price, currencies):
+            logger.info("Source %s already stored for %s — skipping", source.name, expected_date)
+            unchanged.append(source.name)
+            continue
+        matched.append((source, price))
+
+    result = {
+        "mode": "sources",
+        "date": expected_date,
+        "skipped": skipped,
+        "failed": failed,
+        "unchanged": unchanged,
+    }
+    return matched, result
+
+
+def no_source_result(result):
+    if result["failed"] and not result["skipped"] and not result["unchanged"]:
+        return dict(result, status="error", message="every source failed")
+    if result["skipped"]:
+        return dict(result, status="skipped", message="no source price from expected date; exchange fetch skipped")
+    return dict(result, status="ok", written=0, write_failed=0, write="noop")
+
+
+def persist_sources(ddb_table, expected_date, matched, exchange, result):
+    """
+    Write the matched sources' items in one batch once the exchange rate,
+    `exchange` = (date, rate, rates), is confirmed for the expected date.
+    """
+    exchange_source_date, exchange_val, exchange_rates = exchange
+    if exchange_source_date != expected_date:
+        logger.warning(
+            "Exchange rate date (%s) is not expected date (%s) — skipping persist",
+            exchange_source_date,
+            expected_date,
+        )
+        return dict(
+            result,
+            status="skipped",
+            message="exchange rate not from expected date; not persisted",
+            exchange_source_date=exchange_source_date,
+        )
+
+    items = [
+        build_item(expected_date, price, exchange_val, exchange_rates, pk=source.pk)
+        for source, price in matched
+    ]
+    write_stats = write_items(ddb_table, items)
+    result = dict(
+        result,
+        status="ok",
+        written=write_stats["written"],
+        write_failed=write_stats["failed"],
+    )
+    if write_stats["written"]:
+        snapshots = {
+            source.name: _publish_snapshot(ddb_table, pk=source.pk, source_name=source.name)
+            for source, _ in matched
+        }
+        if any(status is not None for status in snapshots.values()):
+            result["snapshot"] = snapshots
+    return result
+
+
+def _heal_gaps():
+    """
+    Fill missing business days of the default series (GAP_HEALING=true).
+
+    A keys-only Query finds the days missing in the last GAP_SCAN_DAYS (default 30)
+    days up to the fetch date. If there are any, they are backfilled from one oil
+    history request, with at most GAP_HEAL_MAX_DAYS (default 5) exchange requests
+    per run, most recent first; repeated daily runs converge to a complete table.
+    Days without an oil bar (market holidays) are reported and never cost an
+    exchange request.
+    """
+    ddb_table = os.environ.get("DDB_TABLE_NAME", "OilPrices")
+    scan_days = int(os.environ.get("GAP_SCAN_DAYS", "30"))
+    max_days = int(os.environ.get("GAP_HEAL_MAX_DAYS", "5"))
+
+    store = get_store_urls()
+    oil_api = store.get("oil_api")
+    if not oil_api:
+        return {"status": "skipped", "message": "store has no oil_api"}
+
+    gaps = find_gaps(ddb_table, get_fetch_date(), scan_days)
+    if not gaps:
+        return {"status": "ok", "missing": 0}
+
+    fetch_exchange = exchange_fetcher(store.get("exchange_api"), store.get("exchange_rates_api"), exchange_currencies())
+    backfill = run_backfill(
+        fetch_exchange, oil_api, ddb_table, gaps[0], gaps[-1], only_dates=set(gaps), max_dates=max_days,
+    )
+    heal = {
+        "status": backfill["status"],
+        "missing": len(gaps),
+        "written": backfill.get("written", 0),
+        "no_oil_price": backfill.get("no_oil_price", []),
+    }
+    for key in ("skipped", "failed"):
+        if backfill.get(key):
+            heal[key] = backfill[key]
+    return heal
+
+
+def error_result(exc, label):
+    """
+    Log an exception that ended a run (`label`, e.g. "backfill") and return the
+    run's error result: an extraction error is reported with its message, any
+    other exception only as "exception".
+    """
+    if isinstance(exc, ExtractionError):
+        logger.error("Data extraction error during %s: %s", label, exc)
+        return {"status": "error", "message": f"extraction error: {exc}"}
+    logger.error("Unhandled error during %s: %s", label, "".join(traceback.format_exception(exc)))
+    return {"status": "error", "message": "exception"}
+
+
 def lambda_handler(event, context):
-    logger.info("Starting fetch run with event: %s", json.dumps(event))
+    # Stage timings and counters are emitted as one EMF record at the end (METRICS_ENABLED)
+    start_invocation()
+    # Retries must leave enough of the Lambda timeout to persist and return
+    set_deadline_from_context(context)
+    return finish_invocation(event, context, _handle(event, context))
+
+
+def finish_invocation(event, context, result):
+    """
+    Common end of an invocation: optional gap healing, store invalidation after
+    an error, cache counters and the metrics record.
+    """
+    if (
+        env_flag("GAP_HEALING")
+        and result.get("status") in ("ok", "skipped")
+        and "backfill" not in (event or {})
+        and result.get("mode") != "sources"
+    ):
+        try:
+            with span("heal"):
+                result["heal"] = _heal_gaps()
+        except Exception as e:
+            # The day's own result stands; healing is retried by the next run
+            logger.error("Gap healing failed: %s", e)
+            result["heal"] = {"status": "error", "message": str(e)}
+    if result.get("status") == "error":
+        # A stale store (e.g. a moved endpoint) must not outlive a failed run
+        invalidate_store_urls()
+    result["cache"] = cache_stats()
+    add_metric("retries", retry_count())
+    properties = {"status": result.get("status"), "mode": result.get("mode", "daily")}
+    if result.get("write"):
+        properties["write"] = result["write"]
+    emit_metrics(context, properties)
+    return result
 
+
+def resolve_store():
+    """
+    Resolve the store URLs. Returns (store, None), or (None, error result).
+    """
     # Get the runtime URLs from the resolver (resolver handles config file + SSM)
     try:
         store = get_store_urls()
+        # Upstream request rates per host, shared by every fetch of the run
+        configure_rate_limits(store.get("rate_limits"))
     except FileNotFoundError as e:
         logger.error("Configuration file not found: %s", e)
-        return {"status": "error", "message": "config file not found"}
+        return None, {"status": "error", "message": "config file not found"}
     except ValueError as e:
         logger.error("Configuration invalid: %s", e)
-        return {"status": "error", "message": "invalid config or SSM content"}
+        return None, {"status": "error", "message": "invalid config or SSM content"}
     except Exception as e:
         logger.error("Failed to resolve SSM parameter: %s", e)
-        return {"status": "error", "message": "failed to resolve SSM parameter"}
+        return None, {"status": "error", "message": "failed to resolve SSM parameter"}
+
+    if not store.get("exchange_api") or not (store.get("oil_api") or store.get("sources")):
+        logger.error("Resolved store missing URLs")
+        return None, {"status": "error", "message": "resolved store missing urls"}
+    return store, None
+
+
+def configured_sources(store):
+    """
+    Load the store's "sources" (see sources.load_sources).
+    Returns (sources, None), or (None, error result).
+    """
+    try:
+        return load_sources(store["sources"]), None
+    except ValueError as e:
+        logger.error("Invalid sources configuration: %s", e)
+        return None, {"status": "error", "message": f"invalid sources: {e}"}
+
+
+def _handle(event, context):
+    logger.info("Starting fetch run with event: %s", json.dumps(event))
 
+    store, error = resolve_store()
+    if error is not None:
+        return error
     oil_api = store.get("oil_api")
     exchange_api = store.get("exchange_api")
-    if not oil_api or not exchange_api:
-        logger.error("Resolved store missing URLs")
-        return {"status": "error", "message": "resolved store missing urls"}
 
     # DynamoDB table name from environment
     ddb_table = os.environ.get("DDB_TABLE_NAME", "OilPrices")
 
+    currencies = exchange_currencies()
+    fetch_exchange = exchange_fetcher(exchange_api, store.get("exchange_rates_api"), currencies)
+
+    backfill = (event or {}).get("backfill")
+    if backfill is not None:
+        dates, error = backfill_request(backfill, oil_api)
+        if error is not None:
+            return error
+        start_date, end_date = dates
+        try:
+            return run_backfill(fetch_exchange, oil_api, ddb_table, start_date, end_date)
+        except Exception as e:
+            return error_result(e, "backfill")
+
+    # In speculative mode the Secrets Manager lookup and exchange request run in a
+    # worker thread while the oil price is fetched; the result is discarded if the
+    # oil date check fails.
+    speculative = speculative_enabled(event)
+    idempotent = env_flag("IDEMPOTENT_WRITES")
+
+    if store.get("sources"):
+        sources, error = configured_sources(store)
+        if error is not None:
+            return error
+        try:
+            return _run_sources(sources, fetch_exchange, ddb_table, currencies, speculative, idempotent)
+        except Exception as e:
+            return error_result(e, "sources run")
+
+    exchange_pool = ThreadPoolExecutor(max_workers=1) if speculative else None
+
     try:
+        exchange_future = None
+        if exchange_pool is not None:
+            exchange_future = exchange_pool.submit(fetch_exchange)
+
         # Fetch oil price first
         oil_source_date, oil_val = fetch_oil_data(oil_api)
         
         # Check if oil price has the expected date (yesterday)
         expected_date = get_fetch_date()
-        if oil_source_date != expected_date:
-            logger.info(
-                "Oil price date (%s) is not expected date (%s) — skipping exchange fetch",
-                oil_source_date,
-                expected_date,
-            )
-            return {
-                "status": "skipped",
-                "message": "oil price not from expected date; exchange fetch skipped",
-                "oil_source_date": oil_source_date,
-                "expected_date": expected_date,
-            }
-        
-        # Oil price date matches - now fetch exchange rate
-        exchange_source_date, exchange_val = fetch_exchange_data(exchange_api)
+        early = check_oil_day(ddb_table, oil_source_date, oil_val, expected_date, currencies, idempotent)
+        if early is not None:
+            if exchange_future is not None:
+                logger.info("Discarding speculative exchange fetch")
+            return early
 
-        # Verify exchange rate also has the expected date before persisting
-        if exchange_source_date != expected_date:
-            logger.warning(
-                "Exchange rate date (%s) is not expected date (%s) — skipping persist",
-                exchange_source_date,
-                expected_date,
-            )
-            return {
-                "status": "skipped",
-                "message": "exchange rate not from expected date; not persisted",
-                "exchange_source_date": exchange_source_date,
-                "expected_date": expected_date,
-            }
-
-        date_str = expected_date
-
-        # Persist minimal record (date, oil_price, exchange_rate)
-        save_to_dynamodb(
-            table_name=ddb_table,
-            date_str=date_str,
-            oil_price=oil_val,
-            exchange_rate=exchange_val,
+        # Oil price date matches - now fetch (or collect the speculative) exchange rate
+        if exchange_future is not None:
+            exchange = exchange_future.result()
+        else:
+            exchange = fetch_exchange()
+        return persist_day(ddb_table, expected_date, oil_val, exchange, idempotent)
+    except Exception as e:
+        return error_result(e, "lambda run")
+    finally:
+        if exchange_pool is not None:
+            # Don't block on a discarded speculative fetch
+            exchange_pool.shutdown(wait=False)
+
+
+def check_oil_day(ddb_table, oil_source_date, oil_val, expected_date, currencies, idempotent=False):
+    """
+    The run's result if it ends before the exchange fetch: the oil price is not
+    from the expected date, or (idempotent mode) the day is already stored.
+    Returns None when the exchange rate is needed.
+    """
+    if oil_source_date != expected_date:
+        logger.info(
+            "Oil price date (%s) is not expected date (%s) — skipping exchange fetch",
+            oil_source_date,
+            expected_date,
         )
+        return {
+            "status": "skipped",
+            "message": "oil price not from expected date; exchange fetch skipped",
+            "oil_source_date": oil_source_date,
+            "expected_date": expected_date,
+        }
+
+    # In idempotent mode a day already stored with this oil price needs no exchange fetch
+    if idempotent and _already_stored(get_stored_day(ddb_table, expected_date), oil_val, currencies):
+        logger.info("Day %s already stored — skipping exchange fetch and write", expected_date)
+        return {
+            "status": "ok",
+            "date": expected_date,
+            "write": "noop",
+            "message": "day already stored; exchange fetch skipped",
+        }
+    return None
+
+
+def persist_day(ddb_table, expected_date, oil_val, exchange, idempotent=False):
+    """
+    Save the day once the exchange rate, `exchange` = (date, rate, rates), is
+    confirmed for the expected date, then publish the snapshot.
+    """
+    exchange_source_date, exchange_val, exchange_rates = exchange
+
+    # Verify exchange rate also has the expected date before persisting
+    if exchange_source_date != expected_date:
+        logger.warning(
+            "Exchange rate date (%s) is not expected date (%s) — skipping persist",
+            exchange_source_date,
+            expected_date,
+        )
+        return {
+            "status": "skipped",
+            "message": "exchange rate not from expected date; not persisted",
+            "exchange_source_date": exchange_source_date,
+            "expected_date": expected_date,
+        }
+
+    date_str = expected_date
+
+    # Persist minimal record (date, oil_price, exchange_rate[, exchange_rates])
+    save_kwargs = {"idempotent": True} if idempotent else {}
+    if exchange_rates is not None:
+        save_kwargs["exchange_rates"] = exchange_rates
+    write_status = save_to_dynamodb(
+        table_name=ddb_table,
+        date_str=date_str,
+        oil_price=oil_val,
+        exchange_rate=exchange_val,
+        **save_kwargs,
+    )
 
-        return {"status": "ok", "date": date_str}
-    except ExtractionError as e:
-        logger.error("Data extraction error: %s", e)
-        return {"status": "error", "message": f"extraction error: {e}"}
-    except Exception:
-        logger.error("Unhandled error during lambda run: %s", traceback.format_exc())
-        return {"status": "error", "message": "exception"}
\ No newline at end of file
+    result = {"status": "ok", "date": date_str, "write": write_status}
+    if exchange_rates is not None:
+        result["currencies"] = sorted(exchange_rates)
+    if write_status != "noop":
+        snapshot = _publish_snapshot(ddb_table)
+        if snapshot is not None:
+            result["snapshot"] = snapshot
+    return result
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+import os
+
+try:
+    import app
+    from async_fetcher import (
+        fetch_exchange_data_async, fetch_exchange_rates_async, fetch_oil_data_async,
+        fetch_oil_series_async, gather_bounded, get_exchange_api_key_async,
+    )
+    from async_http import AsyncHTTPSession
+    from env import env_flag
+    from fetcher import get_fetch_date
+    from metrics import start_invocation
+    from retry import set_deadline_from_context
+except ImportError:
+    from src import app
+    from src.async_fetcher import (
+        fetch_exchange_data_async, fetch_exchange_rates_async, fetch_oil_data_async,
+        fetch_oil_series_async, gather_bounded, get_exchange_api_key_async,
+    )
+    from src.async_http import AsyncHTTPSession
+    from src.env import env_flag
+    from src.fetcher import ExtractionError, get_fetch_date
+    from src.metrics import start_invocation
+    from src.retry import set_deadline_from_context
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def lambda_handler(event, context):
+    """
+    Event-loop entry point (handler "async_app.lambda_handler"), equivalent to
+    app.lambda_handler: same events, results and metrics.
+
+    Upstream requests are coroutines on one pooled AsyncHTTPSession instead of
+    threads, at most ASYNC_MAX_CONCURRENCY (default 64) in flight, so backfills
+    and multi-source runs can keep hundreds of requests concurrent. AWS calls
+    (SSM, Secrets Manager, DynamoDB, S3) stay on boto3 in worker threads.
+    """
+    start_invocation()
+    set_deadline_from_context(context)
+    return app.finish_invocation(event, context, asyncio.run(_handle_async(event)))
+
+
+def _exchange_fetcher(session, exchange_api, rates_api, currencies):
+    """
+    Coroutine form of app.exchange_fetcher:
+    fetch(date=None, api_key=None) -> (date_iso, exchange_rate, exchange_rates).
+    """
+    if not currencies:
+        async def fetch(**kwargs):
+            date_iso, rate = await fetch_exchange_data_async(session, exchange_api, **kwargs)
+            return date_iso, rate, None
+    else:
+        async def fetch(**kwargs):
+            date_iso, rates = await fetch_exchange_rates_async(
+                session, exchange_api, currencies, rates_url=rates_api, **kwargs,
+            )
+            return date_iso, rates[currencies[0]], rates
+    return fetch
+
+
+async def _handle_async(event):
+    logger.info("Starting async fetch run with event: %s", json.dumps(event))
+
+    store, error = await asyncio.to_thread(app.resolve_store)
+    if error is not None:
+        return error
+    oil_api = store.get("oil_api")
+    ddb_table = os.environ.get("DDB_TABLE_NAME", "OilPrices")
+    currencies = app.exchange_currencies()
+
+    session = AsyncHTTPSession()
+    try:
+        fetch_exchange = _exchange_fetcher(session, store.get("exchange_api"), store.get("exchange_rates_api"), currencies)
+
+        backfill = (event or {}).get("backfill")
+        if backfill is not None:
+            dates, error = app.backfill_request(backfill, oil_api)
+            if error is not None:
+                return error
+            return await _guarded(
+                _run_backfill(session, fetch_exchange, oil_api, ddb_table, *dates), "backfill",
+            )
+
+        idempotent = env_flag("IDEMPOTENT_WRITES")
+        if store.get("sources"):
+            sources, error = app.configured_sources(store)
+            if error is not None:
+                return error
+            return await _guarded(
+                _run_sources(session, sources, fetch_exchange, ddb_table, currencies,
+                             app.speculative_enabled(event), idempotent),
+                "sources run",
+            )
+
+        return await _guarded(
+            _run_day(session, fetch_exchange, oil_api, ddb_table, currencies,
+                     app.speculative_enabled(event), idempotent),
+            "lambda run",
+        )
+    finally:
+        await session.close()
+
+
+async def _guarded(run, label):
+    """
+    Await a run, mapping failures to error results (see app.error_result).
+    """
+    try:
+        return await run
+    except Exception as e:
+        return app.error_result(e, label)
+
+
+async def _discard(task):
+    """
+    Cancel a speculative task whose result is not needed (a finished one is
+    only collected, so its error is not reported as never retrieved).
+    """
+    if task is None:
+        return
+    if not task.done():
+        logger.info("Discarding speculative exchange fetch")
+        task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def _run_day(session, fetch_exchange, oil_api, ddb_table, currencies, speculative=False, idempotent=False):
+    exchange_task = asyncio.create_task(fetch_exchange()) if speculative else None
+    try:
+        oil_source_date, oil_val = await fetch_oil_data_async(session, oil_api)
+        expected_date = get_fetch_date()
+        early = await asyncio.to_thread(
+            app.check_oil_day, ddb_table, oil_source_date, oil_val, expected_date, currencies, idempotent,
+        )
+        if early is not None:
+            return early
+        exchange = await exchange_task if exchange_task is not None else await fetch_exchange()
+    finally:
+        await _discard(exchange_task)
+    return await asyncio.to_thread(app.persist_day, ddb_table, expected_date, oil_val, exchange, idempotent)
+
+
+async def _run_backfill(session, fetch_exchange, oil_api, ddb_table, start_date, end_date):
+    """
+    app.run_backfill with every exchange rate requested concurrently
+    (bounded by ASYNC_MAX_CONCURRENCY) instead of BACKFILL_MAX_WORKERS threads.
+    """
+    history = await fetch_oil_series_async(session, oil_api)
+    oil_by_date, no_oil_price = app.select_backfill_dates(history, start_date, end_date)
+    if not oil_by_date:
+        return app.empty_backfill_result(start_date, end_date, None, no_oil_price)
+
+    dates = sorted(oil_by_date)
+    api_key = await get_exchange_api_key_async()
+    logger.info("Backfilling %d dates concurrently", len(dates))
+
+    async def fetch_rate(date_str):
+        return await fetch_exchange(date=date_str, api_key=api_key)
+
+    outcomes = list(zip(dates, await gather_bounded(fetch_rate, dates)))
+    return await asyncio.to_thread(
+        app.persist_backfill, ddb_table, oil_by_date, outcomes, start_date, end_date, None, no_oil_price,
+    )
+
+
+async def _fetch_source(session, source):
+    # "bars" sources are read natively; other registered parsers are blocking
+    if source.parser == "bars":
+        return await fetch_oil_data_async(session, source.url)
+    return await asyncio.to_thread(source.fetch)
+
+
+async def _run_sources(session, sources, fetch_exchange, ddb_table, currencies, speculative=False, idempotent=False):
+    """
+    app._run_sources with the sources fetched concurrently on the event loop.
+    """
+    expected_date = get_fetch_date()
+    logger.info("Fetching %d sources concurrently", len(sources))
+    exchange_task = asyncio.create_task(fetch_exchange()) if speculative else None
+    try:
+        results = await gather_bounded(lambda source: _fetch_source(session, source), sources)
+        matched, result = await asyncio.to_thread(
+            app.sort_source_outcomes, list(zip(sources, results)), expected_date, ddb_table, currencies, idempotent,
+        )
+        if not matched:
+            return app.no_source_result(result)
+        exchange = await exchange_task if exchange_task is not None else await fetch_exchange()
+    finally:
+        await _discard(exchange_task)
+    return await asyncio.to_thread(app.persist_sources, ddb_table, expected_date, matched, exchange, result)
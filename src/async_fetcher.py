@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+import os
+
+try:
+    from circuit_breaker import breaker_for
+    from fetcher import (
+        api_key_headers, attempt_timeout, cache_lookup, cache_store,
+        exchange_batch_url, exchange_day_url, get_exchange_api_key, get_fetch_date, get_secret,
+        merge_exchange_rates, parse_exchange_rate, parse_exchange_rates, parse_oil_price,
+        parse_oil_series, pin_historical_response, should_refresh_api_key, upstream_headers,
+        with_query_param,
+    )
+    from metrics import span
+    from rate_limit import limiter_for
+    from response_cache import get_response_cache
+    from retry import call_with_retry_async
+except ImportError:
+    from src.circuit_breaker import breaker_for
+    from src.fetcher import (
+        api_key_headers, attempt_timeout, cache_lookup, cache_store,
+        exchange_batch_url, exchange_day_url, get_exchange_api_key, get_fetch_date, get_secret,
+        merge_exchange_rates, parse_exchange_rate, parse_exchange_rates, parse_oil_price,
+        parse_oil_series, pin_historical_response, should_refresh_api_key, upstream_headers,
+        with_query_param,
+    )
+    from src.metrics import span
+    from src.rate_limit import limiter_for
+    from src.response_cache import get_response_cache
+    from src.retry import call_with_retry_async
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def max_concurrency() -> int:
+    """
+    Requests in flight at once per bounded gather: ASYNC_MAX_CONCURRENCY (default 64).
+    """
+    try:
+        return max(1, int(os.environ.get("ASYNC_MAX_CONCURRENCY", "64")))
+    except ValueError:
+        return 64
+
+
+async def gather_bounded(fn, items, limit=None):
+    """
+    Await fn(item) for every item, at most `limit` (default max_concurrency()) at a time.
+    Returns the results in the order of `items`; an exception raised for an item
+    is returned in its place instead of cancelling the others.
+    """
+    semaphore = asyncio.Semaphore(limit or max_concurrency())
+
+    async def run(item):
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+
+async def _cache_io(fn, *args):
+    """
+    Call a response cache function (fetcher.cache_lookup, cache_store,
+    pin_historical_response) in a worker thread, since it reads or writes the
+    cache directory; without RESPONSE_CACHE it is called directly.
+    """
+    if get_response_cache() is None:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+async def _fetch_json_async(session, url, timeout=None, headers=None):
+    """
+    Coroutine form of fetcher._fetch_json on an async_http.AsyncHTTPSession:
+    same retries, per-attempt timeout, response cache, rate limits and circuit breakers.
+    """
+    logger.info("fetching URL %s, with header : %s", url, headers is not None)
+    try:
+        cache, cached = await _cache_io(cache_lookup, url)
+        if cached is not None and cached.is_fresh():
+            with span("json"):
+                return json.loads(cached.body)
+        req_headers = upstream_headers(headers, cached)
+
+        limiter = limiter_for(url)
+        breaker = breaker_for(url)
+
+        async def attempt():
+            if breaker is not None:
+                await breaker.before_async(f"GET {url}")
+            if limiter is not None:
+                await limiter.acquire_async(f"GET {url}")
+            try:
+                resp = await session.get(url, headers=req_headers, timeout=attempt_timeout(session, timeout))
+            except Exception as e:
+                if limiter is not None:
+                    limiter.observe(e)
+                if breaker is not None:
+                    await breaker.record_async(e)
+                raise
+            if breaker is not None:
+                await breaker.record_async()
+            return resp
+
+        with span("http"):
+            resp = await call_with_retry_async(attempt, description=f"GET {url}")
+
+        body = await _cache_io(cache_store, cache, cached, url, resp)
+        with span("json"):
+            return json.loads(body)
+    except Exception as e:
+        logger.error("Error fetching URL %s: %s", url, e)
+        raise
+
+
+async def get_secret_async(secret_name):
+    """
+    get_secret without blocking the event loop: the cached value is returned
+    directly, a Secrets Manager lookup runs in a worker thread.
+    """
+    return await asyncio.to_thread(get_secret, secret_name)
+
+
+async def get_exchange_api_key_async(force_refresh=False):
+    """
+    Coroutine form of fetcher.get_exchange_api_key.
+    """
+    return await asyncio.to_thread(get_exchange_api_key, force_refresh)
+
+
+async def fetch_oil_data_async(session, url):
+    """
+    Coroutine form of fetcher.fetch_oil_data (the whole response is read; OIL_STREAMING
+    applies to the blocking fetcher only).
+    Returns: (date_iso, price_decimal)
+    """
+    resp = await _fetch_json_async(session, url)
+    with span("parse"):
+        return parse_oil_price(resp)
+
+
+async def fetch_oil_series_async(session, url):
+    """
+    Coroutine form of fetcher.fetch_oil_series.
+    Returns: OilSeries covering every bar in the response.
+    """
+    resp = await _fetch_json_async(session, url)
+    with span("parse"):
+        return parse_oil_series(resp)
+
+
+async def _fetch_exchange_json_async(session, url, api_key=None):
+    """
+    Coroutine form of fetcher._fetch_exchange_json, including the single retry
+    with a refreshed key after HTTP 401/403.
+    """
+    key_from_cache = api_key is None
+    if key_from_cache:
+        api_key = await get_exchange_api_key_async()
+
+    try:
+        return await _fetch_json_async(session, url, headers=api_key_headers(api_key))
+    except Exception as e:
+        if not should_refresh_api_key(e, key_from_cache):
+            raise
+        fresh_key = await get_exchange_api_key_async(force_refresh=True)
+        if not fresh_key or fresh_key == api_key:
+            raise
+        return await _fetch_json_async(session, url, headers=api_key_headers(fresh_key))
+
+
+async def fetch_exchange_data_async(session, url, date=None, api_key=None):
+    """
+    Coroutine form of fetcher.fetch_exchange_data.
+    Returns: (date_iso, rate_decimal)
+    """
+    if date is None:
+        date = get_fetch_date()
+    url_with_date = exchange_day_url(url, date)
+    resp = await _fetch_exchange_json_async(session, url_with_date, api_key=api_key)
+    date_iso, rate = parse_exchange_rate(resp)
+    await _cache_io(pin_historical_response, url_with_date, date, date_iso)
+    return date_iso, rate
+
+
+async def fetch_exchange_rates_async(session, url, currencies, date=None, api_key=None, rates_url=None):
+    """
+    Coroutine form of fetcher.fetch_exchange_rates: one batched request with
+    `rates_url`, otherwise one concurrent request per currency.
+    Returns: (date_iso, {currency: rate_decimal})
+    """
+    if date is None:
+        date = get_fetch_date()
+
+    if rates_url:
+        batch_url = exchange_batch_url(rates_url, currencies, date)
+        resp = await _fetch_exchange_json_async(session, batch_url, api_key=api_key)
+        date_iso, rates = parse_exchange_rates(resp, currencies)
+        await _cache_io(pin_historical_response, batch_url, date, date_iso)
+        return date_iso, rates
+
+    if api_key is None:
+        api_key = await get_exchange_api_key_async()
+
+    async def fetch_one(currency):
+        return await fetch_exchange_data_async(
+            session, with_query_param(url, "to", currency), date=date, api_key=api_key,
+        )
+
+    results = await gather_bounded(fetch_one, currencies)
+    for outcome in results:
+        if isinstance(outcome, Exception):
+            raise outcome
+    return merge_exchange_rates(currencies, results)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import asyncio
+import http.client
+import io
+import logging
+import ssl
+import urllib.error
+
+try:
+    from http_client import (
+        MAX_REDIRECTS, Response, decode_body, default_timeouts, redirect, request_headers, request_target,
+    )
+    from metrics import add
+except ImportError:
+    from src.http_client import (
+        MAX_REDIRECTS, Response, decode_body, default_timeouts, redirect, request_headers, request_target,
+    )
+    from src.metrics import add
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Longest status line or header line accepted from a server
+_MAX_LINE = 64 * 1024
+
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncHTTPSession:
+    """
+    Minimal asyncio HTTP/1.1 client with keep-alive connection pooling, the
+    coroutine counterpart of http_client.HTTPSession.
+
+    Connections are pooled per (scheme, host, port) and reused by later requests;
+    each in-flight request holds only its connection and, once read, its body.
+    Responses are gzip/deflate-decoded and status codes >= 400 raise
+    urllib.error.HTTPError, so retry classification is the same as for the
+    blocking client. Timeouts default to HTTP_CONNECT_TIMEOUT (5) and
+    HTTP_READ_TIMEOUT (10) seconds.
+
+    A session belongs to the event loop it is used on; close it before the loop ends.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_idle_per_host=32):
+        self.connect_timeout, self.read_timeout = default_timeouts(connect_timeout, read_timeout)
+        self.max_idle_per_host = max_idle_per_host
+        self.connections_opened = 0
+        self.requests_sent = 0
+        self._idle = {}
+        self._ssl = None
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        if scheme == "https" and self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self._ssl if scheme == "https" else None, limit=_MAX_LINE),
+            self.connect_timeout,
+        )
+        self.connections_opened += 1
+        add("http_connections")
+        return _Connection(reader, writer)
+
+    async def _exchange(self, conn, method, target, headers, read_timeout):
+        """
+        Send a request on `conn` and read the whole response.
+        Returns (status, reason, headers, raw_body, keep_alive).
+        """
+        lines = [f"{method} {target} HTTP/1.1"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await conn.writer.drain()
+
+        reader = conn.reader
+        status_line = await asyncio.wait_for(reader.readline(), read_timeout)
+        if not status_line:
+            raise http.client.RemoteDisconnected("remote end closed connection without response")
+        try:
+            version, status, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+            status = int(status)
+        except ValueError:
+            raise http.client.BadStatusLine(status_line)
+
+        raw_headers = []
+        while True:
+            line = await asyncio.wait_for(reader.readline(), read_timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            raw_headers.append(line)
+        message = http.client.parse_headers(io.BytesIO(b"".join(raw_headers) + b"\r\n"))
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif "chunked" in (message.get("Transfer-Encoding") or "").lower():
+            body = await self._read_chunked(reader, read_timeout)
+        elif message.get("Content-Length") is not None:
+            body = await asyncio.wait_for(reader.readexactly(int(message["Content-Length"])), read_timeout)
+        else:
+            body = await asyncio.wait_for(reader.read(), read_timeout)
+            return status, reason[0] if reason else "", message, body, False
+
+        keep_alive = version == "HTTP/1.1" and (message.get("Connection") or "").lower() != "close"
+        return status, reason[0] if reason else "", message, body, keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader, read_timeout):
+        parts = []
+        while True:
+            size_line = await asyncio.wait_for(reader.readline(), read_timeout)
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Trailers, up to the empty line
+                while (await asyncio.wait_for(reader.readline(), read_timeout)) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(parts)
+            parts.append(await asyncio.wait_for(reader.readexactly(size), read_timeout))
+            await asyncio.wait_for(reader.readexactly(2), read_timeout)
+
+    async def _send(self, key, method, target, headers, read_timeout):
+        pool = self._idle.get(key)
+        conn = pool.pop() if pool else None
+        reused = conn is not None
+        if conn is None:
+            conn = await self._connect(key)
+        try:
+            response = await self._exchange(conn, method, target, headers, read_timeout)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+            conn.close()
+            if not reused:
+                raise
+            # The server dropped the idle connection; retry once on a fresh one
+            conn = await self._connect(key)
+            try:
+                response = await self._exchange(conn, method, target, headers, read_timeout)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+
+        keep_alive = response[4]
+        idle = self._idle.setdefault(key, [])
+        if keep_alive and len(idle) < self.max_idle_per_host:
+            idle.append(conn)
+        else:
+            conn.close()
+        return response
+
+    async def request(self, method, url, headers=None, timeout=None) -> Response:
+        """
+        Send a request and return an http_client.Response. `timeout` overrides the
+        read timeout. Follows up to 5 redirects. Raises urllib.error.HTTPError for
+        status >= 400 and OSError/http.client exceptions on network failures.
+        """
+        read_timeout = timeout if timeout is not None else self.read_timeout
+        send_headers = request_headers(headers)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            key, target, host = request_target(url)
+            status, reason, message, raw, _ = await self._send(
+                key, method, target, dict(send_headers, Host=host), read_timeout,
+            )
+            self.requests_sent += 1
+            add("http_requests")
+            add("http_bytes", len(raw))
+
+            next_request = redirect(url, method, status, message.get("Location"))
+            if next_request is None:
+                body = decode_body(raw, message.get("Content-Encoding"))
+                if status >= 400:
+                    raise urllib.error.HTTPError(url, status, reason, message, io.BytesIO(body))
+                return Response(url, status, message, body)
+            url, method = next_request
+
+        raise urllib.error.HTTPError(url, status, "too many redirects", message, io.BytesIO(b""))
+
+    async def get(self, url, headers=None, timeout=None) -> Response:
+        return await self.request("GET", url, headers=headers, timeout=timeout)
+
+    async def close(self):
+        pools, self._idle = self._idle, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import logging
+import threading
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# boto3 itself is imported on first use: importing it and building clients is a large
+# share of cold-start time, and runs that return early never need them. For the same
+# reason botocore exceptions are imported where they are caught, not at module level.
+_clients = {}
+_resources = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name: str):
+    """
+    Return the shared boto3 client for a service, creating it on first use.
+    Clients are kept for the lifetime of the container (warm invocations reuse them).
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        # boto3's default session is not thread-safe, so creation is serialized
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                import boto3
+                logger.debug("Creating boto3 client for %s", service_name)
+                client = _clients[service_name] = boto3.client(service_name)
+    return client
+
+
+def get_resource(service_name: str):
+    """
+    Return the shared boto3 service resource (e.g. "dynamodb"), creating it on first use.
+    """
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                import boto3
+                logger.debug("Creating boto3 resource for %s", service_name)
+                resource = _resources[service_name] = boto3.resource(service_name)
+    return resource
+
+
+def set_client(service_name: str, client):
+    """
+    Register a client to be returned by get_client (local stand-ins, tests).
+    """
+    with _lock:
+        _clients[service_name] = client
+
+
+def reset():
+    """
+    Forget every cached client and resource.
+    """
+    with _lock:
+        _clients.clear()
+        _resources.clear()
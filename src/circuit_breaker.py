@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+from datetime import datetime
+from decimal import Decimal
+
+try:
+    from env import env_flag, env_float
+    from metrics import add
+    from retry import is_retryable
+    from storage import get_table
+except ImportError:
+    from src.env import env_flag, env_float
+    from src.metrics import add
+    from src.retry import is_retryable
+    from src.storage import get_table
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Patched in tests. Wall-clock time, since open_until is shared between containers
+_clock = time.time
+
+# The shared state of a host lives in one item: pk "CIRCUIT#<host>", date "state"
+CIRCUIT_PK_PREFIX = "CIRCUIT#"
+CIRCUIT_SORT_KEY = "state"
+
+# _put_open without a condition
+_ANY = object()
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of sending a request while the host's circuit is open."""
+
+
+def counts_as_failure(exc) -> bool:
+    """
+    Whether an error raised by a request means the host is failing: timeouts,
+    connection errors and 5xx responses. Throttling (429, see rate_limit.py) and
+    other 4xx responses are answers from a working host.
+    """
+    if isinstance(exc, CircuitOpen):
+        return False
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code >= 500 or exc.code == 408
+    return is_retryable(exc)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for the requests to one upstream host.
+
+    Parameters:
+      - host: lower-case host name (or "host:port")
+      - failure_threshold: consecutive failed requests that open the circuit
+      - cooldown_seconds: how long an open circuit fails requests fast
+      - table_name: DynamoDB table sharing the state between containers (None: this container only)
+      - sync_seconds: how often the shared state is re-read
+
+    Closed, requests go through and failures (see counts_as_failure) are counted;
+    any answer from the host resets the count. Once `failure_threshold` is
+    reached the circuit opens and before() raises CircuitOpen, without a request,
+    until the cool-down has passed. It is then half-open: one probe request is let
+    through, the others still fail fast. The probe's success closes the circuit,
+    its failure opens it for another cool-down.
+
+    Breakers live at module level, so the state survives across warm invocations.
+    With a table, opening writes the item pk "CIRCUIT#<host>", date "state" with
+    the time it stays open until, and closing deletes it. Other containers pick it
+    up within `sync_seconds` and fail fast too, and only the container whose
+    conditional write claims the half-open probe sends it. Failures are counted
+    per container. DynamoDB errors are logged and the breaker carries on with its
+    local state.
+    """
+
+    def __init__(self, host, failure_threshold=5, cooldown_seconds=60.0, table_name=None, sync_seconds=10.0):
+        self.host = host
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown_seconds = float(cooldown_seconds)
+        self.table_name = table_name
+        self.sync_seconds = float(sync_seconds)
+        self.opened_count = 0
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = None
+        self._probing = False
+        # open_until of the shared item when last read or written (None: no item)
+        self._shared_until = None
+        self._synced_at = None
+
+    @property
+    def state(self) -> str:
+        if self._open_until is None:
+            return "closed"
+        if self._probing or _clock() >= self._open_until:
+            return "half_open"
+        return "open"
+
+    def settings(self) -> tuple:
+        return (self.failure_threshold, self.cooldown_seconds, self.table_name, self.sync_seconds)
+
+    def _key(self):
+        return {"pk": CIRCUIT_PK_PREFIX + self.host, "date": CIRCUIT_SORT_KEY}
+
+    def _table(self):
+        return get_table(self.table_name)
+
+    def _sync_due(self, now) -> bool:
+        return self.table_name is not None and (self._synced_at is None or now - self._synced_at >= self.sync_seconds)
+
+    # DynamoDB calls below run without holding self._lock, so callers of the same
+    # host never queue behind a round trip; the results are merged under the lock.
+
+    def _read_shared(self):
+        """
+        (ok, open_until) of the shared item: open_until is None when there is no
+        item, ok is False when it could not be read.
+        """
+        try:
+            item = self._table().get_item(Key=self._key()).get("Item")
+        except Exception as e:
+            logger.warning("Could not read circuit state of %s: %s", self.host, e)
+            return False, None
+        return True, float(item["open_until"]) if item else None
+
+    def _adopt(self, shared_until):
+        """
+        Merge the shared state (must hold self._lock): an item means open until
+        its open_until, no item closed. A probe in flight keeps the local state.
+        """
+        self._shared_until = shared_until
+        if self._probing:
+            return
+        if shared_until is not None:
+            self._open_until = shared_until
+        elif self._open_until is not None:
+            logger.info("Circuit for %s was closed by another container", self.host)
+            self._open_until = None
+            self._failures = 0
+
+    def _sync(self, now):
+        with self._lock:
+            if not self._sync_due(now):
+                return
+            # Claimed before reading, so concurrent callers do not read it too
+            self._synced_at = now
+        ok, shared_until = self._read_shared()
+        if ok:
+            with self._lock:
+                self._adopt(shared_until)
+
+    def _put_open(self, open_until, expected=_ANY) -> str:
+        """
+        Store open_until in the shared item. With `expected`, only when the item
+        still holds that open_until (None: no item). Returns "stored", "conflict"
+        or "error".
+        """
+        kwargs = {}
+        if expected is None:
+            kwargs["ConditionExpression"] = "attribute_not_exists(pk)"
+        elif expected is not _ANY:
+            kwargs["ConditionExpression"] = "#u = :u"
+            kwargs["ExpressionAttributeNames"] = {"#u": "open_until"}
+            kwargs["ExpressionAttributeValues"] = {":u": Decimal(str(round(expected, 3)))}
+        from botocore.exceptions import ClientError
+        try:
+            self._table().put_item(
+                Item=dict(self._key(), open_until=Decimal(str(round(open_until, 3))),
+                          updated_at=datetime.utcnow().isoformat() + "Z"),
+                **kwargs,
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return "conflict"
+            logger.warning("Could not store circuit state of %s: %s", self.host, e)
+            return "error"
+        except Exception as e:
+            logger.warning("Could not store circuit state of %s: %s", self.host, e)
+            return "error"
+        return "stored"
+
+    def _stored(self, open_until, now):
+        with self._lock:
+            self._shared_until = round(open_until, 3)
+            self._synced_at = now
+
+    def _reject(self, name):
+        add("circuit_rejected")
+        raise CircuitOpen(f"circuit for {self.host} is open — not sending {name}")
+
+    def before(self, name="request"):
+        """
+        Call before sending a request. Raises CircuitOpen while the circuit is
+        open, or half-open with the probe taken by another caller.
+        """
+        now = _clock()
+        if self._sync_due(now):
+            self._sync(now)
+        with self._lock:
+            if self._open_until is None:
+                return
+            if self._probing or now < self._open_until:
+                self._reject(name)
+            # Cool-down over: take the probe, pushing open_until on for everyone else
+            self._probing = True
+            self._open_until = open_until = now + self.cooldown_seconds
+            expected = self._shared_until
+        if self.table_name is not None:
+            outcome = self._put_open(open_until, expected)
+            if outcome == "stored":
+                self._stored(open_until, now)
+            elif outcome == "conflict":
+                # Another container changed the item first: adopt what it wrote
+                ok, shared_until = self._read_shared()
+                with self._lock:
+                    self._probing = False
+                    self._synced_at = now
+                    if ok:
+                        self._adopt(shared_until)
+                    if self._open_until is None:
+                        return
+                self._reject(name)
+        logger.info("Circuit for %s half-open — probing with %s", self.host, name)
+
+    def record(self, exc=None):
+        """
+        Call with the request's outcome: None on success, or the exception it raised.
+        """
+        if exc is not None and counts_as_failure(exc):
+            self._failure()
+        else:
+            self._success()
+
+    def _success(self):
+        with self._lock:
+            self._failures = 0
+            if self._open_until is None:
+                return
+            self._open_until = None
+            self._probing = False
+        logger.info("Circuit for %s closed", self.host)
+        if self.table_name is None:
+            return
+        try:
+            self._table().delete_item(Key=self._key())
+        except Exception as e:
+            logger.warning("Could not clear circuit state of %s: %s", self.host, e)
+            return
+        with self._lock:
+            self._shared_until = None
+            self._synced_at = _clock()
+
+    def _failure(self):
+        with self._lock:
+            if self._open_until is not None and not self._probing:
+                # Sent before the circuit opened
+                return
+            self._failures += 1
+            if not self._probing and self._failures < self.failure_threshold:
+                return
+            now = _clock()
+            self._open_until = open_until = now + self.cooldown_seconds
+            self._probing = False
+            self._failures = 0
+            self.opened_count += 1
+        add("circuit_opened")
+        logger.warning("Circuit for %s opened for %.0fs after repeated failures", self.host, self.cooldown_seconds)
+        if self.table_name is not None and self._put_open(open_until) == "stored":
+            self._stored(open_until, now)
+
+    def _may_write(self, exc=None) -> bool:
+        # Whether record(exc) can reach DynamoDB
+        if self.table_name is None:
+            return False
+        if exc is not None and counts_as_failure(exc):
+            return True
+        return self._open_until is not None
+
+    async def before_async(self, name="request"):
+        """
+        Coroutine form of before; a DynamoDB read or write runs in a worker thread.
+        """
+        now = _clock()
+        if self.table_name is not None and (
+            self._sync_due(now) or (self._open_until is not None and not self._probing and now >= self._open_until)
+        ):
+            import asyncio
+            await asyncio.to_thread(self.before, name)
+        else:
+            self.before(name)
+
+    async def record_async(self, exc=None):
+        """
+        Coroutine form of record; a DynamoDB write runs in a worker thread.
+        """
+        if self._may_write(exc):
+            import asyncio
+            await asyncio.to_thread(self.record, exc)
+        else:
+            self.record(exc)
+
+
+def _enabled() -> bool:
+    return env_flag("CIRCUIT_BREAKER")
+
+
+def _breaker_settings():
+    shared = env_flag("CIRCUIT_SHARED", True)
+    return {
+        "failure_threshold": max(1, int(env_float("CIRCUIT_FAILURE_THRESHOLD", 5))),
+        "cooldown_seconds": env_float("CIRCUIT_COOLDOWN_SECONDS", 60),
+        "table_name": os.environ.get("DDB_TABLE_NAME", "OilPrices") if shared else None,
+        "sync_seconds": env_float("CIRCUIT_SYNC_SECONDS", 10),
+    }
+
+
+# Breakers by lower-case host (or "host:port"), kept across warm invocations
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url):
+    """
+    The CircuitBreaker guarding requests to `url`'s host, or None unless
+    CIRCUIT_BREAKER is true. A breaker is replaced when its settings change.
+    """
+    if not _enabled():
+        return None
+    parts = urllib.parse.urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.port is not None:
+        host = f"{host}:{parts.port}"
+    settings = _breaker_settings()
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None or breaker.settings() != tuple(settings.values()):
+            breaker = _breakers[host] = CircuitBreaker(host, **settings)
+        return breaker
+
+
+def reset_breakers():
+    """
+    Forget every breaker's state in this container.
+    """
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+import os
+
+# Values of a boolean environment variable that read as true; anything else is false
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def env_flag(name, default=False):
+    """
+    Read a boolean environment variable ("1", "true", "yes", "on" are true).
+    Returns default when the variable is not set.
+    """
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in TRUE_VALUES
+
+
+def env_float(name, default):
+    """
+    Read a numeric environment variable, falling back to default when it is
+    not set or not a number.
+    """
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
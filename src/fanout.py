@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+import json
+import logging
+import os
+from datetime import date, timedelta
+
+try:
+    import app
+    from aws_clients import get_client
+    from metrics import add, emit, start_invocation
+    from retry import call_with_retry, remaining_time, set_deadline_from_context
+    from series import OilSeries
+    from sources import load_sources
+except ImportError:
+    from src import app
+    from src.aws_clients import get_client
+    from src.metrics import add, emit, start_invocation
+    from src.retry import call_with_retry, remaining_time, set_deadline_from_context
+    from src.series import OilSeries
+    from src.sources import load_sources
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# SendMessageBatch accepts at most 10 entries and 256 KiB of message bodies
+_SEND_BATCH = 10
+_MAX_BATCH_BYTES = 256 * 1024
+
+
+def chunk_range(start_date: str, end_date: str, chunk_days: int) -> list:
+    """
+    Split the inclusive range [start_date, end_date] into consecutive
+    (start_iso, end_iso) chunks of at most `chunk_days` days.
+    """
+    if chunk_days < 1:
+        raise ValueError("chunk_days must be at least 1")
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    chunks = []
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=chunk_days - 1))
+        chunks.append((start.isoformat(), chunk_end.isoformat()))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def _chunk_days(event):
+    raw = event.get("chunk_days", os.environ.get("FANOUT_CHUNK_DAYS", "30"))
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("chunk_days must be an integer")
+
+
+def _fanout_sources(event, store):
+    """
+    The sources to backfill: [None] (the default oil_api series) unless the store
+    lists "sources". Then every source is included, or only the names in the
+    event's "sources" list. Only "bars" sources carry a history.
+    """
+    if not store.get("sources"):
+        if event.get("sources"):
+            raise ValueError("the store has no sources")
+        return [None]
+    sources = {source.name: source for source in load_sources(store["sources"])}
+    wanted = event.get("sources") or list(sources)
+    if not isinstance(wanted, list):
+        raise ValueError("sources must be a list of source names")
+    unknown = [name for name in wanted if name not in sources]
+    if unknown:
+        raise ValueError(f"unknown sources: {', '.join(map(str, unknown))}")
+    not_history = [name for name in wanted if sources[name].parser != "bars"]
+    if not_history:
+        raise ValueError(f"sources without a bars history cannot be backfilled: {', '.join(not_history)}")
+    return [sources[name] for name in wanted]
+
+
+def _send_batches(bodies):
+    """
+    Group JSON message bodies into SendMessageBatch-sized lists.
+    """
+    batch, size = [], 0
+    for body in bodies:
+        if batch and (len(batch) == _SEND_BATCH or size + len(body) > _MAX_BATCH_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(body)
+        size += len(body)
+    if batch:
+        yield batch
+
+
+def enqueue_chunks(queue_url: str, messages, max_attempts: int = 3) -> dict:
+    """
+    Send message bodies (dicts, JSON-encoded) to the queue with SendMessageBatch,
+    up to 10 (and 256 KiB) per request. Entries SQS reports as failed are re-sent
+    up to `max_attempts` times in all. Returns {"enqueued": n, "failed": n}.
+    Raises ValueError if a body alone exceeds the 256 KiB SQS message limit.
+    """
+    bodies = [json.dumps(body, separators=(",", ":")) for body in messages]
+    too_large = sum(1 for body in bodies if len(body) > _MAX_BATCH_BYTES)
+    if too_large:
+        raise ValueError(f"{too_large} chunks exceed the {_MAX_BATCH_BYTES} byte SQS message limit")
+    client = get_client("sqs")
+    enqueued = 0
+    failed = 0
+    for batch in _send_batches(bodies):
+        pending = [{"Id": str(i), "MessageBody": body} for i, body in enumerate(batch)]
+        for _ in range(max_attempts):
+            resp = call_with_retry(client.send_message_batch, QueueUrl=queue_url, Entries=pending,
+                                   description="send_message_batch")
+            enqueued += len(resp.get("Successful", []))
+            failed_ids = {entry["Id"] for entry in resp.get("Failed", [])}
+            pending = [entry for entry in pending if entry["Id"] in failed_ids]
+            if not pending:
+                break
+            logger.warning("SQS rejected %d of the batch's messages — re-sending", len(pending))
+        failed += len(pending)
+    return {"enqueued": enqueued, "failed": failed}
+
+
+def coordinator_handler(event, context):
+    """
+    Fan a large backfill out over SQS (handler "fanout.coordinator_handler").
+
+    Event: {"backfill": {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
+            "chunk_days": 30, "sources": ["brent", ...]}
+
+    The range is split into chunks of chunk_days (default FANOUT_CHUNK_DAYS, 30)
+    and one message per chunk and source is sent to BACKFILL_QUEUE_URL, for
+    worker_handler to process. "sources" defaults to every configured source,
+    or to the default series when the store has none.
+
+    Each series' oil history is requested once, here, and every message carries
+    the bars of its chunk, so the workers only request exchange rates.
+    """
+    start_invocation()
+    set_deadline_from_context(context)
+    result = _coordinate(event or {}, context)
+    add("chunks_enqueued", result.get("enqueued", 0))
+    emit(context, {"status": result.get("status"), "mode": "fanout"})
+    return result
+
+
+def _coordinate(event, context):
+    logger.info("Starting backfill fan-out with event: %s", json.dumps(event))
+    queue_url = os.environ.get("BACKFILL_QUEUE_URL")
+    if not queue_url:
+        logger.error("BACKFILL_QUEUE_URL is not set")
+        return {"status": "error", "message": "BACKFILL_QUEUE_URL is not set"}
+
+    store, error = app.resolve_store()
+    if error is not None:
+        return error
+    try:
+        start_date, end_date = app.parse_backfill_range(event.get("backfill"))
+        chunks = chunk_range(start_date, end_date, _chunk_days(event))
+        sources = _fanout_sources(event, store)
+    except ValueError as e:
+        logger.error("Invalid fan-out request: %s", e)
+        return {"status": "error", "message": f"invalid backfill request: {e}"}
+    if sources == [None] and not store.get("oil_api"):
+        return {"status": "error", "message": "invalid backfill request: store has no oil_api"}
+
+    request_id = getattr(context, "aws_request_id", None)
+    messages = []
+    for source in sources:
+        try:
+            history = app.fetch_oil_series(source.url if source is not None else store["oil_api"])
+        except Exception as e:
+            return app.error_result(e, "fan-out history fetch")
+        for chunk_start, chunk_end in chunks:
+            body = {
+                "start_date": chunk_start,
+                "end_date": chunk_end,
+                "bars": [[d, str(price)] for d, price in history.slice(chunk_start, chunk_end).items()],
+            }
+            if source is not None:
+                body["source"] = source.name
+            if isinstance(request_id, str):
+                body["request_id"] = request_id
+            messages.append(body)
+
+    try:
+        stats = enqueue_chunks(queue_url, messages)
+    except ValueError as e:
+        logger.error("Backfill chunks too large: %s", e)
+        return {"status": "error", "message": f"invalid backfill request: {e}; lower chunk_days"}
+    except Exception as e:
+        logger.error("Failed to enqueue backfill chunks: %s", e)
+        return {"status": "error", "message": "failed to enqueue chunks"}
+    logger.info("Enqueued %d of %d backfill chunks", stats["enqueued"], len(messages))
+    return {
+        "status": "ok" if not stats["failed"] else "error",
+        "mode": "fanout",
+        "start_date": start_date,
+        "end_date": end_date,
+        "chunks": len(messages),
+        "enqueued": stats["enqueued"],
+        "failed": stats["failed"],
+    }
+
+
+def _min_remaining():
+    try:
+        return float(os.environ.get("WORKER_MIN_REMAINING_SECONDS", "20"))
+    except ValueError:
+        return 20.0
+
+
+def worker_handler(event, context):
+    """
+    Process backfill chunks from an SQS event (handler "fanout.worker_handler").
+
+    Each record's body is {"start_date", "end_date", "bars"[, "source"]
+    [, "request_id"]}, backfilled like a {"backfill": ...} event of lambda_handler
+    from the chunk's bars (the oil history is requested only for a message
+    without them); "request_id", the coordinator's, is logged with each chunk
+    to tie the workers' logs to the fan-out. Records that failed (errors,
+    failed exchange requests or unwritten items) are returned in
+    batchItemFailures so SQS redelivers only them; days whose exchange rate is
+    for another date are not retried. Records left when less than
+    WORKER_MIN_REMAINING_SECONDS (default 20) of the invocation remain are
+    returned unprocessed. Requires ReportBatchItemFailures on the event source
+    mapping.
+    """
+    start_invocation()
+    set_deadline_from_context(context)
+    records = (event or {}).get("Records") or []
+    failures = []
+    results = []
+
+    store, error = app.resolve_store()
+    if error is not None:
+        failures = [record["messageId"] for record in records]
+        results.append(dict(error))
+    else:
+        for i, record in enumerate(records):
+            remaining = remaining_time()
+            if remaining is not None and remaining < _min_remaining():
+                logger.warning("%d chunks left unprocessed: invocation is running out of time", len(records) - i)
+                failures.extend(r["messageId"] for r in records[i:])
+                break
+            result = _process_record(record, store)
+            results.append(result)
+            if _should_retry(result):
+                failures.append(record["messageId"])
+
+    add("chunks_processed", len(results))
+    add("chunks_failed", len(failures))
+    emit(context, {"status": "error" if failures else "ok", "mode": "worker"})
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]}
+
+
+def _should_retry(result):
+    return result.get("status") == "error" or bool(result.get("failed")) or bool(result.get("write_failed"))
+
+
+def _process_record(record, store):
+    """
+    Backfill one chunk message. Returns the backfill result (see app.run_backfill).
+    """
+    try:
+        body = json.loads(record["body"])
+        start_date, end_date = app.parse_backfill_range(body)
+        history = OilSeries.from_pairs(body["bars"]) if "bars" in body else None
+    except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+        logger.error("Malformed chunk message %s: %s", record.get("messageId"), e)
+        return {"status": "error", "message": f"malformed chunk: {e}"}
+
+    source = None
+    if body.get("source") is not None:
+        try:
+            matches = [s for s in load_sources(store.get("sources")) if s.name == body["source"]]
+        except ValueError as e:
+            logger.error("Invalid sources configuration: %s", e)
+            return {"status": "error", "message": f"invalid sources: {e}"}
+        if not matches:
+            logger.error("Chunk names unknown source %r", body["source"])
+            return {"status": "error", "message": f"unknown source {body['source']!r}"}
+        source = matches[0]
+    elif not store.get("oil_api"):
+        return {"status": "error", "message": "store has no oil_api"}
+
+    ddb_table = os.environ.get("DDB_TABLE_NAME", "OilPrices")
+    fetch_exchange = app.exchange_fetcher(
+        store.get("exchange_api"), store.get("exchange_rates_api"), app.exchange_currencies(),
+    )
+    label = f"{start_date}..{end_date}" + (f" ({source.name})" if source is not None else "")
+    logger.info("Backfilling chunk %s of fan-out %s", label, body.get("request_id", "unknown"))
+    try:
+        result = app.run_backfill(
+            fetch_exchange, store.get("oil_api"), ddb_table, start_date, end_date, source=source, history=history,
+        )
+    except Exception as e:
+        return app.error_result(e, f"chunk {label}")
+    logger.info("Chunk %s: %s", label, json.dumps(result, default=str))
+    return result
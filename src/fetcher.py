@@ -1,24 +1,62 @@
 #!/usr/bin/env python3
 import json
 import logging
-import urllib.request
+import re
+import time
+import urllib.error
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import os
-import boto3
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+try:
+    from aws_clients import get_client
+    from circuit_breaker import breaker_for
+    from env import env_flag
+    from http_client import get_session
+    from json_stream import decode_chunks, iter_array_items
+    from metrics import add, span
+    from rate_limit import limiter_for
+    from response_cache import freshness, get_response_cache
+    from retry import call_with_retry, remaining_time
+    from series import SeriesBuilder, exact_price
+    from ttl_cache import TTLCache
+except ImportError:
+    from src.aws_clients import get_client
+    from src.circuit_breaker import breaker_for
+    from src.env import env_flag
+    from src.http_client import get_session
+    from src.json_stream import decode_chunks, iter_array_items
+    from src.metrics import add, span
+    from src.rate_limit import limiter_for
+    from src.response_cache import freshness, get_response_cache
+    from src.retry import call_with_retry, remaining_time
+    from src.series import SeriesBuilder, exact_price
+    from src.ttl_cache import TTLCache
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Secrets survive across warm invocations for SECRET_CACHE_TTL_SECONDS (default 300)
+_secret_cache = TTLCache("api_key", "SECRET_CACHE_TTL_SECONDS")
+
 
 def get_secret(secret_name):
     """
     Retrieve a secret from AWS Secrets Manager.
     Returns the API key string, parsing JSON if needed.
+    Successful lookups are cached (see invalidate_secret to force a refresh).
     """
+    cached = _secret_cache.get(secret_name)
+    if cached is not None:
+        return cached
     try:
-        client = boto3.client('secretsmanager')
-        response = client.get_secret_value(SecretId=secret_name)
+        with span("secret"):
+            response = call_with_retry(
+                get_client('secretsmanager').get_secret_value, SecretId=secret_name, description="get_secret_value"
+            )
         secret_string = response['SecretString']
         
         # Try to parse as JSON first
@@ -26,55 +64,210 @@ def get_secret(secret_name):
             secret_json = json.loads(secret_string)
             # If it's a JSON object with a "key" field, return that
             if isinstance(secret_json, dict) and 'key' in secret_json:
-                return secret_json['key']
-            # Otherwise return the whole parsed object (shouldn't happen)
-            return secret_string
+                secret_string = secret_json['key']
+            # Otherwise return the whole string (shouldn't happen)
         except (json.JSONDecodeError, ValueError):
             # Not JSON, return as-is (plain string secret)
-            return secret_string
+            pass
+        _secret_cache.set(secret_name, secret_string)
+        return secret_string
     except Exception as e:
         logger.error(f"Error retrieving secret {secret_name}: {e}")
         return None
 
 
+def invalidate_secret(secret_name):
+    """
+    Drop a cached secret so the next get_secret call reads it from Secrets Manager.
+    """
+    _secret_cache.invalidate(secret_name)
+
+
 class ExtractionError(Exception):
     """Raised when a value or date cannot be extracted from an API response."""
 
 
-def _fetch_json(url, timeout=10, headers=None):
+# Sent with every upstream request to avoid being blocked as a bot
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def attempt_timeout(session, timeout):
+    """
+    Read timeout for one attempt: `timeout` (or the session default), capped by
+    the time left in the invocation.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    base = timeout if timeout is not None else session.read_timeout
+    return max(0.1, min(base, remaining))
+
+
+def upstream_headers(headers=None, cached=None) -> dict:
+    """
+    Request headers for an upstream API: the User-Agent, `headers`, and
+    If-None-Match when the response cache holds a stale entry with an ETag.
+    """
+    req_headers = {'User-Agent': USER_AGENT}
+    if headers:
+        req_headers.update(headers)
+    if cached is not None and cached.etag:
+        req_headers["If-None-Match"] = cached.etag
+    return req_headers
+
+
+def cache_lookup(url):
+    """
+    (cache, entry) for `url`: the response cache (None when disabled) and its
+    stored entry, if any. A fresh entry counts as a hit.
+    """
+    cache = get_response_cache()
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None and cached.is_fresh():
+        logger.info("Response cache hit for %s", url)
+        add("response_cache_hits")
+    return cache, cached
+
+
+def cache_store(cache, cached, url, resp):
+    """
+    Body text of `resp`, taken from the stale `cached` entry on a 304; the
+    response is stored (or the entry refreshed) according to its Cache-Control.
+    """
+    if cache is None:
+        return resp.text()
+    storable, lifetime = freshness(resp.headers.get("Cache-Control"))
+    expires = time.time() + lifetime
+    if resp.status == 304 and cached is not None:
+        logger.info("Response for %s not modified", url)
+        add("response_cache_revalidated")
+        cache.update(url, etag=resp.headers.get("ETag"), expires=expires)
+        return cached.body
+    add("response_cache_misses")
+    body = resp.text()
+    if storable:
+        cache.put(url, body, etag=resp.headers.get("ETag"), expires=expires)
+    return body
+
+
+def _fetch_json(url, timeout=None, headers=None):
     """
     Internal helper: fetch a URL and parse JSON. Raises on error.
+    Uses the shared keep-alive HTTP session; `timeout` overrides its read timeout.
+    Transient failures are retried with backoff, and each attempt's timeout is capped
+    by the time left in the invocation. Requests to a host listed in the store's
+    "rate_limits" first wait for its token bucket (see rate_limit.py). With
+    CIRCUIT_BREAKER=true, requests to a host that keeps failing raise
+    circuit_breaker.CircuitOpen without being sent.
+
+    With RESPONSE_CACHE=true, bodies are kept in the on-disk response cache
+    (see response_cache.py): a fresh entry (Cache-Control max-age, or pinned with
+    pin_cached_response) is returned without a request, and a stale one with an
+    ETag is revalidated with If-None-Match.
     """
     
     logger.info("fetching URL %s, with header : %s", url, headers is not None)
 
     try:
-        req = urllib.request.Request(url)
-        
-        # Add User-Agent to avoid being blocked as a bot
-        req.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        
-        # Add any custom headers
-        if headers:
-            for key, value in headers.items():
-                req.add_header(key, value)
-        
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            charset = resp.headers.get_content_charset() or "utf-8"
-            body = resp.read().decode(charset)
+        cache, cached = cache_lookup(url)
+        if cached is not None and cached.is_fresh():
+            with span("json"):
+                return json.loads(cached.body)
+        req_headers = upstream_headers(headers, cached)
+
+        session = get_session()
+        limiter = limiter_for(url)
+        breaker = breaker_for(url)
+
+        def attempt():
+            if breaker is not None:
+                breaker.before(f"GET {url}")
+            if limiter is not None:
+                limiter.acquire(f"GET {url}")
+            try:
+                resp = session.get(url, headers=req_headers, timeout=attempt_timeout(session, timeout))
+            except Exception as e:
+                if limiter is not None:
+                    limiter.observe(e)
+                if breaker is not None:
+                    breaker.record(e)
+                raise
+            if breaker is not None:
+                breaker.record()
+            return resp
+
+        with span("http"):
+            resp = call_with_retry(attempt, description=f"GET {url}")
+
+        body = cache_store(cache, cached, url, resp)
+        with span("json"):
             return json.loads(body)
     except Exception as e:
         logger.error("Error fetching URL %s: %s", url, e)
         raise
 
 
-def _parse_date_string_to_iso(raw_date):
-    """
-    Attempt to parse common date formats into ISO date (YYYY-MM-DD).
-    Returns ISO date string or None if parsing fails.
-    """
-    if not isinstance(raw_date, str):
+_MONTHS = {
+    name: i + 1
+    for i, name in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"))
+}
+_WEEKDAYS = frozenset(("mon", "tue", "wed", "thu", "fri", "sat", "sun"))
+
+# "Mon Aug 11 00:00:00 2025" (the oil API's bar format)
+_RE_CTIME = re.compile(r"([A-Za-z]{3}) ([A-Za-z]{3}) (\d{1,2}) (\d{1,2}):(\d{2}):(\d{2}) (\d{4})\Z")
+# "2025-08-13", optionally followed by "T..." (time, timezone)
+_RE_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})(?:T.*)?\Z", re.DOTALL)
+# "13 Aug 2025"
+_RE_DAY_MONTH_YEAR = re.compile(r"(\d{1,2}) ([A-Za-z]{3}) (\d{4})\Z")
+# "Aug 13 2025"
+_RE_MONTH_DAY_YEAR = re.compile(r"([A-Za-z]{3}) (\d{1,2}) (\d{4})\Z")
+
+
+def _iso(year, month, day):
+    return date(int(year), month, int(day)).isoformat()
+
+
+def _fast_ctime(raw):
+    m = _RE_CTIME.match(raw)
+    if m is None:
+        return None
+    weekday, month, day, hour, minute, second, year = m.groups()
+    if weekday.lower() not in _WEEKDAYS or int(hour) > 23 or int(minute) > 59 or int(second) > 61:
         return None
+    return _iso(year, _MONTHS[month.lower()], day)
+
+
+def _fast_iso(raw):
+    m = _RE_ISO.match(raw)
+    if m is None:
+        return None
+    year, month, day = m.groups()
+    return _iso(year, int(month), day)
+
+
+def _fast_day_month_year(raw):
+    m = _RE_DAY_MONTH_YEAR.match(raw)
+    if m is None:
+        return None
+    day, month, year = m.groups()
+    return _iso(year, _MONTHS[month.lower()], day)
+
+
+def _fast_month_day_year(raw):
+    m = _RE_MONTH_DAY_YEAR.match(raw)
+    if m is None:
+        return None
+    month, day, year = m.groups()
+    return _iso(year, _MONTHS[month.lower()], day)
+
+
+_FAST_DATE_PARSERS = (_fast_ctime, _fast_iso, _fast_day_month_year, _fast_month_day_year)
+
+# Index into _FAST_DATE_PARSERS of the parser that last matched, per source
+_date_format_hints = {}
+
+
+def _parse_date_string_to_iso_slow(raw_date):
     fmts = ("%a %b %d %H:%M:%S %Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%d %b %Y", "%b %d %Y")
     for fmt in fmts:
         try:
@@ -90,6 +283,74 @@ def _parse_date_string_to_iso(raw_date):
         return None
 
 
+def _parse_date_string_to_iso(raw_date, source=None):
+    """
+    Attempt to parse common date formats into ISO date (YYYY-MM-DD).
+    Returns ISO date string or None if parsing fails.
+
+    The canonical shapes of the supported formats are recognized with precompiled
+    regexes and converted without strptime; the parser that matched is remembered
+    per `source` (e.g. "oil") and tried first next time. Anything else (or an
+    invalid calendar date) goes through the strptime formats.
+    """
+    if not isinstance(raw_date, str):
+        return None
+    hint = _date_format_hints.get(source)
+    if hint is not None:
+        try:
+            result = _FAST_DATE_PARSERS[hint](raw_date)
+        except (KeyError, ValueError):
+            result = None
+        if result is not None:
+            return result
+    for i, parser in enumerate(_FAST_DATE_PARSERS):
+        if i == hint:
+            continue
+        try:
+            result = parser(raw_date)
+        except (KeyError, ValueError):
+            # Unknown month name or impossible date: let strptime decide
+            break
+        if result is not None:
+            _date_format_hints[source] = i
+            return result
+    return _parse_date_string_to_iso_slow(raw_date)
+
+
+def _parse_bar(bar, label, source="oil"):
+    """
+    Parse a single oil bar ([raw_date, raw_price]) into (date_iso, price_decimal).
+    `label` names the bar in error messages (e.g. "last bar").
+    Raises ExtractionError if the bar is malformed.
+    """
+    if not isinstance(bar, (list, tuple)) or len(bar) < 2:
+        raise ExtractionError(f"{label} entry malformed")
+
+    raw_date = bar[0]
+    raw_price = bar[1]
+
+    date_iso = _parse_date_string_to_iso(raw_date, source)
+    if date_iso is None:
+        raise ExtractionError(f"unable to parse date from oil {label}: {raw_date!r}")
+
+    try:
+        price = exact_price(Decimal(str(raw_price)))
+    except Exception:
+        raise ExtractionError(f"unable to parse price from oil {label}")
+
+    return date_iso, price
+
+
+def _get_bars(resp):
+    if not isinstance(resp, dict):
+        raise ExtractionError("oil response is not a JSON object")
+
+    bars = resp.get("bars")
+    if not bars or not isinstance(bars, list):
+        raise ExtractionError("oil response missing 'bars' list")
+    return bars
+
+
 def parse_oil_price(resp):
     """
     Parse the oil API response and return a tuple (date_iso, price_decimal).
@@ -106,30 +367,32 @@ def parse_oil_price(resp):
 
     Raises ExtractionError if date or price cannot be extracted.
     """
-    if not isinstance(resp, dict):
-        raise ExtractionError("oil response is not a JSON object")
-
-    bars = resp.get("bars")
-    if not bars or not isinstance(bars, list):
-        raise ExtractionError("oil response missing 'bars' list")
+    bars = _get_bars(resp)
+    return _parse_bar(bars[-1], "last bar")
 
-    last = bars[-1]
-    if not isinstance(last, (list, tuple)) or len(last) < 2:
-        raise ExtractionError("last bar entry malformed")
 
-    raw_date = last[0]
-    raw_price = last[1]
-
-    date_iso = _parse_date_string_to_iso(raw_date)
-    if date_iso is None:
-        raise ExtractionError(f"unable to parse date from oil last bar: {raw_date!r}")
-
-    try:
-        price = Decimal(str(raw_price))
-    except Exception:
-        raise ExtractionError("unable to parse price from oil last bar")
+def parse_oil_series(resp):
+    """
+    Parse every bar of the oil API response (same structure as parse_oil_price)
+    into a compact OilSeries (date ordinals + fixed-point prices), sorted by date
+    with duplicate dates collapsed to the last bar. Prices are kept exactly, so
+    a day read from the series equals the one parse_oil_price returns.
 
-    return date_iso, price
+    Raises ExtractionError if the response or any bar is malformed.
+    """
+    bars = _get_bars(resp)
+    builder = SeriesBuilder()
+    for i, bar in enumerate(bars):
+        if not isinstance(bar, (list, tuple)) or len(bar) < 2:
+            raise ExtractionError(f"bar {i} entry malformed")
+        date_iso = _parse_date_string_to_iso(bar[0], "oil")
+        if date_iso is None:
+            raise ExtractionError(f"unable to parse date from oil bar {i}: {bar[0]!r}")
+        try:
+            builder.add(date.fromisoformat(date_iso).toordinal(), bar[1])
+        except Exception:
+            raise ExtractionError(f"unable to parse price from oil bar {i}")
+    return builder.build()
 
 
 def parse_exchange_rate(resp):
@@ -178,39 +441,144 @@ def parse_exchange_rate(resp):
     if rate is None:
         raise ExtractionError("unable to extract exchange rate from response")
 
-    # Extract date
-    date_iso = None
+    return _parse_exchange_date(resp, info.get("timestamp") if isinstance(info, dict) else None), rate
+
+
+def _parse_exchange_date(resp, timestamp=None):
+    """
+    Date of an exchange response: the top-level "date" (yyyy-MM-dd), else the
+    UTC date of `timestamp`. Raises ExtractionError if neither is usable.
+    """
     top_date = resp.get("date")
     if isinstance(top_date, str):
         try:
-            dt = datetime.strptime(top_date, "%Y-%m-%d")
-            date_iso = dt.date().isoformat()
+            return datetime.strptime(top_date, "%Y-%m-%d").date().isoformat()
         except Exception:
-            date_iso = None
+            pass
 
-    if date_iso is None and isinstance(info, dict) and "timestamp" in info:
+    if timestamp is not None:
         try:
-            ts = int(info["timestamp"])
-            dt = datetime.utcfromtimestamp(ts)
-            date_iso = dt.date().isoformat()
+            return datetime.utcfromtimestamp(int(timestamp)).date().isoformat()
         except Exception:
-            date_iso = None
+            pass
 
-    if date_iso is None:
-        raise ExtractionError("unable to extract date from exchange response")
+    raise ExtractionError("unable to extract date from exchange response")
 
-    return date_iso, rate
+
+def parse_exchange_rates(resp, currencies):
+    """
+    Parse a multi-symbol exchange response and return a tuple
+    (date_iso, {currency: rate_decimal}) for the requested currencies.
+
+    Example structure:
+    {
+      "base": "USD",
+      "date": "2025-04-04",
+      "historical": true,
+      "rates": {"EUR": 0.911, "MAD": 9.490092},
+      "success": true,
+      "timestamp": 1743811199
+    }
+
+    Raises ExtractionError if the date or any requested rate cannot be extracted.
+    """
+    if not isinstance(resp, dict):
+        raise ExtractionError("exchange response is not a JSON object")
+
+    rates = resp.get("rates")
+    if not isinstance(rates, dict):
+        raise ExtractionError("exchange response missing 'rates' object")
+
+    parsed = {}
+    for currency in currencies:
+        if currency not in rates:
+            raise ExtractionError(f"exchange response missing rate for {currency}")
+        try:
+            parsed[currency] = Decimal(str(rates[currency]))
+        except Exception:
+            raise ExtractionError(f"unable to parse exchange rate for {currency}")
+
+    return _parse_exchange_date(resp, resp.get("timestamp")), parsed
 
 
 # Public API for the app
 def fetch_oil_data(url):
     """
     Fetch oil price data from the given URL.
+    With OIL_STREAMING=true the response is streamed and only the last bar kept
+    (see fetch_oil_tail) instead of materializing the whole document.
     Returns: (date_iso, price_decimal)
     Raises: ExtractionError or network-related exceptions on failure.
     """
+    if env_flag("OIL_STREAMING"):
+        return fetch_oil_tail(url, 1)[-1]
     resp = _fetch_json(url)
-    return parse_oil_price(resp)
+    with span("parse"):
+        return parse_oil_price(resp)
+
+def iter_oil_bars(url, timeout=None):
+    """
+    Stream the oil API response and yield its raw bars (e.g. ["Mon Aug 11 00:00:00 2025", 653])
+    as they are parsed, without reading the whole body into memory.
+    Raises: ExtractionError if the response has no 'bars' list, ValueError on malformed
+    JSON, or network-related exceptions.
+    """
+    logger.info("streaming URL %s", url)
+    session = get_session()
+    with session.stream(url, headers=upstream_headers(), timeout=attempt_timeout(session, timeout)) as chunks:
+        try:
+            yield from iter_array_items(decode_chunks(chunks), "bars")
+        except KeyError:
+            raise ExtractionError("oil response missing 'bars' list")
+        except TypeError as e:
+            raise ExtractionError(f"oil response malformed: {e}")
+
+def fetch_oil_tail(url, n=1):
+    """
+    Fetch the last `n` oil bars, streaming the response and keeping at most `n`
+    raw bars in memory. Transient failures are retried.
+    Returns: list of (date_iso, price_decimal), oldest first.
+    Raises: ExtractionError or network-related exceptions on failure.
+    """
+    limiter = limiter_for(url)
+    breaker = breaker_for(url)
+
+    def collect():
+        if breaker is not None:
+            breaker.before(f"GET {url}")
+        if limiter is not None:
+            limiter.acquire(f"GET {url}")
+        try:
+            tail = deque(iter_oil_bars(url), maxlen=n)
+        except Exception as e:
+            if limiter is not None:
+                limiter.observe(e)
+            if breaker is not None:
+                breaker.record(e)
+            raise
+        if breaker is not None:
+            breaker.record()
+        return tail
+
+    with span("http_stream"):
+        tail = call_with_retry(collect, description=f"GET {url} (stream)")
+    if not tail:
+        raise ExtractionError("oil response missing 'bars' list")
+    count = len(tail)
+    return [
+        _parse_bar(bar, "last bar" if i == count - 1 else f"bar -{count - i}")
+        for i, bar in enumerate(tail)
+    ]
+
+def fetch_oil_series(url):
+    """
+    Fetch the full oil price history from the given URL.
+    Returns: OilSeries covering every bar in the response.
+    Raises: ExtractionError or network-related exceptions on failure.
+    """
+    resp = _fetch_json(url)
+    with span("parse"):
+        return parse_oil_series(resp)
 
 def get_today_date():
     return datetime.now().strftime("%Y-%m-%d")
@@ -221,30 +589,180 @@ def get_yesterday_date():
 def get_fetch_date():
     return get_yesterday_date()
 
-def fetch_exchange_data(url):
+def _exchange_secret_name():
+    return os.environ.get("EXCHANGE_API_KEY_SECRET", "/prod/exchange-api-key")
+
+
+def get_exchange_api_key(force_refresh=False):
+    """
+    Retrieve the exchange API key from Secrets Manager.
+    The secret is taken from EXCHANGE_API_KEY_SECRET (default "/prod/exchange-api-key").
+    With force_refresh the cached key is dropped first (e.g. after an auth failure).
+    Returns the key string or None if it could not be retrieved.
+    """
+    secret_arn = _exchange_secret_name()
+    if force_refresh:
+        invalidate_secret(secret_arn)
+    return get_secret(secret_arn)
+
+
+def api_key_headers(api_key) -> dict:
+    """
+    Headers authenticating an exchange API request ({} without a key).
+    """
+    return {"apikey": api_key} if api_key else {}
+
+
+def should_refresh_api_key(exc, key_from_cache) -> bool:
+    """
+    True when the exchange API rejected (HTTP 401/403) a key looked up in
+    Secrets Manager, which may have been rotated since it was cached.
+    """
+    if not key_from_cache or not isinstance(exc, urllib.error.HTTPError) or exc.code not in (401, 403):
+        return False
+    logger.warning("Exchange API rejected the API key (HTTP %s) — refreshing secret", exc.code)
+    return True
+
+
+def _fetch_exchange_json(url, api_key=None):
+    """
+    Fetch an exchange API URL with the API key header.
+    Retrieves the key from AWS Secrets Manager unless `api_key` is given.
+    If the looked-up key is rejected (HTTP 401/403), it is refreshed and the
+    request retried once, in case the secret was rotated.
+    """
+    key_from_cache = api_key is None
+    if key_from_cache:
+        api_key = get_exchange_api_key()
+
+    try:
+        return _fetch_json(url, headers=api_key_headers(api_key))
+    except urllib.error.HTTPError as e:
+        if not should_refresh_api_key(e, key_from_cache):
+            raise
+        fresh_key = get_exchange_api_key(force_refresh=True)
+        if not fresh_key or fresh_key == api_key:
+            raise
+        return _fetch_json(url, headers=api_key_headers(fresh_key))
+
+
+def fetch_exchange_data(url, date=None, api_key=None):
     """
     Fetch exchange rate data from the given URL.
-    Appends today's date in format yyyy-MM-dd to the URL.
-    Retrieves API key from AWS Secrets Manager.
+    Appends the date (default: get_fetch_date()) in format yyyy-MM-dd to the URL.
+    Retrieves API key from AWS Secrets Manager unless `api_key` is given
+    (callers fetching many dates look the key up once and pass it in).
+    If the looked-up key is rejected (HTTP 401/403), it is refreshed and the
+    request retried once, in case the secret was rotated.
     Returns: (date_iso, rate_decimal)
     Raises: ExtractionError or network-related exceptions on failure.
     """
     
-    # Get today's date in yyyy-MM-dd format
-    date = get_fetch_date()
-    
-    # Append date to URL
-    url_with_date = f"{url}&date={date}"
-    
-    # Get API key from Secrets Manager
-    secret_arn = os.environ.get("EXCHANGE_API_KEY_SECRET", "/prod/exchange-api-key")
-    api_key = get_secret(secret_arn)
-    logger.info("rate api key: %s", api_key)
-    
-    headers = {}
-    if api_key:
-        headers["apikey"] = api_key
-    
-    # Fetch with headers
-    resp = _fetch_json(url_with_date, headers=headers)
-    return parse_exchange_rate(resp)
\ No newline at end of file
+    # Default to the fetch date in yyyy-MM-dd format
+    if date is None:
+        date = get_fetch_date()
+
+    url_with_date = exchange_day_url(url, date)
+    resp = _fetch_exchange_json(url_with_date, api_key=api_key)
+    date_iso, rate = parse_exchange_rate(resp)
+    pin_historical_response(url_with_date, date, date_iso)
+    return date_iso, rate
+
+
+def exchange_day_url(url, date):
+    """
+    The single-pair exchange URL for one day: `url` with date=yyyy-MM-dd appended.
+    """
+    return f"{url}&date={date}"
+
+
+def exchange_batch_url(rates_url, currencies, date):
+    """
+    The multi-symbol exchange URL for one day: "{date}" in `rates_url` is replaced
+    by the date (otherwise date= is set) and symbols= lists every currency.
+    """
+    if "{date}" in rates_url:
+        batch_url = rates_url.replace("{date}", date)
+    else:
+        batch_url = with_query_param(rates_url, "date", date)
+    return with_query_param(batch_url, "symbols", ",".join(currencies))
+
+
+def merge_exchange_rates(currencies, results):
+    """
+    Combine per-currency (date_iso, rate) results, in the order of `currencies`,
+    into (date_iso, {currency: rate}). Raises ExtractionError when they disagree on the date.
+    """
+    dates = {date_iso for date_iso, _ in results}
+    if len(dates) != 1:
+        raise ExtractionError(f"exchange rates returned for different dates: {sorted(dates)}")
+    return dates.pop(), {currency: rate for currency, (_, rate) in zip(currencies, results)}
+
+
+def pin_historical_response(url, requested_date, response_date):
+    """
+    Rates of a past day never change, so once a response for `requested_date`
+    (before today) is confirmed to be for that day, its response cache entry is
+    kept without expiry. A response for another day is left to expire normally.
+    """
+    if response_date != requested_date or requested_date >= get_today_date():
+        return
+    cache = get_response_cache()
+    if cache is not None:
+        cache.update(url, pin=True)
+
+
+def with_query_param(url, name, value):
+    """
+    Return `url` with query parameter `name` set to `value` (added or replaced).
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if k != name]
+    query.append((name, value))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query, safe=",")))
+
+
+def fetch_exchange_rates(url, currencies, date=None, api_key=None, rates_url=None):
+    """
+    Fetch the exchange rates of several quote currencies for one day.
+
+    Parameters:
+      - url: single-pair exchange URL (as for fetch_exchange_data), e.g. "...?from=USD&to=MAD"
+      - currencies: quote currency codes, e.g. ["MAD", "EUR"]
+      - date: yyyy-MM-dd (default: get_fetch_date())
+      - api_key: API key (default: looked up once in Secrets Manager)
+      - rates_url: optional multi-symbol endpoint; "{date}" in it is replaced by the
+        date, otherwise date= is added, and symbols= lists every currency
+
+    With `rates_url` all currencies come from one request (see parse_exchange_rates).
+    Without it the provider has no batching, so `url` is requested concurrently
+    once per currency with its "to" parameter replaced.
+
+    Returns: (date_iso, {currency: rate_decimal})
+    Raises: ExtractionError (including when per-currency responses disagree on
+    the date) or network-related exceptions on failure.
+    """
+    if date is None:
+        date = get_fetch_date()
+
+    if rates_url:
+        batch_url = exchange_batch_url(rates_url, currencies, date)
+        resp = _fetch_exchange_json(batch_url, api_key=api_key)
+        date_iso, rates = parse_exchange_rates(resp, currencies)
+        pin_historical_response(batch_url, date, date_iso)
+        return date_iso, rates
+
+    if len(currencies) == 1:
+        date_iso, rate = fetch_exchange_data(with_query_param(url, "to", currencies[0]), date=date, api_key=api_key)
+        return date_iso, {currencies[0]: rate}
+
+    # One secret lookup shared by the concurrent requests
+    if api_key is None:
+        api_key = get_exchange_api_key()
+
+    def fetch_one(currency):
+        return fetch_exchange_data(with_query_param(url, "to", currency), date=date, api_key=api_key)
+
+    with ThreadPoolExecutor(max_workers=len(currencies)) as pool:
+        results = list(pool.map(fetch_one, currencies))
+    return merge_exchange_rates(currencies, results)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import logging
+from datetime import date, timedelta
+
+try:
+    from storage import DEFAULT_PK
+    from timeseries import iter_range
+except ImportError:
+    from src.storage import DEFAULT_PK
+    from src.timeseries import iter_range
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def business_days(start_date: str, end_date: str) -> list:
+    """
+    ISO dates from start_date to end_date (inclusive) that fall Monday to Friday.
+    """
+    day = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    days = []
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def stored_dates(table_name: str, start_date: str, end_date: str, pk: str = DEFAULT_PK) -> set:
+    """
+    Dates stored for a partition between start_date and end_date (inclusive).
+    Only the sort key is projected, so the Query reads as little as possible.
+    """
+    return {
+        item["date"]
+        for item in iter_range(table_name, start_date, end_date, pk=pk, attributes=["date"], consistent=True)
+    }
+
+
+def find_gaps(table_name: str, end_date: str, days: int, pk: str = DEFAULT_PK) -> list:
+    """
+    Business days in the `days` calendar days ending at end_date (inclusive)
+    that have no stored item, oldest first.
+    """
+    start_date = (date.fromisoformat(end_date) - timedelta(days=days - 1)).isoformat()
+    present = stored_dates(table_name, start_date, end_date, pk=pk)
+    gaps = [d for d in business_days(start_date, end_date) if d not in present]
+    logger.info(
+        "Gap scan %s..%s for %s: %d stored, %d missing business days",
+        start_date, end_date, pk, len(present), len(gaps),
+    )
+    return gaps
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+import contextlib
+import http.client
+import io
+import logging
+import threading
+import urllib.error
+import urllib.parse
+import zlib
+
+try:
+    from env import env_float
+    from metrics import add
+except ImportError:
+    from src.env import env_float
+    from src.metrics import add
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+# Errors that mean an idle keep-alive connection was closed by the server
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class Response:
+    """
+    A fully-read HTTP response: status code, headers (http.client.HTTPMessage)
+    and the body with any gzip/deflate content encoding already removed.
+    """
+
+    __slots__ = ("url", "status", "headers", "body")
+
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def text(self) -> str:
+        charset = self.headers.get_content_charset() or "utf-8"
+        return self.body.decode(charset)
+
+
+def default_timeouts(connect_timeout=None, read_timeout=None) -> tuple:
+    """
+    (connect_timeout, read_timeout) in seconds, each defaulting to
+    HTTP_CONNECT_TIMEOUT (5) and HTTP_READ_TIMEOUT (10) when not given.
+    """
+    return (
+        connect_timeout if connect_timeout is not None else env_float("HTTP_CONNECT_TIMEOUT", 5),
+        read_timeout if read_timeout is not None else env_float("HTTP_READ_TIMEOUT", 10),
+    )
+
+
+def request_headers(headers=None) -> dict:
+    """
+    Headers sent with every request (compressed bodies, keep-alive) plus `headers`.
+    """
+    send_headers = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+    if headers:
+        send_headers.update(headers)
+    return send_headers
+
+
+def request_target(url) -> tuple:
+    """
+    Split an http(s) URL into (pool_key, target, host): the (scheme, host, port)
+    connection pool key, the request target (path and query) and the Host header.
+    Raises ValueError for other schemes.
+    """
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        raise ValueError(f"unsupported URL scheme: {url!r}")
+    port = parts.port or (443 if scheme == "https" else 80)
+    target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+    host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+    return (scheme, parts.hostname, port), target, host
+
+
+def redirect(url, method, status, location):
+    """
+    (next_url, next_method) when a response with `status` and Location header
+    `location` redirects, else None. A 303 is followed with GET.
+    """
+    if status not in REDIRECT_STATUSES or not location:
+        return None
+    return urllib.parse.urljoin(url, location), "GET" if status == 303 else method
+
+
+def decode_body(body: bytes, encoding: str) -> bytes:
+    """
+    Remove a gzip/deflate Content-Encoding from a fully-read body.
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        # "deflate" is specified as zlib-wrapped, but some servers send raw deflate
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+def _stream_decoder(encoding):
+    """
+    Incremental decompressor for a Content-Encoding, or None for identity.
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        # Accept zlib-wrapped or raw deflate
+        return zlib.decompressobj(32 + zlib.MAX_WBITS)
+    return None
+
+
+class HTTPSession:
+    """
+    Minimal HTTP/1.1 client keeping persistent keep-alive connections per host.
+
+    Idle connections are pooled per (scheme, host, port) and reused by later requests,
+    so repeated calls to the same API skip the TCP and TLS handshakes. Responses are
+    read fully (request) or incrementally (stream) and transparently
+    gzip/deflate-decoded. Status codes >= 400 raise
+    urllib.error.HTTPError, like urllib.request.urlopen does.
+
+    Timeouts (seconds) default to HTTP_CONNECT_TIMEOUT (5) and HTTP_READ_TIMEOUT (10).
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_idle_per_host=4):
+        self.connect_timeout, self.read_timeout = default_timeouts(connect_timeout, read_timeout)
+        self.max_idle_per_host = max_idle_per_host
+        self.connections_opened = 0
+        self.requests_sent = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _checkout(self, key, read_timeout):
+        """
+        Return (connection, reused) for the given pool key.
+        """
+        with self._lock:
+            pool = self._idle.get(key)
+            if pool:
+                conn = pool.pop()
+                conn.sock.settimeout(read_timeout)
+                return conn, True
+        scheme, host, port = key
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(host, port, timeout=min(self.connect_timeout, read_timeout))
+        conn.connect()
+        conn.sock.settimeout(read_timeout)
+        with self._lock:
+            self.connections_opened += 1
+        add("http_connections")
+        return conn, False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            pool = self._idle.setdefault(key, [])
+            if len(pool) < self.max_idle_per_host:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def _open(self, key, method, target, headers, read_timeout):
+        """
+        Send a request and read the response status and headers.
+        Returns (connection, http.client.HTTPResponse); the body is left unread.
+        """
+        conn, reused = self._checkout(key, read_timeout)
+        try:
+            conn.request(method, target, headers=headers)
+            return conn, conn.getresponse()
+        except _STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+        except Exception:
+            conn.close()
+            raise
+        # The server dropped the idle connection; retry once on a fresh one
+        conn, _ = self._checkout_fresh(key, read_timeout)
+        try:
+            conn.request(method, target, headers=headers)
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def _release(self, key, conn, resp):
+        """
+        Return a connection whose response was fully read to the pool (or close it).
+        """
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+
+    def _checkout_fresh(self, key, read_timeout):
+        with self._lock:
+            stale = self._idle.pop(key, [])
+        for old in stale:
+            old.close()
+        return self._checkout(key, read_timeout)
+
+    def _open_following_redirects(self, method, url, headers, read_timeout):
+        """
+        Open `url`, following up to 5 redirects.
+        Returns (final_url, pool_key, connection, response) with the body unread.
+        """
+        send_headers = request_headers(headers)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            key, target, _ = request_target(url)
+            conn, resp = self._open(key, method, target, send_headers, read_timeout)
+            with self._lock:
+                self.requests_sent += 1
+            add("http_requests")
+
+            next_request = redirect(url, method, resp.status, resp.getheader("Location"))
+            if next_request is None:
+                return url, key, conn, resp
+            try:
+                resp.read()
+            except Exception:
+                conn.close()
+                raise
+            self._release(key, conn, resp)
+            url, method = next_request
+
+        raise urllib.error.HTTPError(url, resp.status, "too many redirects", resp.headers, io.BytesIO(b""))
+
+    def _read_body(self, key, conn, resp) -> bytes:
+        try:
+            body = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        self._release(key, conn, resp)
+        add("http_bytes", len(body))
+        return decode_body(body, resp.getheader("Content-Encoding"))
+
+    def request(self, method, url, headers=None, timeout=None) -> Response:
+        """
+        Send a request and return a Response. `timeout` overrides the read timeout.
+        Follows up to 5 redirects. Raises urllib.error.HTTPError for status >= 400
+        and OSError/http.client exceptions on network failures.
+        """
+        read_timeout = timeout if timeout is not None else self.read_timeout
+        url, key, conn, resp = self._open_following_redirects(method, url, headers, read_timeout)
+        body = self._read_body(key, conn, resp)
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        return Response(url, resp.status, resp.headers, body)
+
+    @contextlib.contextmanager
+    def stream(self, url, headers=None, timeout=None, chunk_size=64 * 1024):
+        """
+        GET `url` and yield an iterator over the decoded body in chunks of at most
+        `chunk_size` raw bytes, so large bodies never sit in memory at once.
+
+        Used as a context manager; the connection goes back to the pool only if the
+        body was read to the end, otherwise it is closed on exit. Raises
+        urllib.error.HTTPError for status >= 400 before anything is yielded.
+        """
+        read_timeout = timeout if timeout is not None else self.read_timeout
+        url, key, conn, resp = self._open_following_redirects("GET", url, headers, read_timeout)
+        if resp.status >= 400:
+            body = self._read_body(key, conn, resp)
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+
+        decoder = _stream_decoder(resp.getheader("Content-Encoding"))
+        state = {"finished": False}
+
+        def chunks():
+            while True:
+                data = resp.read(chunk_size)
+                if not data:
+                    break
+                add("http_bytes", len(data))
+                if decoder is None:
+                    yield data
+                    continue
+                # Bound each decompressed piece so highly compressed bodies stay streamed
+                while data:
+                    out = decoder.decompress(data, chunk_size)
+                    if out:
+                        yield out
+                    data = decoder.unconsumed_tail
+            if decoder is not None:
+                tail = decoder.flush()
+                if tail:
+                    yield tail
+            state["finished"] = True
+
+        try:
+            yield chunks()
+        finally:
+            if state["finished"]:
+                self._release(key, conn, resp)
+            else:
+                conn.close()
+
+    def get(self, url, headers=None, timeout=None) -> Response:
+        return self.request("GET", url, headers=headers, timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> HTTPSession:
+    """
+    Process-wide HTTPSession, created on first use and kept across warm invocations.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = HTTPSession()
+    return _session
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import codecs
+import json
+import re
+
+_SKIP_WHITESPACE = re.compile(r"[ \t\n\r]*").match
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """
+    Text buffer over an iterator of str chunks, refilled on demand. Only the
+    unconsumed tail of the input is kept in memory.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """
+        Next non-whitespace character (not consumed). Raises ValueError at end of input.
+        """
+        while True:
+            buf = self.buf
+            pos = self.pos = _SKIP_WHITESPACE(buf, self.pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                raise ValueError("truncated JSON document")
+
+    def value(self):
+        """
+        Decode and consume one complete JSON value (the caller has positioned the
+        reader on its first character with peek()).
+        """
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal ending exactly at the buffer end may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def decode_chunks(chunks, charset="utf-8"):
+    """
+    Decode an iterator of bytes chunks to str chunks (multi-byte characters may
+    straddle chunk boundaries).
+    """
+    decoder = codecs.getincrementaldecoder(charset)()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_array_items(chunks, key):
+    """
+    Incrementally parse a JSON object from an iterator of str chunks and yield the
+    elements of its top-level `key` array one at a time, without building the
+    whole document. Parsing stops once the array is closed.
+
+    Raises KeyError if the object has no `key` member, TypeError if that member is
+    not an array, and ValueError (json.JSONDecodeError) on malformed JSON.
+    """
+    reader = _Reader(chunks)
+    if reader.peek() != "{":
+        raise TypeError("JSON document is not an object")
+    reader.pos += 1
+    while True:
+        c = reader.peek()
+        if c == "}":
+            raise KeyError(key)
+        if c == ",":
+            reader.pos += 1
+            continue
+        name = reader.value()  # peek() above positioned the reader on the key
+        if reader.peek() != ":":
+            raise ValueError("expected ':' after object key")
+        reader.pos += 1
+        if name != key:
+            reader.peek()
+            reader.value()
+            continue
+        if reader.peek() != "[":
+            raise TypeError(f"{key!r} is not an array")
+        reader.pos += 1
+        while True:
+            c = reader.peek()
+            if c == "]":
+                reader.pos += 1
+                return
+            if c == ",":
+                reader.pos += 1
+                continue
+            yield reader.value()
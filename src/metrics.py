@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    from env import env_flag
+except ImportError:
+    from src.env import env_flag
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Timings and counters of the running invocation (None: not recording)
+_current = None
+_lock = threading.Lock()
+
+# Returned by span() when not recording, so a disabled span costs one global read
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def metrics_enabled() -> bool:
+    """
+    METRICS_ENABLED (default true); any value other than "1", "true", "yes" or "on"
+    disables recording.
+    """
+    return env_flag("METRICS_ENABLED", True)
+
+
+def start_invocation():
+    """
+    Start recording for a new invocation, dropping anything recorded before.
+    Nothing is recorded when metrics are disabled or outside an invocation.
+    """
+    global _current
+    with _lock:
+        _current = {"start": time.perf_counter(), "stages": {}, "counters": {}} if metrics_enabled() else None
+
+
+def _record(name, elapsed):
+    with _lock:
+        if _current is None:
+            return
+        total, count = _current["stages"].get(name, (0.0, 0))
+        _current["stages"][name] = (total + elapsed, count + 1)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name: str):
+    """
+    Context manager timing one stage, e.g. `with span("ssm"): ...`.
+
+    Durations of the same stage add up within an invocation (calls from worker
+    threads included) and the number of calls is kept alongside. Stages may nest.
+    """
+    if _current is None:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def add(name: str, value=1):
+    """
+    Add `value` to a counter of the running invocation (e.g. "http_bytes").
+    """
+    if _current is None:
+        return
+    with _lock:
+        if _current is not None:
+            _current["counters"][name] = _current["counters"].get(name, 0) + value
+
+
+def recorded() -> dict:
+    """
+    What has been recorded so far: {"stages": {name: {"ms", "count"}}, "counters": {...}}.
+    Empty when not recording.
+    """
+    with _lock:
+        if _current is None:
+            return {}
+        return {
+            "stages": {
+                name: {"ms": round(total * 1000, 3), "count": count}
+                for name, (total, count) in _current["stages"].items()
+            },
+            "counters": dict(_current["counters"]),
+        }
+
+
+def build_record(namespace: str, function_name: str, properties: dict = None) -> dict:
+    """
+    Build the invocation's CloudWatch Embedded Metric Format record, or None when
+    not recording.
+
+    Each stage becomes a "<stage>_ms" metric (Milliseconds) and each counter a
+    metric of its own (Bytes for names ending in "_bytes", else Count), all with
+    the single dimension "Function". Call counts per stage and `properties`
+    (e.g. status, mode) are included as plain properties, searchable in Logs
+    Insights without creating metrics.
+    """
+    global _current
+    with _lock:
+        current, _current = _current, None
+    if current is None:
+        return None
+
+    record = {"Function": function_name}
+    definitions = []
+    total = time.perf_counter() - current["start"]
+    record["total_ms"] = round(total * 1000, 3)
+    definitions.append({"Name": "total_ms", "Unit": "Milliseconds"})
+    for name, (elapsed, count) in sorted(current["stages"].items()):
+        record[f"{name}_ms"] = round(elapsed * 1000, 3)
+        record[f"{name}_calls"] = count
+        definitions.append({"Name": f"{name}_ms", "Unit": "Milliseconds"})
+    for name, value in sorted(current["counters"].items()):
+        record[name] = value
+        definitions.append({"Name": name, "Unit": "Bytes" if name.endswith("_bytes") else "Count"})
+    for key, value in (properties or {}).items():
+        record.setdefault(key, value)
+
+    record["_aws"] = {
+        "Timestamp": int(time.time() * 1000),
+        "CloudWatchMetrics": [{
+            "Namespace": namespace,
+            "Dimensions": [["Function"]],
+            "Metrics": definitions,
+        }],
+    }
+    return record
+
+
+def emit(context=None, properties: dict = None):
+    """
+    Finish the invocation and write its EMF record as one JSON line to stdout,
+    where CloudWatch extracts the metrics. The namespace is METRICS_NAMESPACE
+    (default "OilPriceFetcher"); the function name comes from the Lambda context.
+
+    Returns the record, or None when not recording.
+    """
+    function_name = getattr(context, "function_name", None)
+    if not isinstance(function_name, str):
+        function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+    namespace = os.environ.get("METRICS_NAMESPACE", "OilPriceFetcher")
+    record = build_record(namespace, function_name, properties)
+    if record is not None:
+        # Printed rather than logged: EMF lines must not carry the log record prefix
+        print(json.dumps(record, separators=(",", ":"), default=str), flush=True)
+    return record
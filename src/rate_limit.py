@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+try:
+    from metrics import add, span
+    from retry import DeadlineExceeded, remaining_time, retry_after
+except ImportError:
+    from src.metrics import add, span
+    from src.retry import DeadlineExceeded, remaining_time, retry_after
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Patched in tests. _async_sleep None means asyncio.sleep, imported in the
+# coroutine so the synchronous cold start does not load asyncio
+_sleep = time.sleep
+_async_sleep = None
+_clock = time.monotonic
+
+# Rate multiplier applied on every 429
+_DECREASE = 0.5
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the request rate to one upstream host.
+
+    Parameters:
+      - rate: sustained requests per second
+      - burst: requests allowed back to back after an idle period (default: max(1, rate))
+      - min_rate: lowest rate a run of 429s can push it down to (default: rate / 10)
+      - recovery_seconds: time to climb back linearly to `rate` after a 429 (default: 30)
+
+    Every request takes one token. A caller finding the bucket empty reserves the
+    next token anyway and waits until it is due, so concurrent callers (threads or
+    coroutines) are served in arrival order at exactly the allowed rate.
+
+    A 429 halves the current rate and, with Retry-After, stops every caller until
+    that time; the rate then recovers to `rate` over `recovery_seconds`. Buckets
+    live at module level, so what was learned survives across warm invocations.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=None, recovery_seconds=30.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.configured_rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.min_rate = float(min_rate if min_rate is not None else rate / 10.0)
+        self.recovery_seconds = float(recovery_seconds)
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = _clock()
+        self._floor_rate = self.configured_rate
+        self._throttled_at = None
+
+    def rate(self, now=None) -> float:
+        """
+        Current allowed requests per second, below the configured rate after a 429.
+        """
+        if self._throttled_at is None:
+            return self.configured_rate
+        now = now if now is not None else _clock()
+        elapsed = max(0.0, now - self._throttled_at)
+        if self.recovery_seconds <= 0 or elapsed >= self.recovery_seconds:
+            return self.configured_rate
+        return self._floor_rate + (self.configured_rate - self._floor_rate) * elapsed / self.recovery_seconds
+
+    def _refill(self, now):
+        # _updated is in the future while a Retry-After pause lasts: nothing refills
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate(now))
+            self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take one token, and return the seconds to wait before using it.
+        """
+        with self._lock:
+            now = _clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(0.0, self._updated - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate(now + wait)
+            return wait
+
+    def _cancel(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def _checked_wait(self, name):
+        wait = self.reserve()
+        remaining = remaining_time()
+        if remaining is not None and wait >= remaining:
+            self._cancel()
+            raise DeadlineExceeded(f"rate limit wait of {wait:.2f}s for {name} exceeds remaining budget")
+        if wait > 0:
+            add("rate_limit_waits")
+        return wait
+
+    def acquire(self, name="request"):
+        """
+        Block until a request may be sent. Raises DeadlineExceeded (returning the
+        token) when the wait would not fit in the invocation's remaining time.
+        """
+        wait = self._checked_wait(name)
+        if wait > 0:
+            with span("rate_limit"):
+                _sleep(wait)
+        return wait
+
+    async def acquire_async(self, name="request"):
+        """
+        Coroutine form of acquire; waiting does not block the event loop.
+        """
+        wait = self._checked_wait(name)
+        if wait > 0:
+            import asyncio
+            sleep = _async_sleep or asyncio.sleep
+            with span("rate_limit"):
+                await sleep(wait)
+        return wait
+
+    def throttled(self, wait=None):
+        """
+        Record a 429: lower the rate and, when the server said how long to wait,
+        hold every caller back until then.
+        """
+        with self._lock:
+            now = _clock()
+            self._refill(now)
+            self._floor_rate = max(self.min_rate, self.rate(now) * _DECREASE)
+            if wait:
+                # One request may go as soon as the pause ends, the rest at the lowered rate
+                self._updated = max(self._updated, now + wait)
+                self._tokens = 1.0
+            else:
+                self._tokens = min(self._tokens, 0.0)
+            # Recovery starts once the pause is over
+            self._throttled_at = max(now, self._updated)
+            self.throttled_count += 1
+            rate = self._floor_rate
+        add("rate_limited")
+        logger.warning("Upstream throttled (429) — rate lowered to %.2f/s%s",
+                       rate, f", paused {wait:.1f}s" if wait else "")
+
+    def observe(self, exc):
+        """
+        Inspect an error raised by a request made under this bucket; a 429 is
+        recorded with throttled(). Returns True when it was a 429.
+        """
+        if isinstance(exc, urllib.error.HTTPError) and exc.code == 429:
+            self.throttled(retry_after(exc))
+            return True
+        return False
+
+    def settings(self) -> tuple:
+        return (self.configured_rate, self.burst, self.min_rate, self.recovery_seconds)
+
+
+# Buckets by lower-case host (or "host:port"), kept across warm invocations
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket_settings(host, spec):
+    """
+    TokenBucket keyword arguments for one "rate_limits" entry: a number (requests
+    per second) or {"rate", "burst", "min_rate", "recovery_seconds"}.
+    """
+    if isinstance(spec, bool):
+        raise ValueError(f"rate limit for {host!r} must be a number or an object")
+    if isinstance(spec, (int, float)):
+        spec = {"rate": spec}
+    if not isinstance(spec, dict) or "rate" not in spec:
+        raise ValueError(f"rate limit for {host!r} must be a number or an object with 'rate'")
+    unknown = set(spec) - {"rate", "burst", "min_rate", "recovery_seconds"}
+    if unknown:
+        raise ValueError(f"rate limit for {host!r} has unknown keys: {', '.join(sorted(unknown))}")
+    try:
+        settings = {key: float(value) for key, value in spec.items()}
+    except (TypeError, ValueError):
+        raise ValueError(f"rate limit for {host!r} must have numeric values")
+    if settings["rate"] <= 0:
+        raise ValueError(f"rate limit for {host!r} must have a positive rate")
+    return settings
+
+
+def configure_rate_limits(limits):
+    """
+    Apply the "rate_limits" section of the SSM store, e.g.:
+      {"api.apilayer.com": 5,
+       "api.oil.example": {"rate": 2, "burst": 4, "min_rate": 0.5, "recovery_seconds": 60}}
+
+    Buckets whose settings did not change keep their state (tokens, lowered rate,
+    Retry-After pause); hosts no longer listed are no longer limited. None or {}
+    removes every limit. Raises ValueError on a malformed section.
+    """
+    if limits is None:
+        limits = {}
+    if not isinstance(limits, dict):
+        raise ValueError("rate_limits must be an object mapping hosts to limits")
+    wanted = {host.strip().lower(): _bucket_settings(host, spec) for host, spec in limits.items()}
+    with _buckets_lock:
+        for host in list(_buckets):
+            if host not in wanted:
+                del _buckets[host]
+        for host, settings in wanted.items():
+            bucket = TokenBucket(**settings)
+            current = _buckets.get(host)
+            if current is None or current.settings() != bucket.settings():
+                _buckets[host] = bucket
+
+
+def limiter_for(url):
+    """
+    The TokenBucket limiting requests to `url`'s host, or None when it is not limited.
+    A "host:port" entry takes precedence over the bare host.
+    """
+    if not _buckets:
+        return None
+    parts = urllib.parse.urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.port is not None:
+        bucket = _buckets.get(f"{host}:{parts.port}")
+        if bucket is not None:
+            return bucket
+    return _buckets.get(host)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+try:
+    from env import env_flag
+except ImportError:
+    from src.env import env_flag
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Cache key form of a URL: lower-case scheme and host, query parameters sorted,
+    fragment dropped. "...?to=MAD&from=USD&date=D" and "...?date=D&from=USD&to=MAD"
+    are the same entry.
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urllib.parse.urlencode(query, safe=","),
+        "",
+    ))
+
+
+def freshness(cache_control) -> tuple:
+    """
+    (storable, lifetime_seconds) for a Cache-Control header value.
+    "no-store" is not storable; "no-cache" (or no max-age) is stored but must be
+    revalidated before use (lifetime 0).
+    """
+    directives = (cache_control or "").lower()
+    if "no-store" in directives:
+        return False, 0
+    if "no-cache" in directives:
+        return True, 0
+    match = _MAX_AGE.search(directives)
+    return True, int(match.group(1)) if match else 0
+
+
+class CachedResponse:
+    """
+    One stored response body with its validator and expiry.
+    `expires` is a wall-clock time, or None for a response that never changes.
+    """
+
+    __slots__ = ("url", "body", "etag", "expires")
+
+    def __init__(self, url, body, etag=None, expires=0.0):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+    def is_fresh(self, now=None) -> bool:
+        return self.expires is None or self.expires > (now if now is not None else time.time())
+
+    def to_dict(self) -> dict:
+        return {"url": self.url, "body": self.body, "etag": self.etag, "expires": self.expires}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["url"], data["body"], data.get("etag"), data.get("expires", 0.0))
+
+
+class ResponseCache:
+    """
+    Response bodies on disk, keyed by normalized URL, bounded to `max_bytes` with
+    least-recently-used eviction.
+
+    Each entry is one JSON file named after the hash of its key; a hit touches the
+    file, so file mtimes order the LRU and survive across warm invocations of the
+    same container (the directory is normally under /tmp). The in-memory index is
+    built from the directory on first use. Writes go through a temporary file and
+    os.replace, so a concurrent reader never sees a partial entry.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        os.makedirs(self.directory, exist_ok=True)
+        index = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            index[name] = (st.st_size, st.st_mtime)
+        self._index = index
+        return index
+
+    def get(self, url: str):
+        """
+        The stored CachedResponse for `url` (fresh or not), or None.
+        """
+        path = self._path(normalize_url(url))
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                entry = CachedResponse.from_dict(json.load(fh))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Dropping unreadable response cache entry %s: %s", path, e)
+            self._remove(os.path.basename(path))
+            return None
+        now = time.time()
+        with self._lock:
+            index = self._load_index()
+            name = os.path.basename(path)
+            if name in index:
+                index[name] = (index[name][0], now)
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return entry
+
+    def put(self, url: str, body: str, etag: str = None, expires: float = 0.0):
+        """
+        Store a response body, then evict least recently used entries beyond max_bytes.
+        """
+        key = normalize_url(url)
+        data = json.dumps(CachedResponse(key, body, etag, expires).to_dict(), separators=(",", ":")).encode("utf-8")
+        if len(data) > self.max_bytes:
+            logger.info("Response for %s (%d bytes) exceeds the cache size — not cached", key, len(data))
+            return
+        path = self._path(key)
+        name = os.path.basename(path)
+        with self._lock:
+            try:
+                index = self._load_index()
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                # A full or read-only /tmp only costs the cache, never the fetch
+                logger.warning("Could not write response cache entry for %s: %s", key, e)
+                return
+            index[name] = (len(data), time.time())
+            self._evict(index)
+
+    def update(self, url: str, etag=None, expires=0.0, pin=False):
+        """
+        Refresh an entry's validator and expiry (after a 304), or with pin=True mark
+        it as never expiring. Returns False if `url` has no entry.
+        """
+        entry = self.get(url)
+        if entry is None:
+            return False
+        if pin:
+            if entry.expires is None:
+                return True
+            entry.expires = None
+        else:
+            entry.etag = etag or entry.etag
+            entry.expires = expires
+        self.put(url, entry.body, entry.etag, entry.expires)
+        return True
+
+    def _remove(self, name):
+        with self._lock:
+            if self._index is not None:
+                self._index.pop(name, None)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def _evict(self, index):
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_bytes:
+            return
+        for name, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            del index[name]
+            total -= size
+            logger.debug("Evicted response cache entry %s (%d bytes)", name, size)
+            if total <= self.max_bytes:
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            return {"entries": len(index), "bytes": sum(size for size, _ in index.values())}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    The process-wide ResponseCache when RESPONSE_CACHE is enabled, else None.
+    Entries live in RESPONSE_CACHE_DIR (default "/tmp/response-cache"), bounded
+    to RESPONSE_CACHE_MAX_MB (default 50).
+    """
+    global _cache
+    if not env_flag("RESPONSE_CACHE"):
+        return None
+    directory = os.environ.get("RESPONSE_CACHE_DIR", "/tmp/response-cache")
+    try:
+        max_bytes = int(float(os.environ.get("RESPONSE_CACHE_MAX_MB", "50")) * 1024 * 1024)
+    except ValueError:
+        max_bytes = 50 * 1024 * 1024
+    with _cache_lock:
+        if _cache is None or _cache.directory != directory or _cache.max_bytes != max_bytes:
+            _cache = ResponseCache(directory, max_bytes)
+        return _cache
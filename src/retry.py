@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import http.client
+import logging
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.error
+from email.utils import parsedate_to_datetime
+
+try:
+    from env import env_float
+except ImportError:
+    from src.env import env_float
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# HTTP statuses worth retrying: timeouts, throttling and server-side failures
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# AWS error codes for throttling and transient service failures
+RETRYABLE_AWS_CODES = frozenset({
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "ProvisionedThroughputExceededException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "InternalError",
+    "InternalFailure",
+    "InternalServerError",
+    "InternalServiceError",
+    "ServiceUnavailable",
+})
+
+# Patched in tests. _async_sleep None means asyncio.sleep, imported in
+# call_with_retry_async so the synchronous cold start does not load asyncio
+_sleep = time.sleep
+_async_sleep = None
+
+# Monotonic time at which the current invocation must have returned (None: no deadline)
+_deadline = None
+
+_retry_lock = threading.Lock()
+_retries = 0
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the invocation's remaining time does not allow another attempt."""
+
+
+def set_deadline_from_context(context):
+    """
+    Start the invocation's time budget from the Lambda context.
+
+    The deadline is the remaining time reported by context.get_remaining_time_in_millis()
+    minus RETRY_DEADLINE_MARGIN_MS (default 1000), kept back for persisting and returning.
+    Without a usable context (local runs, tests) there is no deadline.
+    """
+    global _deadline, _retries
+    _retries = 0
+    remaining_ms = None
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        try:
+            remaining_ms = float(context.get_remaining_time_in_millis())
+        except Exception:
+            remaining_ms = None
+    if remaining_ms is None:
+        _deadline = None
+        return
+    margin_ms = env_float("RETRY_DEADLINE_MARGIN_MS", 1000)
+    _deadline = time.monotonic() + max(0.0, remaining_ms - margin_ms) / 1000.0
+
+
+def remaining_time():
+    """
+    Seconds left in the invocation budget, or None when there is no deadline.
+    """
+    if _deadline is None:
+        return None
+    return _deadline - time.monotonic()
+
+
+def retry_count() -> int:
+    """
+    Number of retries performed since the invocation started.
+    """
+    return _retries
+
+
+def is_retryable(exc) -> bool:
+    """
+    Classify an exception raised by an HTTP or AWS call as transient (worth retrying).
+    """
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code in RETRYABLE_STATUSES
+    # botocore errors can only have been raised once botocore is loaded (see asyncio below)
+    botocore_exceptions = sys.modules.get("botocore.exceptions")
+    if botocore_exceptions is not None:
+        if isinstance(exc, botocore_exceptions.ClientError):
+            error = exc.response.get("Error", {})
+            status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+            return error.get("Code") in RETRYABLE_AWS_CODES or status >= 500
+        if isinstance(exc, (botocore_exceptions.ConnectionError, botocore_exceptions.HTTPClientError)):
+            return True
+    if isinstance(exc, (urllib.error.URLError, http.client.HTTPException)):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError, socket.gaierror)):
+        return True
+    # asyncio.wait_for raises asyncio.TimeoutError, not TimeoutError, before Python 3.11.
+    # It can only have been raised once asyncio is loaded, so it is not imported here.
+    asyncio = sys.modules.get("asyncio")
+    return asyncio is not None and isinstance(exc, asyncio.TimeoutError)
+
+
+def retry_after(exc):
+    """
+    Seconds an HTTP 429/503 error asks the client to wait (its Retry-After header,
+    in seconds or as an HTTP date), or None when it does not say.
+    """
+    headers = getattr(exc, "headers", None)
+    if not isinstance(exc, urllib.error.HTTPError) or headers is None:
+        return None
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def sleep_within_budget(delay: float) -> bool:
+    """
+    Sleep for `delay` seconds unless that would run past the invocation deadline.
+    Returns False (without sleeping) when the budget does not allow it.
+    """
+    remaining = remaining_time()
+    if remaining is not None and delay >= remaining:
+        return False
+    _sleep(delay)
+    return True
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    Defaults come from RETRY_MAX_ATTEMPTS (3), RETRY_BASE_DELAY (0.2s) and
+    RETRY_MAX_DELAY (5s). Attempt n (0-based) sleeps a random time in
+    [0, min(max_delay, base_delay * 2**n)].
+    """
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None):
+        self.max_attempts = max_attempts if max_attempts is not None else int(env_float("RETRY_MAX_ATTEMPTS", 3))
+        self.base_delay = base_delay if base_delay is not None else env_float("RETRY_BASE_DELAY", 0.2)
+        self.max_delay = max_delay if max_delay is not None else env_float("RETRY_MAX_DELAY", 5)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def call_with_retry(fn, *args, policy=None, description=None, **kwargs):
+    """
+    Call fn(*args, **kwargs), retrying transient failures (see is_retryable).
+    An HTTP error with a Retry-After header waits at least that long.
+
+    A retry is only attempted if its backoff sleep still fits in the invocation's
+    remaining time; otherwise the last error is raised. Raises DeadlineExceeded
+    if the budget is already spent before the first attempt.
+    """
+    policy = policy or RetryPolicy()
+    name = description or getattr(fn, "__name__", "call")
+    attempt = 0
+    while True:
+        _check_budget(name)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            _sleep(_retry_delay(policy, attempt, e, name))
+
+
+async def call_with_retry_async(fn, *args, policy=None, description=None, **kwargs):
+    """
+    Coroutine form of call_with_retry: awaits fn(*args, **kwargs) and sleeps
+    between attempts with asyncio.sleep, so other requests keep running.
+    """
+    import asyncio
+
+    sleep = _async_sleep or asyncio.sleep
+    policy = policy or RetryPolicy()
+    name = description or getattr(fn, "__name__", "call")
+    attempt = 0
+    while True:
+        _check_budget(name)
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            await sleep(_retry_delay(policy, attempt, e, name))
+
+
+def _check_budget(name):
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"no time left in invocation budget for {name}")
+
+
+def _retry_delay(policy, attempt, exc, name):
+    """
+    Backoff before retry number `attempt` after `exc`, counted as a retry.
+    Raises `exc` when it is not retryable, attempts are exhausted or the
+    backoff does not fit in the remaining budget.
+    """
+    global _retries
+    if attempt >= policy.max_attempts or not is_retryable(exc):
+        raise exc
+    delay = policy.backoff(attempt - 1)
+    # A server saying when to come back overrides the backoff
+    wait = retry_after(exc)
+    if wait is not None:
+        delay = max(delay, wait)
+    remaining = remaining_time()
+    if remaining is not None and delay >= remaining:
+        logger.warning("Not retrying %s: %.2fs backoff exceeds remaining budget", name, delay)
+        raise exc
+    logger.warning(
+        "Transient error in %s (attempt %d/%d): %s — retrying in %.2fs",
+        name, attempt, policy.max_attempts, exc, delay,
+    )
+    with _retry_lock:
+        _retries += 1
+    return delay
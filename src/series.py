@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from decimal import Decimal
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Prices are stored as fixed-point integers with at least 4 decimal places,
+# and kept exactly up to 12 (see exact_price and SeriesBuilder)
+PRICE_PLACES = 4
+MAX_PRICE_PLACES = 12
+
+
+def fixed_to_decimal(fixed: int, places: int = PRICE_PLACES) -> Decimal:
+    return Decimal(fixed).scaleb(-places)
+
+
+def exact_price(value: Decimal) -> Decimal:
+    """
+    `value` as every stored price is kept: unchanged, unless it has more than
+    MAX_PRICE_PLACES decimal places, which are rounded off.
+    """
+    if value.as_tuple().exponent < -MAX_PRICE_PLACES:
+        return value.quantize(Decimal(1).scaleb(-MAX_PRICE_PLACES))
+    return value
+
+
+def _exact_fixed(raw_price, places):
+    """
+    (fixed, places) for an API price: `places` is raised (up to MAX_PRICE_PLACES)
+    when the price has more decimal places. Raises ValueError/TypeError if the
+    value is not a finite number.
+    """
+    if isinstance(raw_price, bool):
+        raise TypeError("boolean is not a price")
+    if isinstance(raw_price, int):
+        return raw_price * 10 ** places, places
+    if isinstance(raw_price, float):
+        if raw_price != raw_price or raw_price in (float("inf"), float("-inf")):
+            raise ValueError("price is not finite")
+        scale = 10 ** places
+        fixed = round(raw_price * scale)
+        if fixed / scale == raw_price:
+            return fixed, places
+        value = Decimal(repr(raw_price))
+    else:
+        value = Decimal(str(raw_price))
+        if not value.is_finite():
+            raise ValueError("price is not finite")
+    places = max(places, min(MAX_PRICE_PLACES, -value.normalize().as_tuple().exponent))
+    return int(value.scaleb(places).to_integral_value()), places
+
+
+class OilSeries:
+    """
+    Compact daily price series: parallel arrays of date ordinals (array('i'),
+    date.toordinal()) and fixed-point prices (array('q'), 10**places units),
+    sorted by date with one entry per date.
+
+    Range lookups use bisection; Decimal and date objects are only created for
+    the entries a caller actually reads.
+    """
+
+    __slots__ = ("ordinals", "prices", "places")
+
+    def __init__(self, ordinals=None, prices=None, places=PRICE_PLACES):
+        self.ordinals = ordinals if ordinals is not None else array("i")
+        self.prices = prices if prices is not None else array("q")
+        self.places = places
+        if len(self.ordinals) != len(self.prices):
+            raise ValueError("ordinals and prices must have the same length")
+
+    @classmethod
+    def _sorted(cls, ordinals, prices, places, in_order):
+        """
+        The series of collected arrays. Unless they are `in_order` they are sorted
+        by date (with a warning), the last price of a duplicate date winning.
+        """
+        if in_order:
+            return cls(ordinals, prices, places)
+
+        logger.warning("Oil series is not sorted by date — sorting %d entries", len(ordinals))
+        merged = {}
+        for ordinal, price in zip(ordinals, prices):
+            merged[ordinal] = price
+        keys = sorted(merged)
+        return cls(array("i", keys), array("q", (merged[k] for k in keys)), places)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """
+        Build a series from (date_iso, price) pairs (price as Decimal, int, float or str),
+        keeping every price exactly (see SeriesBuilder).
+        """
+        builder = SeriesBuilder()
+        for d, p in pairs:
+            builder.add(date.fromisoformat(d).toordinal(), p)
+        return builder.build()
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def date_at(self, i) -> str:
+        return date.fromordinal(self.ordinals[i]).isoformat()
+
+    def price_at(self, i) -> Decimal:
+        return fixed_to_decimal(self.prices[i], self.places)
+
+    def last(self):
+        """
+        (date_iso, price_decimal) of the most recent entry. Raises IndexError if empty.
+        """
+        return self.date_at(-1), self.price_at(-1)
+
+    def dates(self):
+        return [date.fromordinal(o).isoformat() for o in self.ordinals]
+
+    def items(self):
+        """
+        Iterate (date_iso, price_decimal) in date order.
+        """
+        places = self.places
+        for ordinal, price in zip(self.ordinals, self.prices):
+            yield date.fromordinal(ordinal).isoformat(), fixed_to_decimal(price, places)
+
+    def slice(self, start_iso=None, end_iso=None):
+        """
+        Sub-series with start_iso <= date <= end_iso (either bound may be None).
+        """
+        lo = 0 if start_iso is None else bisect_left(self.ordinals, date.fromisoformat(start_iso).toordinal())
+        hi = len(self.ordinals) if end_iso is None else bisect_right(self.ordinals, date.fromisoformat(end_iso).toordinal())
+        return OilSeries(self.ordinals[lo:hi], self.prices[lo:hi], self.places)
+
+    def __contains__(self, date_iso):
+        ordinal = date.fromisoformat(date_iso).toordinal()
+        i = bisect_left(self.ordinals, ordinal)
+        return i < len(self.ordinals) and self.ordinals[i] == ordinal
+
+    def to_numpy(self):
+        """
+        Return (dates, prices) as NumPy arrays (datetime64[D], float64).
+        Requires NumPy, which is not a runtime dependency.
+        """
+        import numpy as np
+
+        # date.toordinal() is 1 for 0001-01-01; datetime64[D] counts days from 1970-01-01
+        epoch = date(1970, 1, 1).toordinal()
+        days = np.frombuffer(self.ordinals, dtype=np.int32).astype("int64") - epoch
+        prices = np.frombuffer(self.prices, dtype=np.int64) / 10 ** self.places
+        return days.astype("datetime64[D]"), prices
+
+
+class SeriesBuilder:
+    """
+    Collects (ordinal, price) entries one at a time into an OilSeries that keeps
+    every price exactly, as the daily run stores it (Decimal(str(price))).
+
+    The series' scale is the fewest decimal places, from PRICE_PLACES up to
+    MAX_PRICE_PLACES, that hold every price: when a price needs more, the prices
+    collected so far are rescaled. Digits beyond MAX_PRICE_PLACES are rounded off,
+    as exact_price does for the daily run.
+    """
+
+    __slots__ = ("ordinals", "prices", "places", "scale", "in_order")
+
+    def __init__(self):
+        self.ordinals = array("i")
+        self.prices = array("q")
+        self.places = PRICE_PLACES
+        self.scale = 10 ** PRICE_PLACES
+        self.in_order = True
+
+    def add(self, ordinal, raw_price):
+        """
+        Add a price (int, float, Decimal or numeric string); for a date already
+        added last, it replaces that entry. Raises ValueError/TypeError if the
+        price is not a finite number.
+        """
+        # Fast path: a finite float that fits the current scale
+        fixed = None
+        if type(raw_price) is float and raw_price - raw_price == 0:
+            fixed = round(raw_price * self.scale)
+            if fixed / self.scale != raw_price:
+                fixed = None
+        if fixed is None:
+            fixed, places = _exact_fixed(raw_price, self.places)
+            if places != self.places:
+                factor = 10 ** (places - self.places)
+                self.prices = array("q", (p * factor for p in self.prices))
+                self.places = places
+                self.scale = 10 ** places
+        if self.ordinals:
+            last = self.ordinals[-1]
+            if ordinal == last:
+                self.prices[-1] = fixed
+                return
+            if ordinal < last:
+                self.in_order = False
+        self.ordinals.append(ordinal)
+        self.prices.append(fixed)
+
+    def build(self) -> OilSeries:
+        return OilSeries._sorted(self.ordinals, self.prices, self.places, self.in_order)
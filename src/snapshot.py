@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+import logging
+import os
+from decimal import Decimal
+
+try:
+    from env import env_flag
+    from storage import DEFAULT_PK, save_latest_to_s3
+    from timeseries import latest
+except ImportError:
+    from src.env import env_flag
+    from src.storage import DEFAULT_PK, save_latest_to_s3
+    from src.timeseries import latest
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Attributes a snapshot carries for each day
+_SNAPSHOT_ATTRIBUTES = ("oil_price", "exchange_rate", "exchange_rates")
+
+# Stats are rounded like the stored prices
+_STAT_QUANTUM = Decimal("0.0001")
+
+
+def _stats(values):
+    """
+    min/max/mean/change over a window of Decimals (oldest first), or None if empty.
+    """
+    if not values:
+        return None
+    return {
+        "min": min(values),
+        "max": max(values),
+        "mean": (sum(values) / len(values)).quantize(_STAT_QUANTUM),
+        "change": values[-1] - values[0],
+    }
+
+
+# Snapshot layouts: "rows" is a list of day objects, "columnar" one array per attribute
+LAYOUTS = ("rows", "columnar")
+
+
+def _columns(days):
+    """
+    Columnar form of the days: {"date": [...], "oil_price": [...], ...}, with null
+    where a day lacks a value. exchange_rates becomes one array per currency.
+    """
+    columns = {"date": [d["date"] for d in days]}
+    for attr in ("oil_price", "exchange_rate"):
+        if any(attr in d for d in days):
+            columns[attr] = [d.get(attr) for d in days]
+    currencies = sorted({c for d in days for c in d.get("exchange_rates", {})})
+    if currencies:
+        columns["exchange_rates"] = {
+            c: [d.get("exchange_rates", {}).get(c) for d in days] for c in currencies
+        }
+    return columns
+
+
+def build_snapshot(items, pk: str = DEFAULT_PK, layout: str = "rows") -> dict:
+    """
+    Build the published snapshot from stored days (oldest first, see timeseries.latest).
+
+    Contains the days themselves and rolling stats over the window for oil_price
+    and exchange_rate. No timestamps are included, so the snapshot only changes
+    when the data does. With layout="columnar" the days are stored as parallel
+    arrays (see _columns) so attribute names are not repeated per day.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"unknown snapshot layout {layout!r}")
+    days = []
+    for item in items:
+        day = {"date": item["date"]}
+        for attr in _SNAPSHOT_ATTRIBUTES:
+            if attr in item:
+                day[attr] = item[attr]
+        days.append(day)
+
+    stats = {}
+    for attr in ("oil_price", "exchange_rate"):
+        values = [d[attr] for d in days if isinstance(d.get(attr), Decimal)]
+        window = _stats(values)
+        if window is not None:
+            stats[attr] = window
+
+    snapshot = {
+        "pk": pk,
+        "as_of": days[-1]["date"] if days else None,
+        "days": days,
+        "stats": stats,
+    }
+    if layout == "columnar":
+        snapshot["layout"] = "columnar"
+        snapshot["days"] = _columns(days)
+    return snapshot
+
+
+def snapshot_key(source_name: str = None) -> str:
+    """
+    S3 key of a snapshot: SNAPSHOT_KEY (default "latest.json"), with the source
+    name appended for configured sources (e.g. "latest-brent.json").
+    """
+    key = os.environ.get("SNAPSHOT_KEY", "latest.json")
+    if not source_name:
+        return key
+    root, ext = os.path.splitext(key)
+    return f"{root}-{source_name}{ext}"
+
+
+def publish_snapshot(table_name: str, bucket_name: str, key: str, pk: str = DEFAULT_PK, days: int = None):
+    """
+    Publish the latest `days` (default SNAPSHOT_DAYS, 30) of a partition to S3.
+
+    The days are read with one strongly consistent Query, so a write made just
+    before is included. The object is only uploaded when its content changed
+    and is served with Cache-Control "public, max-age=SNAPSHOT_MAX_AGE" (default 300).
+    SNAPSHOT_LAYOUT ("rows" or "columnar", default "rows") selects the layout and
+    SNAPSHOT_GZIP=true uploads the body pre-compressed with Content-Encoding: gzip.
+
+    Returns "uploaded" or "unchanged" (see storage.save_latest_to_s3).
+    """
+    if days is None:
+        days = int(os.environ.get("SNAPSHOT_DAYS", "30"))
+    max_age = int(os.environ.get("SNAPSHOT_MAX_AGE", "300"))
+    layout = os.environ.get("SNAPSHOT_LAYOUT", "rows").strip().lower()
+    gzip_body = env_flag("SNAPSHOT_GZIP")
+    items = latest(table_name, days, pk=pk, attributes=list(_SNAPSHOT_ATTRIBUTES), consistent=True)
+    snapshot = build_snapshot(items, pk=pk, layout=layout)
+    return save_latest_to_s3(
+        bucket_name, key, snapshot, cache_control=f"public, max-age={max_age}", gzip_body=gzip_body,
+    )
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import logging
+import re
+
+try:
+    from fetcher import fetch_oil_data
+except ImportError:
+    from src.fetcher import fetch_oil_data
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Parser name -> fetch function taking the source URL and returning (date_iso, price_decimal)
+_parsers = {
+    # {"bars": [[date, price], ...]} documents, like the oil API
+    "bars": fetch_oil_data,
+}
+
+
+def register_parser(name: str, fetch):
+    """
+    Make a response format available to sources as {"parser": name}.
+    `fetch(url)` must return (date_iso, price_decimal) and raise ExtractionError
+    (or a network error) on failure.
+    """
+    _parsers[name] = fetch
+
+
+def get_parser(name: str):
+    """
+    Return the fetch function registered for `name`. Raises ValueError if unknown.
+    """
+    try:
+        return _parsers[name]
+    except KeyError:
+        raise ValueError(f"unknown source parser {name!r} (known: {', '.join(sorted(_parsers))})")
+
+
+def default_pk(name: str) -> str:
+    """
+    Partition key for a source without an explicit pk, e.g. "brent" -> "BRENT_PRICE".
+    """
+    return re.sub(r"[^A-Z0-9]+", "_", name.upper()).strip("_") + "_PRICE"
+
+
+class Source:
+    """
+    One configured market: a name, the URL to fetch, the parser that reads its
+    response and the DynamoDB partition key its days are stored under.
+    """
+
+    __slots__ = ("name", "url", "parser", "pk")
+
+    def __init__(self, name, url, parser="bars", pk=None):
+        self.name = name
+        self.url = url
+        self.parser = parser
+        self.pk = pk or default_pk(name)
+
+    def fetch(self):
+        """
+        Fetch the source's latest (date_iso, price_decimal).
+        """
+        return get_parser(self.parser)(self.url)
+
+    def __repr__(self):
+        return f"Source(name={self.name!r}, parser={self.parser!r}, pk={self.pk!r})"
+
+
+def load_sources(raw) -> list:
+    """
+    Build Sources from the "sources" list of the SSM store, e.g.:
+      [{"name": "brent", "url": "https://...", "parser": "bars", "pk": "BRENT_PRICE"},
+       {"name": "wti", "url": "https://..."}]
+
+    "parser" defaults to "bars" and "pk" to default_pk(name).
+    Raises ValueError on a malformed list, an unknown parser or duplicate names/pks.
+    """
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("sources must be a non-empty list")
+    sources = []
+    names = set()
+    pks = set()
+    for i, entry in enumerate(raw):
+        if not isinstance(entry, dict):
+            raise ValueError(f"source #{i} must be an object")
+        name = entry.get("name")
+        url = entry.get("url")
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"source #{i} must have a 'name'")
+        if not isinstance(url, str) or not url:
+            raise ValueError(f"source {name!r} must have a 'url'")
+        parser = entry.get("parser", "bars")
+        get_parser(parser)
+        source = Source(name, url, parser=parser, pk=entry.get("pk"))
+        if source.name in names:
+            raise ValueError(f"duplicate source name {name!r}")
+        if source.pk in pks:
+            raise ValueError(f"duplicate source pk {source.pk!r}")
+        names.add(source.name)
+        pks.add(source.pk)
+        sources.append(source)
+    return sources
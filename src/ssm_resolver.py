@@ -2,13 +2,24 @@
 import json
 import logging
 import os
-import boto3
 from typing import Dict
 
+try:
+    from aws_clients import get_client
+    from metrics import span
+    from retry import call_with_retry
+    from ttl_cache import TTLCache
+except ImportError:
+    from src.aws_clients import get_client
+    from src.metrics import span
+    from src.retry import call_with_retry
+    from src.ttl_cache import TTLCache
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ssm = boto3.client("ssm")
+# Resolved stores survive across warm invocations for STORE_CACHE_TTL_SECONDS (default 300)
+_store_cache = TTLCache("store_urls", "STORE_CACHE_TTL_SECONDS")
 
 
 def _candidate_config_paths():
@@ -57,10 +68,12 @@ def _load_mapping(path: str = None) -> dict:
 
 def _get_ssm_parameter_value(name: str) -> str:
     """
-    Fetch a single SSM parameter value (WithDecryption=True). Raises on failure.
+    Fetch a single SSM parameter value (WithDecryption=True). Transient failures
+    are retried with backoff. Raises on failure.
     """
     try:
-        resp = ssm.get_parameter(Name=name, WithDecryption=True)
+        with span("ssm"):
+            resp = call_with_retry(get_client("ssm").get_parameter, Name=name, WithDecryption=True, description="get_parameter")
         return resp["Parameter"]["Value"]
     except Exception as e:
         logger.error("Error fetching SSM parameter %s: %s", name, e)
@@ -75,13 +88,27 @@ def get_store_urls(config_path: str = None) -> Dict[str, str]:
       The mapping must be: {"store_param": "/path/to/one-ssm-param"}
 
     - Reads that single SSM parameter (WithDecryption=True). The parameter's value
-      must be JSON with keys "oil_api" and "exchange_api", e.g.:
+      must be JSON with "exchange_api" and either "oil_api" or "sources", e.g.:
         {"oil_api":"https://api.oil/...","exchange_api":"https://api.fx/..."}
 
-    - Returns: {"oil_api": "<url>", "exchange_api": "<url>"}
+      An optional "exchange_rates_api" key gives a multi-symbol exchange endpoint
+      (see fetcher.fetch_exchange_rates) and is passed through when present.
+      An optional "sources" list configures several markets (see sources.load_sources);
+      with it "oil_api" may be omitted.
+      An optional "rate_limits" object gives per-host request rates
+      (see rate_limit.configure_rate_limits) and is passed through when present.
+
+    - Returns: {"oil_api": "<url>", "exchange_api": "<url>"[, "exchange_rates_api": "<url>"][, "sources": [...]]
+               [, "rate_limits": {...}]}
+
+    The resolved store is cached per config_path (see invalidate_store_urls).
 
     Raises FileNotFoundError, ValueError or boto3-related exceptions on error.
     """
+    cached = _store_cache.get(config_path)
+    if cached is not None:
+        return dict(cached)
+
     mapping = _load_mapping(config_path)
     store_param = mapping["store_param"]
     logger.info("Resolving store parameter %s from SSM", store_param)
@@ -94,7 +121,32 @@ def get_store_urls(config_path: str = None) -> Dict[str, str]:
 
     oil_api = parsed.get("oil_api")
     exchange_api = parsed.get("exchange_api")
-    if not oil_api or not exchange_api:
-        raise ValueError(f"SSM parameter {store_param} JSON must contain both 'oil_api' and 'exchange_api'")
-
-    return {"oil_api": oil_api, "exchange_api": exchange_api}
\ No newline at end of file
+    sources = parsed.get("sources")
+    if sources is not None and (not isinstance(sources, list) or not sources):
+        raise ValueError(f"SSM parameter {store_param} 'sources' must be a non-empty list")
+    rate_limits = parsed.get("rate_limits")
+    if rate_limits is not None and not isinstance(rate_limits, dict):
+        raise ValueError(f"SSM parameter {store_param} 'rate_limits' must be an object")
+    if not exchange_api or not (oil_api or sources):
+        raise ValueError(
+            f"SSM parameter {store_param} JSON must contain 'exchange_api' and either 'oil_api' or 'sources'"
+        )
+
+    store = {"exchange_api": exchange_api}
+    if oil_api:
+        store["oil_api"] = oil_api
+    if sources:
+        store["sources"] = sources
+    if parsed.get("exchange_rates_api"):
+        store["exchange_rates_api"] = parsed["exchange_rates_api"]
+    if rate_limits:
+        store["rate_limits"] = rate_limits
+    _store_cache.set(config_path, store)
+    return dict(store)
+
+
+def invalidate_store_urls():
+    """
+    Drop every cached store so the next get_store_urls call re-reads config and SSM.
+    """
+    _store_cache.invalidate()
\ No newline at end of file
@@ -1,40 +1,74 @@
 #!/usr/bin/env python3
+import base64
+import gzip
+import hashlib
 import json
 import logging
 from datetime import datetime
 from decimal import Decimal
 
-import boto3
+try:
+    from aggregates import AGGREGATE_ATTRIBUTES, SeriesAggregates, aggregate_windows
+    from aws_clients import get_client, get_resource
+    from env import env_flag
+    from metrics import add, span
+    from retry import RetryPolicy, call_with_retry, sleep_within_budget
+except ImportError:
+    from src.aggregates import AGGREGATE_ATTRIBUTES, SeriesAggregates, aggregate_windows
+    from src.aws_clients import get_client, get_resource
+    from src.env import env_flag
+    from src.metrics import add, span
+    from src.retry import RetryPolicy, call_with_retry, sleep_within_budget
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-s3_client = boto3.client("s3")
+# Partition key of the daily oil price items (other sources set their own)
+DEFAULT_PK = "OIL_PRICE"
 
+# BatchWriteItem accepts at most 25 put requests
+BATCH_WRITE_SIZE = 25
 
-def save_to_dynamodb(table_name: str, date_str: str, oil_price, exchange_rate):
-    """
-    Save the minimal day's data into DynamoDB.
+# Table handles are reused across calls and warm invocations
+_tables = {}
 
-    Parameters:
-      - table_name: DynamoDB table name
-      - date_str: sort key date as ISO string (YYYY-MM-DD)
-      - oil_price: Decimal (or numeric/str convertible to Decimal) or None
-      - exchange_rate: Decimal (or numeric/str convertible to Decimal) or None
+# Value attributes compared by idempotent writes
+_VALUE_ATTRIBUTES = ("oil_price", "exchange_rate", "exchange_rates")
 
-    The stored item contains:
-      - pk (partition key): "OIL_PRICE" (constant)
-      - date (sort key)
-      - fetched_at (ISO timestamp)
-      - oil_price (Decimal)  -- omitted if None
-      - exchange_rate (Decimal) -- omitted if None
+# Values known to be stored, keyed by (table_name, pk, date): {attribute: value}.
+# Lets warm containers skip redundant writes and reads without a request.
+_known_items = {}
+_KNOWN_ITEMS_MAX = 4096
 
-    Note: DynamoDB expects Decimal for numeric types when using boto3.
+# SHA-256 of the last body this container uploaded, keyed by (bucket, key)
+_published_hashes = {}
+
+# Rolling aggregates of a series live in one item: pk "AGG#<series pk>", date "latest"
+AGGREGATE_PK_PREFIX = "AGG#"
+AGGREGATE_SORT_KEY = "latest"
+
+# Last aggregate state this container wrote, keyed by (table_name, pk): (version, SeriesAggregates)
+_aggregates = {}
+
+
+def get_table(table_name: str):
+    """
+    The DynamoDB Table handle for table_name, created once per container and
+    recreated only when the shared dynamodb resource is replaced.
+    """
+    dynamodb = get_resource("dynamodb")
+    cached = _tables.get(table_name)
+    if cached is None or cached[0] is not dynamodb:
+        cached = _tables[table_name] = (dynamodb, dynamodb.Table(table_name))
+    return cached[1]
+
+
+def build_item(date_str: str, oil_price, exchange_rate, exchange_rates=None, pk: str = DEFAULT_PK) -> dict:
+    """
+    Build the minimal DynamoDB item for one day (see save_to_dynamodb for the layout).
     """
-    table = dynamodb.Table(table_name)
     item = {
-        "pk": "OIL_PRICE",
+        "pk": pk,
         "date": date_str,
         "fetched_at": datetime.utcnow().isoformat() + "Z",
     }
@@ -50,36 +84,384 @@ def save_to_dynamodb(table_name: str, date_str: str, oil_price, exchange_rate):
             item["exchange_rate"] = Decimal(str(exchange_rate))
         except Exception:
             item["exchange_rate"] = str(exchange_rate)
+    if exchange_rates:
+        rates = {}
+        for currency, rate in exchange_rates.items():
+            try:
+                rates[currency] = Decimal(str(rate))
+            except Exception:
+                rates[currency] = str(rate)
+        item["exchange_rates"] = rates
+    return item
+
+
+def _remember(table_name: str, pk: str, item: dict):
+    if len(_known_items) >= _KNOWN_ITEMS_MAX:
+        _known_items.clear()
+    _known_items[(table_name, pk, item["date"])] = {
+        attr: item[attr] for attr in _VALUE_ATTRIBUTES if attr in item
+    }
+
+
+def get_stored_day(table_name: str, date_str: str, pk: str = DEFAULT_PK):
+    """
+    Return the stored values {"oil_price": ..., "exchange_rate": ..., "exchange_rates": {...}}
+    for a day (attributes the item lacks are omitted), or None if the day is not in the table. Answers from the local known-items
+    cache when possible, otherwise with a single projected GetItem.
+    """
+    known = _known_items.get((table_name, pk, date_str))
+    if known is not None:
+        return dict(known)
+    with span("ddb_get"):
+        resp = call_with_retry(
+            get_table(table_name).get_item,
+            Key={"pk": pk, "date": date_str},
+            ProjectionExpression="#d, oil_price, exchange_rate, exchange_rates",
+            ExpressionAttributeNames={"#d": "date"},
+            description="get_item",
+        )
+    item = resp.get("Item")
+    if item is None:
+        return None
+    _remember(table_name, pk, item)
+    return {attr: item[attr] for attr in _VALUE_ATTRIBUTES if attr in item}
+
+
+def save_to_dynamodb(table_name: str, date_str: str, oil_price, exchange_rate, idempotent: bool = False,
+                     exchange_rates=None, pk: str = DEFAULT_PK):
+    """
+    Save the minimal day's data into DynamoDB.
+
+    Parameters:
+      - table_name: DynamoDB table name
+      - date_str: sort key date as ISO string (YYYY-MM-DD)
+      - oil_price: Decimal (or numeric/str convertible to Decimal) or None
+      - exchange_rate: Decimal (or numeric/str convertible to Decimal) or None
+      - idempotent: skip the write when the same values are already stored
+      - exchange_rates: optional {currency: rate} map for multi-currency runs
+      - pk: partition key (default "OIL_PRICE"; each configured source has its own)
+
+    The stored item contains:
+      - pk (partition key): "OIL_PRICE" unless another pk is given
+      - date (sort key)
+      - fetched_at (ISO timestamp)
+      - oil_price (Decimal)  -- omitted if None
+      - exchange_rate (Decimal) -- omitted if None
+      - exchange_rates (map of currency -> Decimal) -- omitted if not given
+
+    In idempotent mode the put is conditional on the day being absent or one of
+    its values differing, so re-runs neither consume write capacity nor bump
+    fetched_at; values already known to this container skip the request entirely.
+
+    Returns "new" (no item existed), "changed" (an item was replaced) or
+    "noop" (idempotent mode, identical values already stored).
+
+    Note: DynamoDB expects Decimal for numeric types when using boto3.
+    """
+    table = get_table(table_name)
+    item = build_item(date_str, oil_price, exchange_rate, exchange_rates, pk=pk)
+    values = {attr: item[attr] for attr in _VALUE_ATTRIBUTES if attr in item}
+
+    put_kwargs = {"Item": item, "ReturnValues": "ALL_OLD"}
+    if idempotent:
+        if _known_items.get((table_name, pk, date_str)) == values:
+            logger.info("Item for %s already stored with the same values — skipping write", date_str)
+            return "noop"
+        conditions = ["attribute_not_exists(#d)"]
+        names = {"#d": "date"}
+        attr_values = {}
+        for i, (attr, value) in enumerate(values.items()):
+            names[f"#a{i}"] = attr
+            attr_values[f":v{i}"] = value
+            conditions.append(f"attribute_not_exists(#a{i}) OR #a{i} <> :v{i}")
+        put_kwargs["ConditionExpression"] = " OR ".join(f"({c})" for c in conditions)
+        put_kwargs["ExpressionAttributeNames"] = names
+        if attr_values:
+            put_kwargs["ExpressionAttributeValues"] = attr_values
 
     logger.info("Putting minimal item into DynamoDB table %s: %s", table_name, item)
-    table.put_item(Item=item)
-    logger.info("Successfully saved minimal item to DynamoDB")
+    from botocore.exceptions import ClientError
+    try:
+        with span("ddb_put"):
+            resp = table.put_item(**put_kwargs)
+    except ClientError as e:
+        if not idempotent or e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        logger.info("Item for %s already stored with the same values — write skipped", date_str)
+        _remember(table_name, pk, item)
+        return "noop"
+
+    _remember(table_name, pk, item)
+    add("ddb_items_written")
+    status = "changed" if (resp or {}).get("Attributes") else "new"
+    logger.info("Successfully saved minimal item to DynamoDB (%s)", status)
+    _maintain_aggregates(table_name, pk, [item])
+    return status
+
+
+def write_batch(table_name: str, records, max_attempts: int = None, pk: str = DEFAULT_PK) -> dict:
+    """
+    Save many days of data into DynamoDB with BatchWriteItem.
+
+    Parameters:
+      - table_name: DynamoDB table name
+      - records: iterable of (date_str, oil_price, exchange_rate) tuples, optionally
+        with a fourth {currency: rate} element (see save_to_dynamodb)
+      - max_attempts: attempts per batch for UnprocessedItems (default: RETRY_MAX_ATTEMPTS)
+      - pk: partition key of every record (default "OIL_PRICE")
+
+    Items have the same layout as save_to_dynamodb and are written with write_items.
+
+    Returns {"written": n, "failed": n, "requests": n}.
+    """
+    items = [build_item(*record, pk=pk) for record in records]
+    return write_items(table_name, items, max_attempts=max_attempts)
+
+
+def write_items(table_name: str, items, max_attempts: int = None) -> dict:
+    """
+    Write prebuilt items (see build_item) with BatchWriteItem, across any partition keys.
+
+    Parameters:
+      - table_name: DynamoDB table name
+      - items: iterable of item dicts
+      - max_attempts: attempts per batch for UnprocessedItems (default: RETRY_MAX_ATTEMPTS)
+
+    A later item for the same (pk, date) replaces an earlier one. Items are sent
+    25 per request, and items DynamoDB returns as UnprocessedItems are resent
+    with exponential backoff.
+
+    Returns {"written": n, "failed": n, "requests": n}.
+    """
+    by_key = {}
+    for item in items:
+        by_key[(item["pk"], item["date"])] = item
+    pending_items = [by_key[k] for k in sorted(by_key)]
+
+    policy = RetryPolicy(max_attempts=max_attempts)
+    written = 0
+    failed = 0
+    requests = 0
+    stored = {}
+    for start in range(0, len(pending_items), BATCH_WRITE_SIZE):
+        chunk = pending_items[start:start + BATCH_WRITE_SIZE]
+        pending = [{"PutRequest": {"Item": item}} for item in chunk]
+        attempt = 0
+        while pending:
+            with span("ddb_batch_write"):
+                resp = call_with_retry(
+                    get_resource("dynamodb").batch_write_item,
+                    RequestItems={table_name: pending},
+                    description="batch_write_item",
+                )
+            requests += 1
+            attempt += 1
+            unprocessed = resp.get("UnprocessedItems", {}).get(table_name, [])
+            written += len(pending) - len(unprocessed)
+            pending = unprocessed
+            if not pending:
+                break
+            if attempt >= policy.max_attempts or not sleep_within_budget(policy.backoff(attempt - 1)):
+                logger.error("Giving up on %d unprocessed items for table %s", len(pending), table_name)
+                failed += len(pending)
+                break
+            logger.warning("Retrying %d unprocessed items for table %s", len(pending), table_name)
+        unwritten = {(req["PutRequest"]["Item"]["pk"], req["PutRequest"]["Item"]["date"]) for req in pending}
+        for item in chunk:
+            if (item["pk"], item["date"]) not in unwritten:
+                _remember(table_name, item["pk"], item)
+                stored.setdefault(item["pk"], []).append(item)
+
+    logger.info(
+        "Batch write to %s: %d written, %d failed in %d requests",
+        table_name, written, failed, requests,
+    )
+    add("ddb_items_written", written)
+    for pk, pk_items in stored.items():
+        _maintain_aggregates(table_name, pk, pk_items)
+    return {"written": written, "failed": failed, "requests": requests}
+
+
+def _aggregates_enabled() -> bool:
+    return env_flag("ROLLING_AGGREGATES")
+
+
+def _maintain_aggregates(table_name: str, pk: str, items):
+    """
+    Apply freshly written day items to their series' aggregates when
+    ROLLING_AGGREGATES is enabled. The days are already stored, so a failure
+    is logged rather than raised.
+    """
+    if not _aggregates_enabled():
+        return
+    try:
+        with span("aggregates"):
+            update_aggregates(table_name, pk, [(item["date"], item) for item in items])
+    except Exception as e:
+        logger.error("Failed to update aggregates of %s in %s: %s", pk, table_name, e)
 
 
-def save_latest_to_s3(bucket_name: str, key: str, data: dict):
+def update_aggregates(table_name: str, pk: str, days, max_attempts: int = 3):
     """
-    Save the latest data to S3 as JSON.
+    Fold stored days into the rolling aggregates item of a series.
+
+    Parameters:
+      - table_name: DynamoDB table name
+      - pk: partition key of the series (e.g. "OIL_PRICE")
+      - days: iterable of (date_str, {"oil_price": ..., "exchange_rate": ...})
+      - max_attempts: attempts when another writer updated the item concurrently
+
+    The aggregates item (pk "AGG#<pk>", date "latest") holds the summary
+    (see aggregates.SeriesAggregates.summary) and the incremental state, so a new
+    day costs O(1) per window instead of re-reading history. A container reuses
+    the state it last wrote; the put is conditional on the stored version, and on
+    a conflict the item is re-read and the days applied again.
+
+    Returns the new summary.
+    """
+    days = sorted(days, key=lambda day: day[0])
+    windows = aggregate_windows()
+    table = get_table(table_name)
+    from botocore.exceptions import ClientError
+    key = {"pk": AGGREGATE_PK_PREFIX + pk, "date": AGGREGATE_SORT_KEY}
+    for attempt in range(1, max_attempts + 1):
+        cached = _aggregates.pop((table_name, pk), None)
+        if cached is None:
+            resp = call_with_retry(table.get_item, Key=key, ConsistentRead=True, description="get_item")
+            stored = resp.get("Item")
+            version = int(stored["version"]) if stored else 0
+            series = SeriesAggregates.from_dict(stored["state"], windows) if stored else SeriesAggregates(windows)
+        else:
+            version, series = cached
+            if series.windows != tuple(sorted(windows)):
+                series = SeriesAggregates.from_dict(series.to_dict(), windows)
+
+        for date_str, values in days:
+            series.push(date_str, {attr: values.get(attr) for attr in AGGREGATE_ATTRIBUTES})
+
+        summary = series.summary()
+        item = dict(
+            key,
+            as_of=series.last_date,
+            version=version + 1,
+            updated_at=datetime.utcnow().isoformat() + "Z",
+            aggregates=summary,
+            state=series.to_dict(),
+        )
+        condition = {"ExpressionAttributeNames": {"#v": "version"}}
+        if version:
+            condition["ConditionExpression"] = "#v = :v"
+            condition["ExpressionAttributeValues"] = {":v": version}
+        else:
+            condition["ConditionExpression"] = "attribute_not_exists(#v)"
+        try:
+            call_with_retry(table.put_item, Item=item, description="put_item", **condition)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException" or attempt == max_attempts:
+                raise
+            logger.warning("Aggregates of %s changed concurrently — re-reading (attempt %d)", pk, attempt)
+            continue
+        _aggregates[(table_name, pk)] = (version + 1, series)
+        return summary
+
+
+def get_aggregates(table_name: str, pk: str = DEFAULT_PK):
+    """
+    Return the stored rolling aggregates summary of a series (see update_aggregates),
+    or None if none were computed yet. Reads only the summary, not the state.
+    """
+    resp = call_with_retry(
+        get_table(table_name).get_item,
+        Key={"pk": AGGREGATE_PK_PREFIX + pk, "date": AGGREGATE_SORT_KEY},
+        ProjectionExpression="#o, #a",
+        ExpressionAttributeNames={"#o": "as_of", "#a": "aggregates"},
+        description="get_item",
+    )
+    item = resp.get("Item")
+    if item is None:
+        return None
+    return dict(item["aggregates"], as_of=item.get("as_of"))
+
+
+def _json_default(value):
+    # DynamoDB numbers come back as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _is_not_found(error) -> bool:
+    code = error.response.get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+def save_latest_to_s3(bucket_name: str, key: str, data: dict, cache_control: str = None, gzip_body: bool = False):
+    """
+    Save the latest data to S3 as JSON, only when its content changed.
 
     Parameters:
       - bucket_name: S3 bucket name
       - key: S3 object key (e.g., 'latest.json')
-      - data: dictionary to save as JSON
+      - data: dictionary to save as JSON (Decimal values allowed)
+      - cache_control: Cache-Control header for the object (e.g. 'public, max-age=300')
+      - gzip_body: upload the body gzip-compressed with Content-Encoding: gzip
 
-    The data is serialized to JSON and uploaded to S3.
+    The data is serialized to compact JSON with sorted keys, so identical content
+    always gives identical bytes. Its SHA-256 (covering the encoding too) is stored as object metadata and
+    compared before uploading: first against the hash this container last
+    published, then with a HeadObject. S3 sets the object's ETag (the MD5 of the
+    body), which CloudFront and browsers use to revalidate.
+
+    Returns "uploaded", "unchanged", or None when no bucket is configured.
     """
     if not bucket_name:
         logger.warning("S3 bucket name not provided, skipping S3 upload")
-        return
+        return None
+
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=_json_default).encode("utf-8")
+    encoding = "gzip" if gzip_body else "identity"
+    digest = hashlib.sha256(encoding.encode("ascii") + b"\n" + body).hexdigest()
+    if _published_hashes.get((bucket_name, key)) == digest:
+        logger.info("s3://%s/%s is up to date (known hash) — skipping upload", bucket_name, key)
+        return "unchanged"
 
+    s3 = get_client("s3")
+    from botocore.exceptions import ClientError
     try:
-        json_data = json.dumps(data, indent=2)
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=key,
-            Body=json_data.encode('utf-8'),
-            ContentType='application/json'
-        )
-        logger.info("Successfully saved data to S3: s3://%s/%s", bucket_name, key)
+        try:
+            with span("s3_head"):
+                head = call_with_retry(s3.head_object, Bucket=bucket_name, Key=key, description="head_object")
+        except ClientError as e:
+            if not _is_not_found(e):
+                raise
+            head = None
+        if head is not None and head.get("Metadata", {}).get("sha256") == digest:
+            _published_hashes[(bucket_name, key)] = digest
+            logger.info("s3://%s/%s is up to date — skipping upload", bucket_name, key)
+            return "unchanged"
+
+        if gzip_body:
+            # mtime=0 keeps the compressed bytes (and so the ETag) stable for the same content
+            raw_size = len(body)
+            body = gzip.compress(body, compresslevel=9, mtime=0)
+            logger.info("Snapshot gzip: %d -> %d bytes", raw_size, len(body))
+        put_kwargs = {
+            "Bucket": bucket_name,
+            "Key": key,
+            "Body": body,
+            "ContentType": "application/json",
+            "ContentMD5": base64.b64encode(hashlib.md5(body).digest()).decode("ascii"),
+            "Metadata": {"sha256": digest},
+        }
+        if cache_control:
+            put_kwargs["CacheControl"] = cache_control
+        if gzip_body:
+            put_kwargs["ContentEncoding"] = "gzip"
+        with span("s3_put"):
+            resp = call_with_retry(s3.put_object, description="put_object", **put_kwargs)
+        _published_hashes[(bucket_name, key)] = digest
+        logger.info("Successfully saved data to S3: s3://%s/%s (ETag %s)", bucket_name, key, resp.get("ETag"))
+        return "uploaded"
     except Exception as e:
         logger.error("Failed to save data to S3: %s", e)
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import logging
+
+try:
+    from retry import call_with_retry
+    from storage import DEFAULT_PK, get_table
+except ImportError:
+    from src.retry import call_with_retry
+    from src.storage import DEFAULT_PK, get_table
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def _query_kwargs(pk, start_date, end_date, attributes, newest_first, consistent=False):
+    """
+    Build the Query parameters for one partition and an optional date range.
+    Every attribute name is aliased, since "date" is a DynamoDB reserved word;
+    DynamoDB rejects unused aliases, so "#d" is only declared when referenced.
+    """
+    names = {"#pk": "pk"}
+    values = {":pk": pk}
+    condition = "#pk = :pk"
+    if start_date and end_date:
+        condition += " AND #d BETWEEN :from AND :to"
+        values[":from"] = start_date
+        values[":to"] = end_date
+    elif start_date:
+        condition += " AND #d >= :from"
+        values[":from"] = start_date
+    elif end_date:
+        condition += " AND #d <= :to"
+        values[":to"] = end_date
+
+    kwargs = {
+        "KeyConditionExpression": condition,
+        "ExpressionAttributeValues": values,
+        "ScanIndexForward": not newest_first,
+    }
+    if consistent:
+        kwargs["ConsistentRead"] = True
+    if start_date or end_date or attributes:
+        names["#d"] = "date"
+    if attributes:
+        projection = ["#d"]
+        for i, attr in enumerate(attributes):
+            if attr == "date":
+                continue
+            names[f"#p{i}"] = attr
+            projection.append(f"#p{i}")
+        kwargs["ProjectionExpression"] = ", ".join(projection)
+    kwargs["ExpressionAttributeNames"] = names
+    return kwargs
+
+
+def iter_range(table_name: str, start_date: str = None, end_date: str = None, pk: str = DEFAULT_PK,
+               attributes=None, newest_first: bool = False, limit: int = None, page_size: int = None,
+               consistent: bool = False):
+    """
+    Yield the stored days of one partition, one item dict at a time.
+
+    Parameters:
+      - table_name: DynamoDB table name
+      - start_date / end_date: inclusive YYYY-MM-DD bounds (either may be None)
+      - pk: partition key (default "OIL_PRICE")
+      - attributes: attribute names to fetch, e.g. ["oil_price"] (default: whole items);
+        "date" is always included
+      - newest_first: iterate by descending date
+      - limit: stop after this many items
+      - page_size: items per Query request (default: DynamoDB's 1 MB pages)
+      - consistent: strongly consistent reads (sees writes made just before)
+
+    Pages are requested lazily as the caller iterates, following LastEvaluatedKey;
+    each Query is retried on transient failures.
+    """
+    if limit is not None and limit <= 0:
+        return
+    table = get_table(table_name)
+    kwargs = _query_kwargs(pk, start_date, end_date, attributes, newest_first, consistent)
+    yielded = 0
+    pages = 0
+    while True:
+        request = dict(kwargs)
+        page_limit = page_size
+        if limit is not None:
+            page_limit = min(page_limit or limit, limit - yielded)
+        if page_limit:
+            request["Limit"] = page_limit
+        resp = call_with_retry(table.query, description="query", **request)
+        pages += 1
+        for item in resp.get("Items", []):
+            yield item
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            logger.debug("Query on %s/%s returned %d items in %d pages", table_name, pk, yielded, pages)
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def query_range(table_name: str, start_date: str = None, end_date: str = None, pk: str = DEFAULT_PK,
+                attributes=None, newest_first: bool = False, limit: int = None, consistent: bool = False) -> list:
+    """
+    List form of iter_range.
+    """
+    return list(iter_range(
+        table_name, start_date, end_date, pk=pk, attributes=attributes,
+        newest_first=newest_first, limit=limit, consistent=consistent,
+    ))
+
+
+def latest(table_name: str, n: int, pk: str = DEFAULT_PK, attributes=None, consistent: bool = False) -> list:
+    """
+    The `n` most recent stored days of a partition, oldest first.
+    """
+    items = query_range(
+        table_name, pk=pk, attributes=attributes, newest_first=True, limit=n, consistent=consistent,
+    )
+    items.reverse()
+    return items
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+
+# All caches created in this process, by name, so their counters can be reported together
+_registry = {}
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe in-memory cache whose entries expire after a TTL.
+
+    Instances live at module level, so they survive across warm Lambda invocations.
+    The TTL (seconds) is read from the `ttl_env` environment variable each time a value
+    is stored, falling back to `default_ttl`; a TTL of 0 disables caching.
+    """
+
+    def __init__(self, name: str, ttl_env: str, default_ttl: float = 300):
+        self.name = name
+        self.ttl_env = ttl_env
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def ttl(self) -> float:
+        try:
+            return float(os.environ.get(self.ttl_env, self.default_ttl))
+        except ValueError:
+            return float(self.default_ttl)
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for `key`, or `default` if absent or expired.
+        Counts a hit or a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        ttl = self.ttl()
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key=_MISSING):
+        """
+        Drop one key, or every entry when no key is given.
+        """
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def cache_stats() -> dict:
+    """
+    Hit/miss counters of every registered cache, keyed by cache name.
+    """
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -15,6 +15,17 @@ module "dynamodb" {
   tags       = var.tags
 }
 
+locals {
+  lambda_environment = merge(
+    {
+      DDB_TABLE_NAME          = module.dynamodb.table_name
+      EXCHANGE_API_KEY_SECRET = module.secrets.secret_arn
+    },
+    var.snapshot_bucket_name != "" ? { SNAPSHOT_BUCKET = var.snapshot_bucket_name } : {}
+  )
+  snapshot_bucket_arn = var.snapshot_bucket_name != "" ? "arn:aws:s3:::${var.snapshot_bucket_name}" : ""
+}
+
 # Lambda function
 module "lambda" {
   source           = "./modules/lambda"
@@ -25,15 +36,75 @@ module "lambda" {
   handler          = "app.lambda_handler"
   runtime          = "python3.10"
   store_param_name = var.store_param_name
+  environment      = local.lambda_environment
 
-  environment = {
-    DDB_TABLE_NAME          = module.dynamodb.table_name
-    EXCHANGE_API_KEY_SECRET = module.secrets.secret_arn
-  }
+  dynamodb_table_arn  = module.dynamodb.table_arn
+  secrets_arns        = [module.secrets.secret_arn]
+  snapshot_bucket_arn = local.snapshot_bucket_arn
+  tags                = var.tags
+}
+
+# Fan-out backfill (optional): the coordinator splits a backfill event into chunks
+# on the queue, the worker backfills them
+module "backfill_queue" {
+  count  = var.enable_backfill_fanout ? 1 : 0
+  source = "./modules/sqs"
+
+  queue_name                 = "${var.lambda_function_name}-backfill"
+  visibility_timeout_seconds = 6 * var.backfill_worker_timeout
+  tags                       = var.tags
+}
+
+module "backfill_coordinator" {
+  count            = var.enable_backfill_fanout ? 1 : 0
+  source           = "./modules/lambda"
+  lambda_zip_path  = var.lambda_zip_path
+  s3_bucket        = var.s3_lambda_bucket
+  s3_key           = var.s3_lambda_key
+  function_name    = "${var.lambda_function_name}-backfill-coordinator"
+  handler          = "fanout.coordinator_handler"
+  runtime          = "python3.10"
+  timeout          = 120
+  store_param_name = var.store_param_name
+  environment      = merge(local.lambda_environment, { BACKFILL_QUEUE_URL = module.backfill_queue[0].queue_url })
 
-  dynamodb_table_arn = module.dynamodb.table_arn
-  secrets_arns       = [module.secrets.secret_arn]
-  tags               = var.tags
+  dynamodb_table_arn  = module.dynamodb.table_arn
+  sqs_send_queue_arns = [module.backfill_queue[0].queue_arn]
+  tags                = var.tags
+}
+
+module "backfill_worker" {
+  count            = var.enable_backfill_fanout ? 1 : 0
+  source           = "./modules/lambda"
+  lambda_zip_path  = var.lambda_zip_path
+  s3_bucket        = var.s3_lambda_bucket
+  s3_key           = var.s3_lambda_key
+  function_name    = "${var.lambda_function_name}-backfill-worker"
+  handler          = "fanout.worker_handler"
+  runtime          = "python3.10"
+  timeout          = var.backfill_worker_timeout
+  store_param_name = var.store_param_name
+  environment      = local.lambda_environment
+
+  dynamodb_table_arn    = module.dynamodb.table_arn
+  secrets_arns          = [module.secrets.secret_arn]
+  snapshot_bucket_arn   = local.snapshot_bucket_arn
+  sqs_receive_queue_arn = module.backfill_queue[0].queue_arn
+  tags                  = var.tags
+}
+
+resource "aws_lambda_event_source_mapping" "backfill_worker" {
+  count            = var.enable_backfill_fanout ? 1 : 0
+  event_source_arn = module.backfill_queue[0].queue_arn
+  function_name    = module.backfill_worker[0].function_arn
+  batch_size       = var.backfill_batch_size
+
+  # The worker returns failed chunks in batchItemFailures
+  function_response_types = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = var.backfill_max_concurrency
+  }
 }
 
 # EventBridge rule to trigger Lambda daily
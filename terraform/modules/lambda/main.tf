@@ -34,7 +34,10 @@ resource "aws_iam_role_policy" "lambda_policy" {
         Action = [
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
-          "dynamodb:GetItem"
+          "dynamodb:GetItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:Query"
         ]
         Effect   = "Allow"
         Resource = var.dynamodb_table_arn
@@ -67,6 +70,49 @@ resource "aws_iam_role_policy" "lambda_policy" {
           Effect   = "Allow"
           Resource = var.secrets_arns
         }
+      ] : [],
+      var.snapshot_bucket_arn != "" ? [
+        {
+          Sid = "SnapshotPublish"
+          Action = [
+            "s3:GetObject",
+            "s3:PutObject"
+          ]
+          Effect   = "Allow"
+          Resource = "${var.snapshot_bucket_arn}/*"
+        },
+        {
+          # Lets HeadObject report a missing snapshot as 404 instead of 403
+          Sid = "SnapshotList"
+          Action = [
+            "s3:ListBucket"
+          ]
+          Effect   = "Allow"
+          Resource = var.snapshot_bucket_arn
+        }
+      ] : [],
+      length(var.sqs_send_queue_arns) > 0 ? [
+        {
+          # SendMessageBatch is authorized by sqs:SendMessage
+          Sid = "QueueSend"
+          Action = [
+            "sqs:SendMessage"
+          ]
+          Effect   = "Allow"
+          Resource = var.sqs_send_queue_arns
+        }
+      ] : [],
+      var.sqs_receive_queue_arn != "" ? [
+        {
+          Sid = "QueueReceive"
+          Action = [
+            "sqs:ReceiveMessage",
+            "sqs:DeleteMessage",
+            "sqs:GetQueueAttributes"
+          ]
+          Effect   = "Allow"
+          Resource = var.sqs_receive_queue_arn
+        }
     ] : [])
   })
 }
@@ -99,7 +145,7 @@ resource "aws_lambda_function" "this" {
   handler       = var.handler
   runtime       = var.runtime
   role          = aws_iam_role.lambda_role.arn
-  timeout       = 30
+  timeout       = var.timeout
 
   # source_code_hash: use local file hash or S3 object etag
   source_code_hash = length(trim(var.lambda_zip_path, " ")) > 0 ? filebase64sha256(var.lambda_zip_path) : (length(data.aws_s3_object.lambda_zip) > 0 ? data.aws_s3_object.lambda_zip[0].etag : null)
@@ -31,6 +31,12 @@ variable "runtime" {
   type        = string
 }
 
+variable "timeout" {
+  description = "Lambda timeout in seconds"
+  type        = number
+  default     = 30
+}
+
 variable "environment" {
   description = "Map of environment variables for the Lambda"
   type        = map(string)
@@ -48,6 +54,24 @@ variable "secrets_arns" {
   default     = []
 }
 
+variable "snapshot_bucket_arn" {
+  description = "ARN of the S3 bucket the Lambda publishes its latest snapshot to (optional)"
+  type        = string
+  default     = ""
+}
+
+variable "sqs_send_queue_arns" {
+  description = "ARNs of the SQS queues the Lambda sends messages to (optional)"
+  type        = list(string)
+  default     = []
+}
+
+variable "sqs_receive_queue_arn" {
+  description = "ARN of the SQS queue the Lambda consumes through an event source mapping (optional)"
+  type        = string
+  default     = ""
+}
+
 variable "store_param_name" {
   description = "SSM parameter name containing the JSON with oil_api and exchange_api"
   type        = string
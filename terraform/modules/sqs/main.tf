@@ -0,0 +1,20 @@
+# Chunks that keep failing end up here after max_receive_count deliveries
+resource "aws_sqs_queue" "dead_letter" {
+  name                      = "${var.queue_name}-dlq"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = var.tags
+}
+
+resource "aws_sqs_queue" "this" {
+  name                       = var.queue_name
+  visibility_timeout_seconds = var.visibility_timeout_seconds
+  message_retention_seconds  = var.message_retention_seconds
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.dead_letter.arn
+    maxReceiveCount     = var.max_receive_count
+  })
+
+  tags = var.tags
+}
@@ -0,0 +1,14 @@
+output "queue_url" {
+  description = "URL of the SQS queue"
+  value       = aws_sqs_queue.this.url
+}
+
+output "queue_arn" {
+  description = "ARN of the SQS queue"
+  value       = aws_sqs_queue.this.arn
+}
+
+output "dead_letter_queue_arn" {
+  description = "ARN of the dead-letter queue"
+  value       = aws_sqs_queue.dead_letter.arn
+}
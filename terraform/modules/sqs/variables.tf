@@ -0,0 +1,28 @@
+variable "queue_name" {
+  description = "Name of the SQS queue (the dead-letter queue gets a -dlq suffix)"
+  type        = string
+}
+
+variable "visibility_timeout_seconds" {
+  description = "Visibility timeout; must exceed the timeout of the function consuming the queue"
+  type        = number
+  default     = 900
+}
+
+variable "message_retention_seconds" {
+  description = "How long unprocessed messages are kept"
+  type        = number
+  default     = 345600 # 4 days
+}
+
+variable "max_receive_count" {
+  description = "Deliveries of a message before it moves to the dead-letter queue"
+  type        = number
+  default     = 3
+}
+
+variable "tags" {
+  description = "Tags to apply to resources"
+  type        = map(string)
+  default     = {}
+}
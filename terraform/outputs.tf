@@ -8,6 +8,16 @@ output "lambda_function_arn" {
   value       = module.lambda.function_arn
 }
 
+output "backfill_coordinator_function_name" {
+  description = "Name of the fan-out backfill coordinator function (null unless enabled)"
+  value       = var.enable_backfill_fanout ? module.backfill_coordinator[0].function_name : null
+}
+
+output "backfill_queue_url" {
+  description = "URL of the fan-out backfill queue (null unless enabled)"
+  value       = var.enable_backfill_fanout ? module.backfill_queue[0].queue_url : null
+}
+
 output "dynamodb_table_name" {
   description = "Name of the DynamoDB table"
   value       = module.dynamodb.table_name
@@ -42,12 +42,42 @@ variable "ddb_table_name" {
   default     = "OilPrices"
 }
 
+variable "snapshot_bucket_name" {
+  description = "Existing S3 bucket for the published latest.json snapshot (empty disables publishing)"
+  type        = string
+  default     = ""
+}
+
 variable "schedule_expression" {
   description = "EventBridge schedule expression (AWS cron or rate)"
   type        = string
   default     = "cron(0 1 * * ? *)"
 }
 
+variable "enable_backfill_fanout" {
+  description = "Deploy the SQS queue and the coordinator/worker functions of the fan-out backfill"
+  type        = bool
+  default     = false
+}
+
+variable "backfill_worker_timeout" {
+  description = "Timeout in seconds of the fan-out backfill worker (the queue's visibility timeout is 6x this)"
+  type        = number
+  default     = 300
+}
+
+variable "backfill_batch_size" {
+  description = "Backfill chunks per worker invocation"
+  type        = number
+  default     = 5
+}
+
+variable "backfill_max_concurrency" {
+  description = "Maximum concurrent backfill worker invocations (2-1000)"
+  type        = number
+  default     = 10
+}
+
 variable "tags" {
   description = "Tags to apply to resources"
   type        = map(string)
@@ -2,6 +2,8 @@ import os
 import sys
 import json
 
+import pytest
+
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
@@ -15,4 +17,40 @@ if not os.path.exists(_config_file):
         with open(_config_file, "w", encoding="utf-8") as fh:
             json.dump({"store_param": "/test/store"}, fh)
     except Exception:
-        pass
\ No newline at end of file
+        pass
+
+@pytest.fixture
+def mock_aws_env(monkeypatch):
+    """
+    In-memory AWS (moto) with dummy credentials; the shared client registry is
+    emptied so clients are created inside the mock.
+    """
+    from moto import mock_aws
+
+    import src.aws_clients as aws_clients
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    with mock_aws():
+        aws_clients.reset()
+        yield
+        aws_clients.reset()
+
+
+@pytest.fixture
+def oil_table(mock_aws_env):
+    """
+    Empty moto DynamoDB table with the OilPrices key schema (pk, date).
+    """
+    import src.aws_clients as aws_clients
+
+    return aws_clients.get_resource("dynamodb").create_table(
+        TableName="OilPrices",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "date", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "pk", "AttributeType": "S"},
+            {"AttributeName": "date", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
@@ -0,0 +1,109 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from src.aggregates import RollingWindow, SeriesAggregates, aggregate_windows
+
+
+def _day(i):
+    return (date(2025, 1, 1) + timedelta(days=i)).isoformat()
+
+
+def _brute_force(prices, w):
+    window = prices[-w:]
+    return {
+        "count": len(window),
+        "mean": (sum(window) / len(window)).quantize(Decimal("0.0001")),
+        "min": min(window),
+        "max": max(window),
+    }
+
+
+def test_rolling_window_matches_brute_force():
+    rng = random.Random(7)
+    prices = [Decimal(rng.randint(5000, 7000)) / 10 for _ in range(200)]
+    windows = {w: RollingWindow(w) for w in (1, 3, 7)}
+    for seq, price in enumerate(prices, start=1):
+        for w, window in windows.items():
+            leaving = prices[seq - 1 - w] if seq > w else None
+            window.push(seq, price, leaving)
+            assert window.summary() == _brute_force(prices[:seq], w)
+            # Monotonic deques never hold more than the window
+            assert len(window.mins) <= w and len(window.maxs) <= w
+
+
+def test_series_aggregates_summary_and_change():
+    series = SeriesAggregates((2, 3))
+    for i, price in enumerate(("653", "648.25", "639.25", "641")):
+        series.push(_day(i), {"oil_price": Decimal(price), "exchange_rate": Decimal("9.5")})
+
+    summary = series.summary()
+    assert summary["oil_price"]["last"] == Decimal("641")
+    assert summary["oil_price"]["change"] == Decimal("1.75")
+    assert summary["oil_price"]["2"] == {"count": 2, "mean": Decimal("640.1250"), "min": Decimal("639.25"), "max": Decimal("641")}
+    assert summary["oil_price"]["3"]["max"] == Decimal("648.25")
+    assert summary["exchange_rate"]["3"]["mean"] == Decimal("9.5000")
+
+
+def test_series_aggregates_rewrite_and_late_day_replay_history():
+    series = SeriesAggregates((3,))
+    for i, price in enumerate((10, 20, 30)):
+        series.push(_day(i), {"oil_price": Decimal(price)})
+
+    # Rewriting the latest day replaces it instead of counting it twice
+    series.push(_day(2), {"oil_price": Decimal(60)})
+    assert series.summary()["oil_price"]["3"]["mean"] == Decimal("30.0000")
+
+    # A day older than the retained history is ignored
+    assert series.push(_day(-5), {"oil_price": Decimal(1000)}) is False
+    assert series.summary()["oil_price"]["3"]["max"] == Decimal(60)
+
+
+def test_series_aggregates_late_day_inside_history():
+    series = SeriesAggregates((5,))
+    for i in (0, 1, 3):
+        series.push(_day(i), {"oil_price": Decimal(10 * (i + 1))})
+    series.push(_day(2), {"oil_price": Decimal(30)})
+
+    assert [d for d, _ in series.history] == [_day(i) for i in range(4)]
+    assert series.summary()["oil_price"]["change"] == Decimal(10)
+
+
+def test_series_aggregates_state_round_trip_continues_incrementally():
+    rng = random.Random(3)
+    prices = [Decimal(rng.randint(100, 999)) for _ in range(40)]
+    reference = SeriesAggregates((5, 10))
+    restored = SeriesAggregates((5, 10))
+    for i, price in enumerate(prices):
+        reference.push(_day(i), {"oil_price": price})
+        restored = SeriesAggregates.from_dict(restored.to_dict())
+        restored.push(_day(i), {"oil_price": price})
+
+    assert restored.summary() == reference.summary()
+
+
+def test_series_aggregates_rebuilds_for_new_windows():
+    series = SeriesAggregates((3, 5))
+    for i in range(5):
+        series.push(_day(i), {"oil_price": Decimal(i)})
+
+    resized = SeriesAggregates.from_dict(series.to_dict(), windows=(2,))
+
+    assert resized.windows == (2,)
+    assert resized.summary()["oil_price"]["2"]["mean"] == Decimal("3.5000")
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (None, (7, 30, 90)),
+    ("30, 7", (7, 30)),
+    ("x", (7, 30, 90)),
+    ("0", (7, 30, 90)),
+])
+def test_aggregate_windows_from_env(monkeypatch, raw, expected):
+    if raw is None:
+        monkeypatch.delenv("AGGREGATE_WINDOWS", raising=False)
+    else:
+        monkeypatch.setenv("AGGREGATE_WINDOWS", raw)
+    assert aggregate_windows() == expected
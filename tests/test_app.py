@@ -6,6 +6,7 @@ from decimal import Decimal
 import pytest
 
 import src.app as appmod
+from src.series import OilSeries
 
 
 def test_lambda_persists_on_date_match(monkeypatch):
@@ -135,4 +136,559 @@ def test_lambda_skips_on_exchange_date_mismatch(monkeypatch):
     assert "exchange_source_date" in result and "expected_date" in result
     assert result["exchange_source_date"] == "2025-08-12"
     assert result["expected_date"] == "2025-08-13"
-    assert persisted["called"] is False
\ No newline at end of file
+    assert persisted["called"] is False
+
+def test_lambda_backfill_writes_range_in_batch(monkeypatch):
+    # Arrange: oil history covers more days than the requested range
+    def fake_get_store_urls(config_path=None):
+        return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example"}
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+
+    def fake_fetch_oil_series(url):
+        return OilSeries.from_pairs([
+            ("2025-08-08", Decimal("660")),
+            ("2025-08-11", Decimal("653")),
+            ("2025-08-12", Decimal("648.25")),
+            ("2025-08-13", Decimal("639.25")),
+        ])
+
+    monkeypatch.setattr(appmod, "fetch_oil_series", fake_fetch_oil_series)
+
+    key_lookups = {"count": 0}
+
+    def fake_get_exchange_api_key():
+        key_lookups["count"] += 1
+        return "test-key"
+
+    monkeypatch.setattr(appmod, "get_exchange_api_key", fake_get_exchange_api_key)
+
+    # Exchange provider returns a stale date for 2025-08-12
+    def fake_fetch_exchange_data(url, date=None, api_key=None):
+        assert api_key == "test-key"
+        if date == "2025-08-12":
+            return ("2025-08-11", Decimal("9.40"))
+        return (date, Decimal("9.49"))
+
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+
+    def fake_fetch_oil_data(url):
+        raise AssertionError("single-day fetch should not run in backfill mode")
+
+    monkeypatch.setattr(appmod, "fetch_oil_data", fake_fetch_oil_data)
+
+    saved = {}
+
+    def fake_write_batch(table_name, records):
+        saved["records"] = list(records)
+        return {"written": len(saved["records"]), "failed": 0, "requests": 1}
+
+    monkeypatch.setattr(appmod, "write_batch", fake_write_batch)
+
+    # Act
+    event = {"backfill": {"start_date": "2025-08-11", "end_date": "2025-08-13"}}
+    result = appmod.lambda_handler(event, None)
+
+    # Assert
+    assert result["status"] == "ok"
+    assert result["mode"] == "backfill"
+    assert result["written"] == 2
+    assert result["write_failed"] == 0
+    assert result["skipped"] == ["2025-08-12"]
+    assert result["failed"] == []
+    assert key_lookups["count"] == 1
+    assert saved["records"] == [
+        ("2025-08-11", Decimal("653"), Decimal("9.49")),
+        ("2025-08-13", Decimal("639.25"), Decimal("9.49")),
+    ]
+
+
+def test_lambda_backfill_rejects_inverted_range(monkeypatch):
+    def fake_get_store_urls(config_path=None):
+        return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example"}
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+
+    event = {"backfill": {"start_date": "2025-08-13", "end_date": "2025-08-11"}}
+    result = appmod.lambda_handler(event, None)
+
+    assert result["status"] == "error"
+    assert "backfill" in result["message"]
+
+
+def test_lambda_speculative_overlaps_exchange_fetch(monkeypatch):
+    import threading
+
+    def fake_get_store_urls(config_path=None):
+        return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example"}
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+
+    # The oil fetch only completes once the exchange fetch has started,
+    # which proves both are in flight at the same time.
+    exchange_started = threading.Event()
+
+    def fake_fetch_oil_data(url):
+        assert exchange_started.wait(timeout=5)
+        return ("2025-08-13", Decimal("639.25"))
+
+    def fake_fetch_exchange_data(url):
+        exchange_started.set()
+        return ("2025-08-13", Decimal("9.49"))
+
+    monkeypatch.setattr(appmod, "fetch_oil_data", fake_fetch_oil_data)
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+
+    called = {}
+
+    def fake_save_to_dynamodb(table_name, date_str, oil_price, exchange_rate):
+        called["exchange_rate"] = exchange_rate
+
+    monkeypatch.setattr(appmod, "save_to_dynamodb", fake_save_to_dynamodb)
+
+    result = appmod.lambda_handler({"speculative": True}, None)
+
+    assert result["status"] == "ok"
+    assert called["exchange_rate"] == Decimal("9.49")
+
+
+def test_lambda_speculative_discards_exchange_on_oil_date_mismatch(monkeypatch):
+    def fake_get_store_urls(config_path=None):
+        return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example"}
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setenv("SPECULATIVE_FETCH", "true")
+
+    def fake_fetch_oil_data(url):
+        return ("2025-08-12", Decimal("639.25"))
+
+    # A failing speculative exchange fetch must not turn a skip into an error
+    def fake_fetch_exchange_data(url):
+        raise RuntimeError("exchange provider down")
+
+    monkeypatch.setattr(appmod, "fetch_oil_data", fake_fetch_oil_data)
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+
+    persisted = {"called": False}
+
+    def fake_save_to_dynamodb(table_name, date_str, oil_price, exchange_rate):
+        persisted["called"] = True
+
+    monkeypatch.setattr(appmod, "save_to_dynamodb", fake_save_to_dynamodb)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "skipped"
+    assert result["oil_source_date"] == "2025-08-12"
+    assert persisted["called"] is False
+
+
+def test_lambda_reports_cache_counters(monkeypatch):
+    def fake_get_store_urls(config_path=None):
+        return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example"}
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr(appmod, "fetch_oil_data", lambda url: ("2025-08-12", Decimal("639.25")))
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "skipped"
+    assert set(result["cache"]) >= {"store_urls", "api_key"}
+    assert set(result["cache"]["api_key"]) == {"hits", "misses", "size"}
+
+
+def test_lambda_idempotent_short_circuits_stored_day(monkeypatch):
+    def fake_get_store_urls(config_path=None):
+        return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example"}
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setenv("IDEMPOTENT_WRITES", "true")
+    monkeypatch.setattr(appmod, "fetch_oil_data", lambda url: ("2025-08-13", Decimal("639.25")))
+    monkeypatch.setattr(
+        appmod,
+        "get_stored_day",
+        lambda table, date: {"oil_price": Decimal("639.25"), "exchange_rate": Decimal("9.49")},
+    )
+
+    def fake_fetch_exchange_data(url):
+        raise AssertionError("exchange fetch should be skipped for a stored day")
+
+    def fake_save_to_dynamodb(**kwargs):
+        raise AssertionError("nothing should be written for a stored day")
+
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+    monkeypatch.setattr(appmod, "save_to_dynamodb", fake_save_to_dynamodb)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["write"] == "noop"
+
+
+def test_lambda_idempotent_writes_when_oil_price_changed(monkeypatch):
+    def fake_get_store_urls(config_path=None):
+        return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example"}
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setenv("IDEMPOTENT_WRITES", "true")
+    monkeypatch.setattr(appmod, "fetch_oil_data", lambda url: ("2025-08-13", Decimal("640")))
+    monkeypatch.setattr(
+        appmod,
+        "get_stored_day",
+        lambda table, date: {"oil_price": Decimal("639.25"), "exchange_rate": Decimal("9.49")},
+    )
+    monkeypatch.setattr(appmod, "fetch_exchange_data", lambda url: ("2025-08-13", Decimal("9.49")))
+
+    saved = {}
+
+    def fake_save_to_dynamodb(**kwargs):
+        saved.update(kwargs)
+        return "changed"
+
+    monkeypatch.setattr(appmod, "save_to_dynamodb", fake_save_to_dynamodb)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["write"] == "changed"
+    assert saved["idempotent"] is True
+    assert saved["oil_price"] == Decimal("640")
+
+
+def test_lambda_multi_currency_stores_all_rates(monkeypatch):
+    monkeypatch.setenv("EXCHANGE_CURRENCIES", "mad, EUR,GBP")
+
+    def fake_get_store_urls(config_path=None):
+        return {
+            "oil_api": "http://oil.example",
+            "exchange_api": "http://fx.example/convert?from=USD&to=MAD",
+            "exchange_rates_api": "http://fx.example/{date}?base=USD",
+        }
+
+    monkeypatch.setattr(appmod, "get_store_urls", fake_get_store_urls)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr(appmod, "fetch_oil_data", lambda url: ("2025-08-13", Decimal("639.25")))
+
+    def fake_fetch_exchange_data(url, **kwargs):
+        raise AssertionError("single-rate fetch should not run with EXCHANGE_CURRENCIES")
+
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+
+    requested = {}
+
+    def fake_fetch_exchange_rates(url, currencies, rates_url=None, **kwargs):
+        requested["currencies"] = currencies
+        requested["rates_url"] = rates_url
+        return "2025-08-13", {"MAD": Decimal("9.49"), "EUR": Decimal("0.91"), "GBP": Decimal("0.77")}
+
+    monkeypatch.setattr(appmod, "fetch_exchange_rates", fake_fetch_exchange_rates)
+
+    called = {}
+
+    def fake_save_to_dynamodb(table_name, date_str, oil_price, exchange_rate, exchange_rates=None):
+        called["exchange_rate"] = exchange_rate
+        called["exchange_rates"] = exchange_rates
+        return "new"
+
+    monkeypatch.setattr(appmod, "save_to_dynamodb", fake_save_to_dynamodb)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["currencies"] == ["EUR", "GBP", "MAD"]
+    assert requested == {"currencies": ["MAD", "EUR", "GBP"], "rates_url": "http://fx.example/{date}?base=USD"}
+    assert called["exchange_rate"] == Decimal("9.49")
+    assert called["exchange_rates"]["GBP"] == Decimal("0.77")
+
+
+def _sources_store(config_path=None):
+    return {
+        "exchange_api": "http://fx.example",
+        "sources": [
+            {"name": "brent", "url": "http://brent.example", "pk": "OIL_PRICE"},
+            {"name": "wti", "url": "http://wti.example"},
+            {"name": "dubai", "url": "http://dubai.example"},
+            {"name": "urals", "url": "http://urals.example"},
+        ],
+    }
+
+
+def test_lambda_sources_fetches_concurrently_and_writes_one_batch(monkeypatch):
+    import threading
+
+    monkeypatch.setattr(appmod, "get_store_urls", _sources_store)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setenv("SOURCES_MAX_WORKERS", "3")
+
+    # Three sources must be in flight together before any of them returns
+    barrier = threading.Barrier(3, timeout=5)
+    prices = {
+        "http://brent.example": ("2025-08-13", Decimal("80.1")),
+        "http://wti.example": ("2025-08-13", Decimal("76.4")),
+        "http://dubai.example": ("2025-08-12", Decimal("79")),
+    }
+
+    def fake_fetch_oil_data(url):
+        if url == "http://urals.example":
+            raise appmod.ExtractionError("oil response missing 'bars' list")
+        barrier.wait()
+        return prices[url]
+
+    monkeypatch.setattr("src.sources._parsers", {"bars": fake_fetch_oil_data})
+
+    exchange_calls = []
+
+    def fake_fetch_exchange_data(url):
+        exchange_calls.append(url)
+        return ("2025-08-13", Decimal("9.49"))
+
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+
+    written = {}
+
+    def fake_write_items(table_name, items):
+        written["items"] = list(items)
+        return {"written": len(written["items"]), "failed": 0, "requests": 1}
+
+    monkeypatch.setattr(appmod, "write_items", fake_write_items)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["mode"] == "sources"
+    assert result["written"] == 2
+    assert result["skipped"] == ["dubai"]
+    assert result["failed"] == ["urals"]
+    assert exchange_calls == ["http://fx.example"]
+    assert [(i["pk"], i["oil_price"], i["exchange_rate"]) for i in written["items"]] == [
+        ("OIL_PRICE", Decimal("80.1"), Decimal("9.49")),
+        ("WTI_PRICE", Decimal("76.4"), Decimal("9.49")),
+    ]
+
+
+def test_lambda_sources_skip_exchange_when_no_source_matches(monkeypatch):
+    monkeypatch.setattr(appmod, "get_store_urls", _sources_store)
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr("src.sources._parsers", {"bars": lambda url: ("2025-08-12", Decimal("1"))})
+
+    def fake_fetch_exchange_data(url):
+        raise AssertionError("exchange should not be fetched")
+
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "skipped"
+    assert result["skipped"] == ["brent", "wti", "dubai", "urals"]
+
+
+def test_lambda_sources_invalid_config_is_an_error(monkeypatch):
+    monkeypatch.setattr(
+        appmod, "get_store_urls",
+        lambda config_path=None: {"exchange_api": "http://fx", "sources": [{"name": "brent"}]},
+    )
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "error"
+    assert "invalid sources" in result["message"]
+
+
+def test_lambda_publishes_snapshot_after_write(monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_BUCKET", "snapshots")
+    monkeypatch.setattr(appmod, "get_store_urls", lambda config_path=None: {"oil_api": "http://oil", "exchange_api": "http://fx"})
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr(appmod, "fetch_oil_data", lambda url: ("2025-08-13", Decimal("639.25")))
+    monkeypatch.setattr(appmod, "fetch_exchange_data", lambda url: ("2025-08-13", Decimal("9.49")))
+    monkeypatch.setattr(appmod, "save_to_dynamodb", lambda **kwargs: "new")
+
+    published = []
+
+    def fake_publish_snapshot(table_name, bucket_name, key, **kwargs):
+        published.append((table_name, bucket_name, key))
+        return "uploaded"
+
+    monkeypatch.setattr(appmod, "publish_snapshot", fake_publish_snapshot)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["snapshot"] == "uploaded"
+    assert published == [("OilPrices", "snapshots", "latest.json")]
+
+
+def test_lambda_snapshot_failure_does_not_fail_run(monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_BUCKET", "snapshots")
+    monkeypatch.setattr(appmod, "get_store_urls", lambda config_path=None: {"oil_api": "http://oil", "exchange_api": "http://fx"})
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr(appmod, "fetch_oil_data", lambda url: ("2025-08-13", Decimal("639.25")))
+    monkeypatch.setattr(appmod, "fetch_exchange_data", lambda url: ("2025-08-13", Decimal("9.49")))
+    monkeypatch.setattr(appmod, "save_to_dynamodb", lambda **kwargs: "changed")
+
+    def failing_publish(*args, **kwargs):
+        raise RuntimeError("AccessDenied")
+
+    monkeypatch.setattr(appmod, "publish_snapshot", failing_publish)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["snapshot"] == "error"
+
+
+def _healing_setup(monkeypatch, gaps):
+    monkeypatch.setenv("GAP_HEALING", "true")
+    monkeypatch.setenv("GAP_HEAL_MAX_DAYS", "2")
+    monkeypatch.setattr(appmod, "get_store_urls", lambda config_path=None: {"oil_api": "http://oil", "exchange_api": "http://fx"})
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr(appmod, "get_exchange_api_key", lambda: "k")
+    monkeypatch.setattr(appmod, "find_gaps", lambda table, end, days: list(gaps))
+
+    # Today's bar is not published yet; 2025-08-05 is a market holiday
+    monkeypatch.setattr(appmod, "fetch_oil_data", lambda url: ("2025-08-12", Decimal("648.25")))
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: OilSeries.from_pairs([
+        ("2025-08-04", Decimal("660")),
+        ("2025-08-06", Decimal("655")),
+        ("2025-08-07", Decimal("654")),
+        ("2025-08-08", Decimal("653")),
+        ("2025-08-12", Decimal("648.25")),
+    ]))
+
+    requested = []
+
+    def fake_fetch_exchange_data(url, date=None, api_key=None):
+        requested.append(date)
+        return (date, Decimal("9.49"))
+
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_fetch_exchange_data)
+
+    saved = {}
+
+    def fake_write_batch(table_name, records):
+        saved["records"] = list(records)
+        return {"written": len(saved["records"]), "failed": 0, "requests": 1}
+
+    monkeypatch.setattr(appmod, "write_batch", fake_write_batch)
+    return requested, saved
+
+
+def test_lambda_heals_most_recent_gaps_within_budget(monkeypatch):
+    requested, saved = _healing_setup(
+        monkeypatch, ["2025-08-04", "2025-08-05", "2025-08-06", "2025-08-08", "2025-08-13"]
+    )
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "skipped"
+    assert result["heal"] == {"status": "ok", "missing": 5, "written": 2, "no_oil_price": ["2025-08-05", "2025-08-13"]}
+    assert sorted(requested) == ["2025-08-06", "2025-08-08"]
+    assert [r[0] for r in saved["records"]] == ["2025-08-06", "2025-08-08"]
+
+
+def test_lambda_gap_healing_without_gaps_makes_no_fetches(monkeypatch):
+    requested, _ = _healing_setup(monkeypatch, [])
+
+    def fail(url):
+        raise AssertionError("oil history should not be fetched without gaps")
+
+    monkeypatch.setattr(appmod, "fetch_oil_series", fail)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["heal"] == {"status": "ok", "missing": 0}
+    assert requested == []
+
+
+def test_lambda_gap_healing_failure_keeps_day_result(monkeypatch):
+    _healing_setup(monkeypatch, ["2025-08-08"])
+
+    def failing_find_gaps(table, end, days):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(appmod, "find_gaps", failing_find_gaps)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "skipped"
+    assert result["heal"]["status"] == "error"
+
+
+def _skip_run_setup(monkeypatch):
+    monkeypatch.setattr(appmod, "get_store_urls", lambda config_path=None: {"oil_api": "http://oil", "exchange_api": "http://fx"})
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+
+    def fake_fetch_oil_data(url):
+        with appmod.span("oil"):
+            return ("2025-08-12", Decimal("648.25"))
+
+    monkeypatch.setattr(appmod, "fetch_oil_data", fake_fetch_oil_data)
+
+
+def test_lambda_emits_one_metrics_record(monkeypatch, capsys):
+    _skip_run_setup(monkeypatch)
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "skipped"
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines() if '"_aws"' in line]
+    assert len(records) == 1
+    record = records[0]
+    assert record["status"] == "skipped"
+    assert record["mode"] == "daily"
+    assert record["oil_calls"] == 1
+    assert record["retries"] == 0
+    names = {m["Name"] for m in record["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert {"total_ms", "oil_ms", "retries"} <= names
+
+
+def test_lambda_metrics_can_be_disabled(monkeypatch, capsys):
+    _skip_run_setup(monkeypatch)
+    monkeypatch.setenv("METRICS_ENABLED", "false")
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result["status"] == "skipped"
+    assert '"_aws"' not in capsys.readouterr().out
+
+
+def test_lambda_rejects_malformed_rate_limits(monkeypatch):
+    monkeypatch.setattr(appmod, "get_store_urls", lambda config_path=None: {
+        "oil_api": "http://oil", "exchange_api": "http://fx", "rate_limits": {"fx": "fast"},
+    })
+
+    result = appmod.lambda_handler({}, None)
+
+    assert result == dict(result, status="error", message="invalid config or SSM content")
+
+
+def test_backfilled_day_equals_the_daily_write(monkeypatch, oil_table):
+    # Prices finer than 4 decimal places are stored the same by both paths
+    bars = {"bars": [["Tue Aug 12 00:00:00 2025", 61.2], ["Wed Aug 13 00:00:00 2025", 61.234567]]}
+    monkeypatch.setattr(appmod, "get_store_urls", lambda config_path=None: {
+        "oil_api": "http://oil.example", "exchange_api": "http://fx.example",
+    })
+    monkeypatch.setattr(appmod, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr("src.fetcher._fetch_json", lambda url, timeout=None, headers=None: bars)
+    monkeypatch.setattr(appmod, "get_exchange_api_key", lambda: "k")
+    monkeypatch.setattr(appmod, "fetch_exchange_data",
+                        lambda url, date="2025-08-13", api_key=None: (date, Decimal("9.490092")))
+    key = {"pk": "OIL_PRICE", "date": "2025-08-13"}
+
+    assert appmod.lambda_handler({}, None)["status"] == "ok"
+    daily = oil_table.get_item(Key=key)["Item"]
+    oil_table.delete_item(Key=key)
+    backfill = appmod.lambda_handler({"backfill": {"start_date": "2025-08-13", "end_date": "2025-08-13"}}, None)
+    assert backfill["written"] == 1
+    backfilled = oil_table.get_item(Key=key)["Item"]
+
+    assert backfilled["oil_price"] == daily["oil_price"] == Decimal("61.234567")
+    assert backfilled["exchange_rate"] == daily["exchange_rate"]
+
+    # The next daily run sees no change
+    monkeypatch.setenv("IDEMPOTENT_WRITES", "true")
+    assert appmod.lambda_handler({}, None)["write"] == "noop"
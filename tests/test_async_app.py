@@ -0,0 +1,131 @@
+import asyncio
+from decimal import Decimal
+
+import src.app as appmod
+import src.async_app as asyncapp
+from src.fetcher import ExtractionError
+from src.series import OilSeries
+
+
+def _store(config_path=None):
+    return {"oil_api": "http://oil.example", "exchange_api": "http://fx.example?from=USD&to=MAD"}
+
+
+def _setup(monkeypatch, store=_store):
+    monkeypatch.setattr(appmod, "get_store_urls", store)
+    monkeypatch.setattr(asyncapp, "get_fetch_date", lambda: "2025-08-13")
+    monkeypatch.setattr(asyncapp, "get_exchange_api_key_async", _async_value("k"))
+
+
+def _async_value(value):
+    async def fetch(*args, **kwargs):
+        return value
+    return fetch
+
+
+def test_async_lambda_persists_on_date_match(monkeypatch):
+    _setup(monkeypatch)
+    monkeypatch.setattr(asyncapp, "fetch_oil_data_async", _async_value(("2025-08-13", Decimal("639.25"))))
+    monkeypatch.setattr(asyncapp, "fetch_exchange_data_async", _async_value(("2025-08-13", Decimal("9.49"))))
+    called = {}
+
+    def fake_save_to_dynamodb(table_name, date_str, oil_price, exchange_rate):
+        called.update(date_str=date_str, oil_price=oil_price, exchange_rate=exchange_rate)
+        return "created"
+
+    monkeypatch.setattr(appmod, "save_to_dynamodb", fake_save_to_dynamodb)
+
+    result = asyncapp.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["write"] == "created"
+    assert called == {"date_str": "2025-08-13", "oil_price": Decimal("639.25"), "exchange_rate": Decimal("9.49")}
+
+
+def test_async_lambda_discards_speculative_exchange_on_date_mismatch(monkeypatch):
+    _setup(monkeypatch)
+    cancelled = []
+
+    async def slow_exchange(session, url, **kwargs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(asyncapp, "fetch_oil_data_async", _async_value(("2025-08-12", Decimal("648.25"))))
+    monkeypatch.setattr(asyncapp, "fetch_exchange_data_async", slow_exchange)
+
+    result = asyncapp.lambda_handler({"speculative": True}, None)
+
+    assert result["status"] == "skipped"
+    assert result["oil_source_date"] == "2025-08-12"
+    assert cancelled == [True]
+
+
+def test_async_backfill_fetches_rates_concurrently_and_writes_one_batch(monkeypatch):
+    _setup(monkeypatch)
+    history = OilSeries.from_pairs(
+        (f"2025-08-{d:02d}", Decimal(600 + d)) for d in range(1, 11)
+    )
+    monkeypatch.setattr(asyncapp, "fetch_oil_series_async", _async_value(history))
+    monkeypatch.setenv("ASYNC_MAX_CONCURRENCY", "4")
+    running = {"now": 0, "max": 0}
+
+    async def fake_exchange(session, url, date=None, api_key=None):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if date == "2025-08-05":
+            raise ExtractionError("no rate")
+        return date, Decimal("9.5")
+
+    monkeypatch.setattr(asyncapp, "fetch_exchange_data_async", fake_exchange)
+    written = []
+    monkeypatch.setattr(appmod, "write_batch", lambda table, records: written.extend(records) or {"written": len(records), "failed": 0})
+
+    result = asyncapp.lambda_handler({"backfill": {"start_date": "2025-08-03", "end_date": "2025-08-09"}}, None)
+
+    assert result["status"] == "ok"
+    assert result["mode"] == "backfill"
+    assert result["written"] == 6
+    assert result["failed"] == ["2025-08-05"]
+    assert [r[0] for r in written] == ["2025-08-03", "2025-08-04", "2025-08-06", "2025-08-07", "2025-08-08", "2025-08-09"]
+    assert running["max"] == 4
+
+
+def test_async_sources_run_skips_failed_and_stale_sources(monkeypatch):
+    def store(config_path=None):
+        return {
+            "exchange_api": "http://fx.example?from=USD&to=MAD",
+            "sources": [
+                {"name": "brent", "url": "http://brent.example"},
+                {"name": "wti", "url": "http://wti.example"},
+                {"name": "dubai", "url": "http://dubai.example"},
+            ],
+        }
+
+    _setup(monkeypatch, store)
+    prices = {
+        "http://brent.example": ("2025-08-13", Decimal("80.1")),
+        "http://dubai.example": ("2025-08-12", Decimal("79")),
+    }
+
+    async def fake_oil(session, url):
+        if url not in prices:
+            raise ExtractionError("oil response missing 'bars' list")
+        return prices[url]
+
+    monkeypatch.setattr(asyncapp, "fetch_oil_data_async", fake_oil)
+    monkeypatch.setattr(asyncapp, "fetch_exchange_data_async", _async_value(("2025-08-13", Decimal("9.49"))))
+    items = []
+    monkeypatch.setattr(appmod, "write_items", lambda table, batch: items.extend(batch) or {"written": len(batch), "failed": 0})
+
+    result = asyncapp.lambda_handler({}, None)
+
+    assert result["status"] == "ok"
+    assert result["mode"] == "sources"
+    assert result["failed"] == ["wti"]
+    assert result["skipped"] == ["dubai"]
+    assert [item["pk"] for item in items] == ["BRENT_PRICE"]
@@ -0,0 +1,181 @@
+import asyncio
+import io
+import json
+import threading
+import urllib.error
+import urllib.parse
+from decimal import Decimal
+from email.message import Message
+
+import pytest
+
+import src.async_fetcher as asyncfetcher
+from src.fetcher import ExtractionError
+from src.http_client import Response
+
+
+class _FakeSession:
+    """
+    Stands in for AsyncHTTPSession: answers each URL with handler(url, headers)
+    and records the highest number of requests in flight.
+    """
+
+    read_timeout = 10
+
+    def __init__(self, handler, delay=0.0):
+        self.handler = handler
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, url, headers=None, timeout=None):
+        self.calls.append((url, dict(headers or {})))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            status, body = self.handler(url, headers or {})
+        finally:
+            self.in_flight -= 1
+        if status >= 400:
+            raise urllib.error.HTTPError(url, status, "error", {}, io.BytesIO(b""))
+        return Response(url, status, Message(), json.dumps(body).encode())
+
+
+def _exchange_body(url, headers):
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+    rate = {"MAD": 9.49, "EUR": 0.91, "GBP": 0.79}[query["to"][0]]
+    return 200, {"date": query["date"][0], "info": {"rate": rate}}
+
+
+def test_gather_bounded_limits_concurrency_and_keeps_errors():
+    running = {"now": 0, "max": 0}
+
+    async def work(i):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if i == 3:
+            raise ValueError("boom")
+        return i * 2
+
+    results = asyncio.run(asyncfetcher.gather_bounded(work, range(10), limit=4))
+
+    assert running["max"] == 4
+    assert results[:3] == [0, 2, 4]
+    assert isinstance(results[3], ValueError)
+    assert results[9] == 18
+
+
+def test_fetch_oil_data_async_shares_the_oil_parser():
+    bars = [["Tue Aug 12 00:00:00 2025", 648.25], ["Wed Aug 13 00:00:00 2025", 639.25]]
+    session = _FakeSession(lambda url, headers: (200, {"bars": bars}))
+
+    assert asyncio.run(asyncfetcher.fetch_oil_data_async(session, "http://oil")) == ("2025-08-13", Decimal("639.25"))
+    series = asyncio.run(asyncfetcher.fetch_oil_series_async(session, "http://oil"))
+    assert list(series.items()) == [("2025-08-12", Decimal("648.25")), ("2025-08-13", Decimal("639.25"))]
+
+
+def test_fetch_json_async_retries_transient_errors(monkeypatch):
+    responses = iter([(503, None), (200, {"ok": True})])
+    session = _FakeSession(lambda url, headers: next(responses))
+
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr("src.retry._async_sleep", no_sleep)
+
+    assert asyncio.run(asyncfetcher._fetch_json_async(session, "http://x")) == {"ok": True}
+    assert len(session.calls) == 2
+
+
+def test_fetch_json_async_retries_asyncio_timeouts(monkeypatch):
+    # AsyncHTTPSession's wait_for raises asyncio.TimeoutError, distinct from TimeoutError before 3.11
+    def handler(url, headers):
+        if not session.calls[1:]:
+            raise asyncio.TimeoutError()
+        return 200, {"ok": True}
+
+    session = _FakeSession(handler)
+
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr("src.retry._async_sleep", no_sleep)
+
+    assert asyncio.run(asyncfetcher._fetch_json_async(session, "http://x")) == {"ok": True}
+    assert len(session.calls) == 2
+
+
+def test_fetch_json_async_runs_response_cache_io_in_worker_threads(monkeypatch, tmp_path):
+    monkeypatch.setenv("RESPONSE_CACHE", "true")
+    monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path / "cache"))
+    threads = []
+
+    def recorded(fn):
+        def call(*args):
+            threads.append(threading.get_ident())
+            return fn(*args)
+        return call
+
+    monkeypatch.setattr(asyncfetcher, "cache_lookup", recorded(asyncfetcher.cache_lookup))
+    monkeypatch.setattr(asyncfetcher, "cache_store", recorded(asyncfetcher.cache_store))
+    session = _FakeSession(lambda url, headers: (200, {"ok": True}))
+
+    async def run():
+        return await asyncfetcher._fetch_json_async(session, "http://oil.example/api"), threading.get_ident()
+
+    result, loop_thread = asyncio.run(run())
+
+    assert result == {"ok": True}
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def test_fetch_exchange_data_async_refreshes_rotated_key(monkeypatch):
+    keys = iter(["old-key", "new-key"])
+    monkeypatch.setattr(asyncfetcher, "get_exchange_api_key", lambda force_refresh=False: next(keys))
+
+    def handler(url, headers):
+        if headers.get("apikey") != "new-key":
+            return 401, None
+        return _exchange_body(url, headers)
+
+    session = _FakeSession(handler)
+
+    date_iso, rate = asyncio.run(asyncfetcher.fetch_exchange_data_async(
+        session, "http://fx/convert?from=USD&to=MAD", date="2025-11-12",
+    ))
+
+    assert (date_iso, rate) == ("2025-11-12", Decimal("9.49"))
+    assert [h["apikey"] for _, h in session.calls] == ["old-key", "new-key"]
+
+
+def test_fetch_exchange_rates_async_requests_currencies_concurrently(monkeypatch):
+    monkeypatch.setattr(asyncfetcher, "get_exchange_api_key", lambda force_refresh=False: "k")
+    session = _FakeSession(_exchange_body, delay=0.02)
+
+    date_iso, rates = asyncio.run(asyncfetcher.fetch_exchange_rates_async(
+        session, "http://fx/convert?from=USD&to=MAD", ["MAD", "EUR", "GBP"], date="2025-11-12",
+    ))
+
+    assert date_iso == "2025-11-12"
+    assert rates == {"MAD": Decimal("9.49"), "EUR": Decimal("0.91"), "GBP": Decimal("0.79")}
+    assert session.max_in_flight == 3
+
+
+def test_fetch_exchange_rates_async_rejects_mixed_dates(monkeypatch):
+    monkeypatch.setattr(asyncfetcher, "get_exchange_api_key", lambda force_refresh=False: "k")
+
+    def handler(url, headers):
+        status, body = _exchange_body(url, headers)
+        if "to=EUR" in url:
+            body["date"] = "2025-11-11"
+        return status, body
+
+    with pytest.raises(ExtractionError):
+        asyncio.run(asyncfetcher.fetch_exchange_rates_async(
+            _FakeSession(handler), "http://fx/convert?from=USD&to=MAD", ["MAD", "EUR"], date="2025-11-12",
+        ))
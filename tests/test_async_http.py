@@ -0,0 +1,134 @@
+import asyncio
+import gzip
+import json
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.async_http import AsyncHTTPSession
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 64 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        payload = json.dumps({"path": self.path, "apikey": self.headers.get("apikey")}).encode()
+        if self.path.startswith("/gzip"):
+            self._send(200, gzip.compress(payload), {"Content-Encoding": "gzip"})
+        elif self.path.startswith("/chunked"):
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(payload), 7):
+                part = payload[i:i + 7]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+        elif self.path.startswith("/redirect"):
+            self._send(302, b"", {"Location": "/plain?redirected=1"})
+        elif self.path.startswith("/drop"):
+            self._send(200, payload)
+            self.close_connection = True
+        elif self.path.startswith("/missing"):
+            self._send(404, b'{"error": "not found"}')
+        else:
+            self._send(200, payload)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _run(coro_fn):
+    async def main():
+        session = AsyncHTTPSession()
+        try:
+            return await coro_fn(session), session
+        finally:
+            await session.close()
+    return asyncio.run(main())
+
+
+def test_session_reuses_keep_alive_connection(server):
+    async def fetch(session):
+        return [json.loads((await session.get(f"{server}/plain?date={i}", headers={"apikey": "k"})).text())
+                for i in range(10)]
+
+    bodies, session = _run(fetch)
+
+    assert bodies == [{"path": f"/plain?date={i}", "apikey": "k"} for i in range(10)]
+    assert session.requests_sent == 10
+    assert session.connections_opened == 1
+
+
+def test_concurrent_requests_use_one_connection_each(server):
+    async def fetch(session):
+        responses = await asyncio.gather(*(session.get(f"{server}/plain?n={i}") for i in range(8)))
+        return [json.loads(r.text())["path"] for r in responses]
+
+    paths, session = _run(fetch)
+
+    assert paths == [f"/plain?n={i}" for i in range(8)]
+    assert session.connections_opened == 8
+
+
+@pytest.mark.parametrize("path", ["/gzip", "/chunked"])
+def test_session_reads_compressed_and_chunked_bodies(server, path):
+    async def fetch(session):
+        return json.loads((await session.get(server + path)).text())
+
+    body, _ = _run(fetch)
+
+    assert body["path"] == path
+
+
+def test_session_follows_redirects(server):
+    async def fetch(session):
+        return await session.get(f"{server}/redirect")
+
+    resp, _ = _run(fetch)
+
+    assert resp.status == 200
+    assert resp.url.endswith("/plain?redirected=1")
+
+
+def test_session_raises_http_error_for_client_errors(server):
+    async def fetch(session):
+        return await session.get(f"{server}/missing")
+
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _run(fetch)
+    assert exc.value.code == 404
+
+
+def test_session_reconnects_after_server_closes_idle_connection(server):
+    async def fetch(session):
+        await session.get(f"{server}/drop")
+        await asyncio.sleep(0.05)
+        return await session.get(f"{server}/plain")
+
+    resp, session = _run(fetch)
+
+    assert resp.status == 200
+    assert session.connections_opened == 2
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+import src.aws_clients as aws_clients
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _cold_import_modules():
+    """Import the handler in a fresh interpreter (a cold start) and report what got loaded."""
+    code = (
+        "import json, sys\n"
+        "import src.app\n"
+        "print(json.dumps({name: name in sys.modules for name in ('boto3', 'botocore', 'asyncio')}))\n"
+    )
+    env = dict(os.environ, AWS_DEFAULT_REGION="eu-west-1")
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_importing_handler_loads_no_aws_sdk():
+    loaded = _cold_import_modules()
+
+    assert loaded["boto3"] is False
+    assert loaded["botocore"] is False
+    assert loaded["asyncio"] is False
+
+
+def test_get_client_is_created_once_and_shared():
+    aws_clients.reset()
+    try:
+        with patch("boto3.client", return_value=MagicMock()) as mock_client:
+            first = aws_clients.get_client("ssm")
+            second = aws_clients.get_client("ssm")
+
+        assert first is second
+        mock_client.assert_called_once_with("ssm")
+    finally:
+        aws_clients.reset()
+
+
+def test_set_client_overrides_registry():
+    aws_clients.reset()
+    try:
+        stand_in = object()
+        aws_clients.set_client("secretsmanager", stand_in)
+        assert aws_clients.get_client("secretsmanager") is stand_in
+    finally:
+        aws_clients.reset()
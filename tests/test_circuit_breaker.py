@@ -0,0 +1,262 @@
+import asyncio
+import io
+import socket
+import threading
+import urllib.error
+from email.message import Message
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import src.async_fetcher as async_fetcher
+import src.circuit_breaker as circuit_breaker
+import src.fetcher as fetchermod
+import src.retry as retry
+from src.circuit_breaker import CircuitBreaker, CircuitOpen, breaker_for, counts_as_failure
+from src.http_client import Response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Fake wall clock; retries do not sleep.
+    """
+    now = {"t": 1_750_000_000.0}
+    monkeypatch.setattr(circuit_breaker, "_clock", lambda: now["t"])
+    monkeypatch.setattr(retry, "_sleep", lambda delay: None)
+    monkeypatch.setattr(retry, "_deadline", None)
+    circuit_breaker.reset_breakers()
+    yield now
+    circuit_breaker.reset_breakers()
+
+
+def _http_error(code):
+    return urllib.error.HTTPError("http://oil.example", code, "error", Message(), io.BytesIO(b""))
+
+
+def _ok():
+    headers = MagicMock()
+    headers.get_content_charset.return_value = "utf-8"
+    return Response("http://oil.example", 200, headers, b'{"ok": true}')
+
+
+@pytest.mark.parametrize("exc, failure", [
+    (socket.timeout("timed out"), True),
+    (ConnectionResetError(), True),
+    (_http_error(503), True),
+    (_http_error(429), False),
+    (_http_error(404), False),
+    (ValueError("bad json"), False),
+    (CircuitOpen("open"), False),
+])
+def test_counts_as_failure(exc, failure):
+    assert counts_as_failure(exc) is failure
+
+
+def test_opens_after_repeated_failures_and_fails_fast(clock):
+    breaker = CircuitBreaker("oil.example", failure_threshold=3, cooldown_seconds=60)
+
+    for _ in range(3):
+        breaker.before()
+        breaker.record(socket.timeout("timed out"))
+
+    assert breaker.state == "open"
+    assert breaker.opened_count == 1
+    clock["t"] += 59
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+
+
+def test_answers_from_the_host_reset_the_failure_count(clock):
+    breaker = CircuitBreaker("oil.example", failure_threshold=2)
+
+    breaker.record(_http_error(502))
+    breaker.record(_http_error(404))
+    breaker.record(_http_error(502))
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = CircuitBreaker("oil.example", failure_threshold=1, cooldown_seconds=60)
+    breaker.record(ConnectionResetError())
+    clock["t"] += 60
+
+    breaker.before("probe")
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.before("concurrent request")
+
+    breaker.record()
+    assert breaker.state == "closed"
+    breaker.before()
+
+
+def test_failed_probe_reopens_for_another_cooldown(clock):
+    breaker = CircuitBreaker("oil.example", failure_threshold=3, cooldown_seconds=60)
+    for _ in range(3):
+        breaker.record(socket.timeout("timed out"))
+    clock["t"] += 60
+
+    breaker.before("probe")
+    breaker.record(_http_error(500))
+
+    assert breaker.state == "open"
+    assert breaker.opened_count == 2
+    clock["t"] += 30
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+
+
+def test_state_is_shared_between_containers(clock, oil_table):
+    first = CircuitBreaker("oil.example", failure_threshold=1, cooldown_seconds=60, table_name="OilPrices")
+    second = CircuitBreaker("oil.example", failure_threshold=1, cooldown_seconds=60, table_name="OilPrices")
+    second.before()
+
+    first.before()
+    first.record(socket.timeout("timed out"))
+    item = oil_table.get_item(Key={"pk": "CIRCUIT#oil.example", "date": "state"})["Item"]
+    assert float(item["open_until"]) == pytest.approx(clock["t"] + 60)
+
+    # The other container re-reads the item once its sync interval has passed
+    clock["t"] += 10
+    with pytest.raises(CircuitOpen):
+        second.before()
+
+    # After the cool-down only one container wins the probe
+    clock["t"] += 50
+    first._synced_at = second._synced_at = None
+    second.before("probe")
+    with pytest.raises(CircuitOpen):
+        first.before("probe")
+
+    second.record()
+    assert "Item" not in oil_table.get_item(Key={"pk": "CIRCUIT#oil.example", "date": "state"})
+    clock["t"] += 10
+    first.before()
+    assert first.state == "closed"
+
+
+def test_shared_state_is_read_without_blocking_other_callers(clock):
+    breaker = CircuitBreaker("oil.example", table_name="OilPrices")
+    reading = threading.Event()
+    release = threading.Event()
+
+    class SlowTable:
+        def get_item(self, Key):
+            reading.set()
+            release.wait(5)
+            return {}
+
+    breaker._table = lambda: SlowTable()
+    syncing = threading.Thread(target=breaker.before)
+    syncing.start()
+    assert reading.wait(5)
+
+    # The read is in flight: other callers go through without waiting for it
+    done = threading.Event()
+    threading.Thread(target=lambda: (breaker.before(), done.set())).start()
+    assert done.wait(1)
+    release.set()
+    syncing.join(5)
+    assert breaker.state == "closed"
+
+
+def test_dynamodb_errors_fall_back_to_local_state(clock, mock_aws_env):
+    # No table: every read and write fails
+    breaker = CircuitBreaker("oil.example", failure_threshold=1, cooldown_seconds=60, table_name="Missing")
+
+    breaker.before()
+    breaker.record(socket.timeout("timed out"))
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+    clock["t"] += 60
+    breaker.before("probe")
+    breaker.record()
+    assert breaker.state == "closed"
+
+
+def test_breaker_for_is_disabled_by_default(clock, monkeypatch):
+    monkeypatch.delenv("CIRCUIT_BREAKER", raising=False)
+    assert breaker_for("https://oil.example/api") is None
+
+    monkeypatch.setenv("CIRCUIT_BREAKER", "true")
+    monkeypatch.setenv("CIRCUIT_SHARED", "false")
+    breaker = breaker_for("https://Oil.example/api")
+    assert breaker is breaker_for("https://oil.example/other")
+    assert breaker.table_name is None
+    assert breaker_for("https://oil.example:8443/api").host == "oil.example:8443"
+
+    monkeypatch.setenv("CIRCUIT_COOLDOWN_SECONDS", "5")
+    assert breaker_for("https://oil.example/api") is not breaker
+
+
+def test_fetch_json_fails_fast_once_the_circuit_opens(clock, monkeypatch):
+    monkeypatch.setenv("CIRCUIT_BREAKER", "true")
+    monkeypatch.setenv("CIRCUIT_SHARED", "false")
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "2")
+
+    with patch("src.fetcher.get_session") as get_session:
+        get = get_session.return_value.get
+        get.side_effect = socket.timeout("timed out")
+        # The second failed attempt opens the circuit; the third is not sent
+        with pytest.raises(CircuitOpen):
+            fetchermod._fetch_json("http://oil.example/api")
+        assert get.call_count == 2
+
+        with pytest.raises(CircuitOpen):
+            fetchermod._fetch_json("http://oil.example/api")
+        assert get.call_count == 2
+
+        clock["t"] += 60
+        get.side_effect = None
+        get.return_value = _ok()
+        assert fetchermod._fetch_json("http://oil.example/api") == {"ok": True}
+    assert breaker_for("http://oil.example/api").state == "closed"
+
+
+def test_fetch_oil_tail_records_stream_failures(clock, monkeypatch):
+    monkeypatch.setenv("CIRCUIT_BREAKER", "true")
+    monkeypatch.setenv("CIRCUIT_SHARED", "false")
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "1")
+    calls = []
+
+    def failing_stream(url, timeout=None):
+        calls.append(url)
+        raise ConnectionResetError()
+        yield
+
+    monkeypatch.setattr(fetchermod, "iter_oil_bars", failing_stream)
+
+    with pytest.raises(CircuitOpen):
+        fetchermod.fetch_oil_tail("http://oil.example/api")
+    assert calls == ["http://oil.example/api"]
+
+
+def test_async_fetch_fails_fast_once_the_circuit_opens(clock, monkeypatch):
+    monkeypatch.setenv("CIRCUIT_BREAKER", "true")
+    monkeypatch.setenv("CIRCUIT_SHARED", "false")
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "1")
+
+    async def no_sleep(delay):
+        return None
+
+    monkeypatch.setattr(retry, "_async_sleep", no_sleep)
+
+    class FailingSession:
+        read_timeout = 10
+        calls = 0
+
+        async def get(self, url, headers=None, timeout=None):
+            self.calls += 1
+            raise _http_error(503)
+
+    session = FailingSession()
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(CircuitOpen):
+                await async_fetcher._fetch_json_async(session, "http://oil.example/api")
+
+    asyncio.run(run())
+    assert session.calls == 1
@@ -0,0 +1,30 @@
+import pytest
+
+from src.env import env_flag, env_float
+
+
+@pytest.mark.parametrize("raw", ["1", "true", "TRUE", " yes ", "on"])
+def test_env_flag_true_values(raw, monkeypatch):
+    monkeypatch.setenv("SOME_FLAG", raw)
+    assert env_flag("SOME_FLAG") is True
+
+
+@pytest.mark.parametrize("raw", ["0", "false", "off", "", "maybe"])
+def test_env_flag_other_values_are_false(raw, monkeypatch):
+    monkeypatch.setenv("SOME_FLAG", raw)
+    assert env_flag("SOME_FLAG", True) is False
+
+
+def test_env_flag_unset_returns_default(monkeypatch):
+    monkeypatch.delenv("SOME_FLAG", raising=False)
+    assert env_flag("SOME_FLAG") is False
+    assert env_flag("SOME_FLAG", True) is True
+
+
+def test_env_float_falls_back_on_missing_or_invalid(monkeypatch):
+    monkeypatch.delenv("SOME_NUMBER", raising=False)
+    assert env_float("SOME_NUMBER", 5) == 5.0
+    monkeypatch.setenv("SOME_NUMBER", "2.5")
+    assert env_float("SOME_NUMBER", 5) == 2.5
+    monkeypatch.setenv("SOME_NUMBER", "soon")
+    assert env_float("SOME_NUMBER", 5) == 5.0
@@ -0,0 +1,245 @@
+import json
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+import src.app as appmod
+import src.fanout as fanout
+from src.series import OilSeries
+
+
+class InMemoryQueue:
+    """
+    SQS stand-in: SendMessageBatch appends to a list, and receive() hands
+    messages out as the Records of a Lambda SQS event.
+    """
+
+    def __init__(self, reject_ids=()):
+        self.messages = []
+        self.calls = 0
+        self._reject = set(reject_ids)
+        self._next_id = 0
+
+    def send_message_batch(self, QueueUrl, Entries):
+        assert len(Entries) <= 10
+        self.calls += 1
+        successful, failed = [], []
+        for entry in Entries:
+            if entry["Id"] in self._reject:
+                # Rejected once, accepted when re-sent
+                self._reject.discard(entry["Id"])
+                failed.append({"Id": entry["Id"], "SenderFault": False, "Code": "InternalError"})
+                continue
+            self._next_id += 1
+            self.messages.append({"messageId": f"m{self._next_id}", "body": entry["MessageBody"]})
+            successful.append({"Id": entry["Id"], "MessageId": f"m{self._next_id}"})
+        return {"Successful": successful, "Failed": failed}
+
+    def receive(self, max_records=10):
+        records, self.messages = self.messages[:max_records], self.messages[max_records:]
+        return {"Records": [dict(r, eventSource="aws:sqs") for r in records]}
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    q = InMemoryQueue()
+    monkeypatch.setattr(fanout, "get_client", lambda name: q)
+    monkeypatch.setenv("BACKFILL_QUEUE_URL", "https://sqs.local/backfill")
+    return q
+
+
+def _history():
+    return OilSeries.from_pairs((f"2025-01-{d:02d}", Decimal(600 + d)) for d in range(1, 32))
+
+
+def _store(**extra):
+    return lambda config_path=None: dict({"oil_api": "http://oil", "exchange_api": "http://fx?from=USD&to=MAD"}, **extra)
+
+
+def test_chunk_range_covers_the_range_without_overlap():
+    assert fanout.chunk_range("2025-01-01", "2025-01-10", 4) == [
+        ("2025-01-01", "2025-01-04"), ("2025-01-05", "2025-01-08"), ("2025-01-09", "2025-01-10"),
+    ]
+    assert fanout.chunk_range("2025-01-01", "2025-01-01", 30) == [("2025-01-01", "2025-01-01")]
+    with pytest.raises(ValueError):
+        fanout.chunk_range("2025-01-01", "2025-01-02", 0)
+
+
+def test_coordinator_enqueues_one_message_per_chunk(monkeypatch, queue):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+    urls = []
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: urls.append(url) or _history())
+
+    result = fanout.coordinator_handler(
+        {"backfill": {"start_date": "2024-01-01", "end_date": "2025-12-31"}, "chunk_days": 30},
+        SimpleNamespace(aws_request_id="req-1"),
+    )
+
+    assert result["status"] == "ok"
+    assert result["chunks"] == result["enqueued"] == 25
+    assert queue.calls == 3
+    # The history is requested once; each chunk carries its own bars
+    assert urls == ["http://oil"]
+    bodies = [json.loads(m["body"]) for m in queue.messages]
+    assert bodies[0] == {"start_date": "2024-01-01", "end_date": "2024-01-30", "bars": [], "request_id": "req-1"}
+    assert bodies[-1]["end_date"] == "2025-12-31"
+    january = [b for b in bodies if b["bars"]]
+    assert [len(b["bars"]) for b in january] == [24, 7]
+    assert january[0]["bars"][0] == ["2025-01-01", "601.0000"]
+
+
+def test_coordinator_splits_batches_by_size(monkeypatch, queue):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: _history())
+    monkeypatch.setattr(fanout, "_MAX_BATCH_BYTES", 500)
+
+    result = fanout.coordinator_handler(
+        {"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-31"}, "chunk_days": 10}, None,
+    )
+
+    assert result["enqueued"] == 4
+    assert queue.calls == 3
+    assert all(len(m["body"]) <= 500 for m in queue.messages)
+
+    monkeypatch.setattr(fanout, "_MAX_BATCH_BYTES", 100)
+    result = fanout.coordinator_handler(
+        {"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-31"}, "chunk_days": 10}, None,
+    )
+    assert result["status"] == "error"
+    assert "chunk_days" in result["message"]
+
+
+def test_coordinator_resends_rejected_entries(monkeypatch, queue):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: _history())
+    queue._reject = {"1", "3"}
+
+    result = fanout.coordinator_handler(
+        {"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-05"}, "chunk_days": 1}, None,
+    )
+
+    assert result["enqueued"] == 5
+    assert result["failed"] == 0
+    assert len(queue.messages) == 5
+
+
+def test_coordinator_fans_out_per_source(monkeypatch, queue):
+    sources = [{"name": "brent", "url": "http://brent"}, {"name": "wti", "url": "http://wti"}]
+    monkeypatch.setattr(appmod, "get_store_urls", _store(sources=sources))
+    urls = []
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: urls.append(url) or _history())
+
+    result = fanout.coordinator_handler(
+        {"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-20"}, "chunk_days": 10, "sources": ["wti"]},
+        None,
+    )
+
+    assert result["chunks"] == 2
+    assert urls == ["http://wti"]
+    assert {json.loads(m["body"])["source"] for m in queue.messages} == {"wti"}
+
+
+@pytest.mark.parametrize("event", [
+    {"backfill": {"start_date": "2025-02-01", "end_date": "2025-01-01"}},
+    {"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-31"}, "chunk_days": "x"},
+    {"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-31"}, "sources": ["brent"]},
+])
+def test_coordinator_rejects_invalid_requests(monkeypatch, queue, event):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+
+    result = fanout.coordinator_handler(event, None)
+
+    assert result["status"] == "error"
+    assert queue.messages == []
+
+
+def test_coordinator_reports_a_failed_history_request(monkeypatch, queue):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+
+    def failing(url):
+        raise appmod.ExtractionError("oil response missing 'bars' list")
+
+    monkeypatch.setattr(appmod, "fetch_oil_series", failing)
+
+    result = fanout.coordinator_handler({"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-31"}}, None)
+
+    assert result["status"] == "error"
+    assert "bars" in result["message"]
+    assert queue.messages == []
+
+
+def test_worker_backfills_chunks_and_reports_partial_failures(monkeypatch, queue):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+    urls = []
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: urls.append(url) or _history())
+    monkeypatch.setattr(appmod, "get_exchange_api_key", lambda: "k")
+
+    def fake_exchange(url, date=None, api_key=None):
+        if date == "2025-01-15":
+            raise appmod.ExtractionError("no rate")
+        return date, Decimal("9.5")
+
+    monkeypatch.setattr(appmod, "fetch_exchange_data", fake_exchange)
+    written = []
+    monkeypatch.setattr(appmod, "write_batch", lambda table, records, **kw: written.extend(records) or {"written": len(records), "failed": 0})
+
+    fanout.coordinator_handler({"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-31"}, "chunk_days": 10}, None)
+    event = queue.receive()
+    event["Records"].append({"messageId": "bad", "body": "not json"})
+
+    response = fanout.worker_handler(event, None)
+
+    # Chunk 2025-01-11..20 had a failed exchange request; the malformed message fails too
+    failed = {f["itemIdentifier"] for f in response["batchItemFailures"]}
+    assert failed == {event["Records"][1]["messageId"], "bad"}
+    assert len(written) == 30
+    assert sorted(r[0] for r in written)[0] == "2025-01-01"
+    assert written[0][1] == Decimal("601")
+    # Only the coordinator requested the oil history
+    assert urls == ["http://oil"]
+
+
+def test_worker_requests_the_history_for_a_chunk_without_bars(monkeypatch):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+    urls = []
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: urls.append(url) or _history())
+    monkeypatch.setattr(appmod, "get_exchange_api_key", lambda: "k")
+    monkeypatch.setattr(appmod, "fetch_exchange_data", lambda url, date=None, api_key=None: (date, Decimal("9.5")))
+    written = []
+    monkeypatch.setattr(appmod, "write_batch", lambda table, records, **kw: written.extend(records) or {"written": len(records), "failed": 0})
+    body = json.dumps({"start_date": "2025-01-01", "end_date": "2025-01-03"})
+
+    response = fanout.worker_handler({"Records": [{"messageId": "a", "body": body}]}, None)
+
+    assert response == {"batchItemFailures": []}
+    assert urls == ["http://oil"]
+    assert [r[0] for r in written] == ["2025-01-01", "2025-01-02", "2025-01-03"]
+
+
+def test_worker_backfills_a_source_under_its_pk(monkeypatch, queue):
+    sources = [{"name": "brent", "url": "http://brent", "pk": "BRENT"}]
+    monkeypatch.setattr(appmod, "get_store_urls", _store(sources=sources))
+    urls = []
+    monkeypatch.setattr(appmod, "fetch_oil_series", lambda url: urls.append(url) or _history())
+    monkeypatch.setattr(appmod, "get_exchange_api_key", lambda: "k")
+    monkeypatch.setattr(appmod, "fetch_exchange_data", lambda url, date=None, api_key=None: (date, Decimal("9.5")))
+    pks = []
+    monkeypatch.setattr(appmod, "write_batch", lambda table, records, pk="OIL_PRICE": pks.append(pk) or {"written": len(records), "failed": 0})
+
+    fanout.coordinator_handler({"backfill": {"start_date": "2025-01-01", "end_date": "2025-01-05"}}, None)
+    response = fanout.worker_handler(queue.receive(), None)
+
+    assert response == {"batchItemFailures": []}
+    assert urls == ["http://brent"]
+    assert pks == ["BRENT"]
+
+
+def test_worker_returns_unprocessed_chunks_when_time_runs_out(monkeypatch, queue):
+    monkeypatch.setattr(appmod, "get_store_urls", _store())
+    monkeypatch.setattr(fanout, "remaining_time", lambda: 5.0)
+    event = {"Records": [{"messageId": "a", "body": "{}"}, {"messageId": "b", "body": "{}"}]}
+
+    response = fanout.worker_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "a"}, {"itemIdentifier": "b"}]}
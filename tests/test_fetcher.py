@@ -1,16 +1,27 @@
 import pytest
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
+import contextlib
+import io
 import json
+import urllib.error
 
+import src.fetcher as fetchermod
+from src.http_client import Response
 from src.fetcher import (
     parse_oil_price, 
+    parse_oil_series,
     parse_exchange_rate, 
+    parse_exchange_rates,
     ExtractionError,
     fetch_oil_data,
+    fetch_oil_tail,
     fetch_exchange_data,
+    fetch_exchange_rates,
+    get_secret,
     _fetch_json,
-    _parse_date_string_to_iso
+    _parse_date_string_to_iso,
+    _parse_date_string_to_iso_slow,
 )
 
 
@@ -40,6 +51,33 @@ def test_parse_oil_price_malformed_bars_raises():
         parse_oil_price(resp)
 
 
+def test_parse_oil_series_returns_full_history():
+    resp = {
+        "bars": [
+            ["Mon Aug 11 00:00:00 2025", 653],
+            ["Tue Aug 12 00:00:00 2025", 648.25],
+            ["Wed Aug 13 00:00:00 2025", 639.25]
+        ],
+        "marketId": 5910762
+    }
+    assert list(parse_oil_series(resp).items()) == [
+        ("2025-08-11", Decimal("653")),
+        ("2025-08-12", Decimal("648.25")),
+        ("2025-08-13", Decimal("639.25")),
+    ]
+
+
+def test_parse_oil_series_malformed_entry_raises():
+    resp = {
+        "bars": [
+            ["bad_entry"],
+            ["Wed Aug 13 00:00:00 2025", 639.25]
+        ]
+    }
+    with pytest.raises(ExtractionError, match="bar 0"):
+        parse_oil_series(resp)
+
+
 def test_parse_oil_price_missing_bars_raises():
     resp = {"no_bars": True}
     with pytest.raises(ExtractionError):
@@ -292,98 +330,132 @@ def test_parse_date_string_iso_with_timezone():
     assert result == "2025-08-13"
 
 
+@pytest.mark.parametrize("raw", [
+    "Mon Aug 11 00:00:00 2025",
+    "mon aug 11 00:00:00 2025",
+    "Fri Feb 29 00:00:00 2024",
+    "Sat Feb 29 00:00:00 2025",
+    "Xyz Aug 11 00:00:00 2025",
+    "Mon Aug 11 24:00:00 2025",
+    "Mon Aug  1 00:00:00 2025",
+    "Mon Aug 1 0:00:00 2025",
+    "2025-08-13",
+    "2025-8-13",
+    "2025-02-30",
+    "2025-08-13T14:30:00",
+    "2025-08-13T14:30:00+02:00",
+    "2025-08-13 14:30:00",
+    "13 Aug 2025",
+    "3 aug 2025",
+    "Aug 13 2025",
+    "Foo 13 2025",
+    "August 13 2025",
+    "",
+])
+def test_parse_date_string_fast_path_matches_strptime(raw):
+    """Test that the regex fast path agrees with the strptime implementation"""
+    assert _parse_date_string_to_iso(raw) == _parse_date_string_to_iso_slow(raw)
+    assert _parse_date_string_to_iso(raw, source="test-parity") == _parse_date_string_to_iso_slow(raw)
+
+
+def test_parse_date_string_remembers_format_per_source():
+    """Test that the matching format is cached per source and other shapes still parse"""
+    fetchermod._date_format_hints.pop("test-hint", None)
+    assert _parse_date_string_to_iso("13 Aug 2025", source="test-hint") == "2025-08-13"
+    assert fetchermod._date_format_hints["test-hint"] == 2
+    assert _parse_date_string_to_iso("Mon Aug 11 00:00:00 2025", source="test-hint") == "2025-08-11"
+
+
 # Tests for _fetch_json
 
-@patch('src.fetcher.urllib.request.urlopen')
-def test_fetch_json_success(mock_urlopen):
+def _fake_response(body, charset="utf-8"):
+    headers = MagicMock()
+    headers.get_content_charset.return_value = charset
+    return Response("http://example.com", 200, headers, body)
+
+
+@patch('src.fetcher.get_session')
+def test_fetch_json_success(mock_get_session):
     """Test successful JSON fetching"""
-    mock_response = MagicMock()
-    mock_response.read.return_value = b'{"key": "value"}'
-    mock_response.headers.get_content_charset.return_value = "utf-8"
-    mock_response.__enter__.return_value = mock_response
-    mock_response.__exit__.return_value = None
-    mock_urlopen.return_value = mock_response
+    session = mock_get_session.return_value
+    session.get.return_value = _fake_response(b'{"key": "value"}')
     
     result = _fetch_json("http://example.com")
     assert result == {"key": "value"}
-    # Check that Request object was created and passed to urlopen
-    call_args = mock_urlopen.call_args
-    assert call_args[1]['timeout'] == 10
+    # Check that the shared session was used with the default timeout
+    call_args = session.get.call_args
+    assert call_args[0][0] == "http://example.com"
+    assert call_args[1]['timeout'] is None
+    assert "User-Agent" in call_args[1]['headers']
 
 
-@patch('src.fetcher.urllib.request.urlopen')
-def test_fetch_json_with_headers(mock_urlopen):
+@patch('src.fetcher.get_session')
+def test_fetch_json_with_headers(mock_get_session):
     """Test JSON fetching with custom headers"""
-    mock_response = MagicMock()
-    mock_response.read.return_value = b'{"key": "value"}'
-    mock_response.headers.get_content_charset.return_value = "utf-8"
-    mock_response.__enter__.return_value = mock_response
-    mock_response.__exit__.return_value = None
-    mock_urlopen.return_value = mock_response
+    session = mock_get_session.return_value
+    session.get.return_value = _fake_response(b'{"key": "value"}')
     
     headers = {"apikey": "test-key-123", "User-Agent": "TestAgent"}
     result = _fetch_json("http://example.com", headers=headers)
     assert result == {"key": "value"}
     
-    # Verify Request object was created with headers
-    call_args = mock_urlopen.call_args[0]
-    request_obj = call_args[0]
-    assert request_obj.get_header('Apikey') == "test-key-123"
-    assert request_obj.get_header('User-agent') == "TestAgent"
+    # Verify custom headers were sent and override the default User-Agent
+    sent_headers = session.get.call_args[1]['headers']
+    assert sent_headers['apikey'] == "test-key-123"
+    assert sent_headers['User-Agent'] == "TestAgent"
 
 
-@patch('src.fetcher.urllib.request.urlopen')
-def test_fetch_json_custom_timeout(mock_urlopen):
+@patch('src.fetcher.get_session')
+def test_fetch_json_custom_timeout(mock_get_session):
     """Test JSON fetching with custom timeout"""
-    mock_response = MagicMock()
-    mock_response.read.return_value = b'{"key": "value"}'
-    mock_response.headers.get_content_charset.return_value = "utf-8"
-    mock_response.__enter__.return_value = mock_response
-    mock_response.__exit__.return_value = None
-    mock_urlopen.return_value = mock_response
+    session = mock_get_session.return_value
+    session.get.return_value = _fake_response(b'{"key": "value"}')
     
     _fetch_json("http://example.com", timeout=30)
-    call_args = mock_urlopen.call_args
+    call_args = session.get.call_args
     assert call_args[1]['timeout'] == 30
 
 
-@patch('src.fetcher.urllib.request.urlopen')
-def test_fetch_json_with_different_charset(mock_urlopen):
+@patch('src.fetcher.get_session')
+def test_fetch_json_with_different_charset(mock_get_session):
     """Test JSON fetching with different charset"""
-    mock_response = MagicMock()
-    mock_response.read.return_value = b'{"key": "value"}'
-    mock_response.headers.get_content_charset.return_value = "latin-1"
-    mock_response.__enter__.return_value = mock_response
-    mock_response.__exit__.return_value = None
-    mock_urlopen.return_value = mock_response
+    session = mock_get_session.return_value
+    session.get.return_value = _fake_response('{"key": "välue"}'.encode("latin-1"), charset="latin-1")
     
     result = _fetch_json("http://example.com")
-    assert result == {"key": "value"}
+    assert result == {"key": "välue"}
 
 
-@patch('src.fetcher.urllib.request.urlopen')
-def test_fetch_json_network_error_raises(mock_urlopen):
+@patch('src.fetcher.get_session')
+def test_fetch_json_network_error_raises(mock_get_session):
     """Test that network errors are raised"""
-    mock_urlopen.side_effect = Exception("Network error")
+    mock_get_session.return_value.get.side_effect = Exception("Network error")
     
     with pytest.raises(Exception, match="Network error"):
         _fetch_json("http://example.com")
 
 
-@patch('src.fetcher.urllib.request.urlopen')
-def test_fetch_json_invalid_json_raises(mock_urlopen):
+@patch('src.fetcher.get_session')
+def test_fetch_json_invalid_json_raises(mock_get_session):
     """Test that invalid JSON raises error"""
-    mock_response = MagicMock()
-    mock_response.read.return_value = b'not valid json'
-    mock_response.headers.get_content_charset.return_value = "utf-8"
-    mock_response.__enter__.return_value = mock_response
-    mock_response.__exit__.return_value = None
-    mock_urlopen.return_value = mock_response
+    mock_get_session.return_value.get.return_value = _fake_response(b'not valid json')
     
     with pytest.raises(json.JSONDecodeError):
         _fetch_json("http://example.com")
 
 
+@patch('src.retry._sleep')
+@patch('src.fetcher.get_session')
+def test_fetch_json_retries_transient_http_error(mock_get_session, mock_sleep):
+    """Test that a 502 is retried instead of failing the run"""
+    bad_gateway = urllib.error.HTTPError("http://example.com", 502, "Bad Gateway", {}, io.BytesIO(b""))
+    mock_get_session.return_value.get.side_effect = [bad_gateway, _fake_response(b'{"key": "value"}')]
+
+    assert _fetch_json("http://example.com") == {"key": "value"}
+    assert mock_get_session.return_value.get.call_count == 2
+    mock_sleep.assert_called_once()
+
+
 # Tests for fetch_oil_data
 
 @patch('src.fetcher._fetch_json')
@@ -418,6 +490,56 @@ def test_fetch_oil_data_network_error(mock_fetch):
         fetch_oil_data("http://oil.example.com")
 
 
+class _FakeStreamSession:
+    read_timeout = 10
+
+    def __init__(self, body, chunk_size=5):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    @contextlib.contextmanager
+    def stream(self, url, headers=None, timeout=None):
+        yield iter([self.body[i:i + self.chunk_size] for i in range(0, len(self.body), self.chunk_size)])
+
+
+@patch('src.fetcher.get_session')
+def test_fetch_oil_tail_keeps_last_bars(mock_get_session):
+    """Test that streaming returns only the trailing bars, parsed"""
+    mock_get_session.return_value = _FakeStreamSession(json.dumps({
+        "bars": [
+            ["Mon Aug 11 00:00:00 2025", 653],
+            ["Tue Aug 12 00:00:00 2025", 648.25],
+            ["Wed Aug 13 00:00:00 2025", 639.25]
+        ],
+        "marketId": 5910762
+    }).encode())
+
+    assert fetch_oil_tail("http://oil.example.com", n=2) == [
+        ("2025-08-12", Decimal("648.25")),
+        ("2025-08-13", Decimal("639.25")),
+    ]
+
+
+@patch('src.fetcher.get_session')
+def test_fetch_oil_tail_missing_bars_raises(mock_get_session):
+    """Test that a response without bars raises ExtractionError"""
+    mock_get_session.return_value = _FakeStreamSession(b'{"marketId": 5910762}')
+
+    with pytest.raises(ExtractionError, match="bars"):
+        fetch_oil_tail("http://oil.example.com")
+
+
+@patch('src.fetcher.get_session')
+@patch.dict('os.environ', {'OIL_STREAMING': 'true'})
+def test_fetch_oil_data_streaming_mode(mock_get_session):
+    """Test that OIL_STREAMING=true routes fetch_oil_data through the streaming path"""
+    mock_get_session.return_value = _FakeStreamSession(
+        b'{"bars": [["Tue Aug 12 00:00:00 2025", 648.25], ["Wed Aug 13 00:00:00 2025", 639.25]]}'
+    )
+
+    assert fetch_oil_data("http://oil.example.com") == ("2025-08-13", Decimal("639.25"))
+
+
 # Tests for fetch_exchange_data
 
 @patch('src.fetcher._fetch_json')
@@ -493,6 +615,30 @@ def test_fetch_exchange_data_url_without_query_params(mock_get_secret, mock_get_
     assert "&date=2025-11-12" in url_called
 
 
+@patch('src.fetcher._fetch_json')
+@patch('src.fetcher.get_fetch_date')
+@patch('src.fetcher.get_secret')
+def test_fetch_exchange_data_explicit_date_and_api_key(mock_get_secret, mock_get_date, mock_fetch):
+    """Test that an explicit date and API key bypass get_fetch_date and Secrets Manager"""
+    mock_fetch.return_value = {
+        "date": "2025-08-11",
+        "info": {"rate": 9.4},
+        "success": True
+    }
+
+    date_iso, rate = fetch_exchange_data(
+        "http://exchange.example.com?from=USD&to=MAD", date="2025-08-11", api_key="k"
+    )
+    assert date_iso == "2025-08-11"
+    assert rate == Decimal("9.4")
+    mock_get_date.assert_not_called()
+    mock_get_secret.assert_not_called()
+
+    call_args = mock_fetch.call_args
+    assert call_args[0][0].endswith("&date=2025-08-11")
+    assert call_args[1]['headers'] == {"apikey": "k"}
+
+
 @patch('src.fetcher._fetch_json')
 @patch('src.fetcher.get_fetch_date')
 @patch('src.fetcher.get_secret')
@@ -516,4 +662,156 @@ def test_fetch_exchange_data_network_error(mock_get_secret, mock_get_date, mock_
     mock_fetch.side_effect = Exception("Timeout")
     
     with pytest.raises(Exception, match="Timeout"):
-        fetch_exchange_data("http://exchange.example.com")
\ No newline at end of file
+        fetch_exchange_data("http://exchange.example.com")
+
+# Tests for secret caching
+
+@pytest.fixture
+def fresh_secret_cache(monkeypatch):
+    client = MagicMock()
+    monkeypatch.setattr(fetchermod, "get_client", lambda name: client)
+    fetchermod._secret_cache.invalidate()
+    yield client
+    fetchermod._secret_cache.invalidate()
+
+
+def test_get_secret_is_cached_between_calls(fresh_secret_cache):
+    """Test that a warm container reuses the secret instead of calling Secrets Manager"""
+    fresh_secret_cache.get_secret_value.return_value = {"SecretString": '{"key": "abc"}'}
+
+    assert get_secret("/prod/exchange-api-key") == "abc"
+    assert get_secret("/prod/exchange-api-key") == "abc"
+    fresh_secret_cache.get_secret_value.assert_called_once_with(SecretId="/prod/exchange-api-key")
+
+
+def test_get_secret_failure_is_not_cached(fresh_secret_cache):
+    """Test that a failed lookup returns None and is retried on the next call"""
+    fresh_secret_cache.get_secret_value.side_effect = [
+        Exception("throttled"),
+        {"SecretString": "plain-key"},
+    ]
+
+    assert get_secret("/prod/exchange-api-key") is None
+    assert get_secret("/prod/exchange-api-key") == "plain-key"
+
+
+@patch.dict('os.environ', {'SECRET_CACHE_TTL_SECONDS': '0'})
+def test_get_secret_ttl_zero_disables_cache(fresh_secret_cache):
+    """Test that SECRET_CACHE_TTL_SECONDS=0 turns caching off"""
+    fresh_secret_cache.get_secret_value.return_value = {"SecretString": "plain-key"}
+
+    get_secret("/prod/exchange-api-key")
+    get_secret("/prod/exchange-api-key")
+    assert fresh_secret_cache.get_secret_value.call_count == 2
+
+
+@patch('src.fetcher._fetch_json')
+@patch('src.fetcher.get_fetch_date')
+@patch.dict('os.environ', {}, clear=True)
+def test_fetch_exchange_data_refreshes_rotated_key_on_auth_failure(mock_get_date, mock_fetch, fresh_secret_cache):
+    """Test that a 401 with a cached key forces a secret refresh and one retry"""
+    mock_get_date.return_value = "2025-11-12"
+    fresh_secret_cache.get_secret_value.side_effect = [
+        {"SecretString": "old-key"},
+        {"SecretString": "new-key"},
+    ]
+    unauthorized = urllib.error.HTTPError("http://fx", 401, "Unauthorized", {}, io.BytesIO(b""))
+    mock_fetch.side_effect = [
+        unauthorized,
+        {"date": "2025-11-12", "info": {"rate": 9.49}},
+    ]
+
+    date_iso, rate = fetch_exchange_data("http://exchange.example.com?from=USD&to=MAD")
+
+    assert rate == Decimal("9.49")
+    assert mock_fetch.call_args_list[0][1]["headers"] == {"apikey": "old-key"}
+    assert mock_fetch.call_args_list[1][1]["headers"] == {"apikey": "new-key"}
+
+
+# Tests for multi-currency exchange rates
+
+def test_parse_exchange_rates_success():
+    resp = {
+        "base": "USD",
+        "date": "2025-04-04",
+        "rates": {"EUR": 0.911, "MAD": 9.490092, "GBP": 0.77},
+        "success": True,
+    }
+    date_iso, rates = parse_exchange_rates(resp, ["MAD", "EUR"])
+    assert date_iso == "2025-04-04"
+    assert rates == {"MAD": Decimal("9.490092"), "EUR": Decimal("0.911")}
+
+
+def test_parse_exchange_rates_uses_timestamp_without_date():
+    resp = {"rates": {"MAD": 9.49}, "timestamp": 1743811199}
+    date_iso, _ = parse_exchange_rates(resp, ["MAD"])
+    assert date_iso == "2025-04-04"
+
+
+def test_parse_exchange_rates_missing_currency_raises():
+    resp = {"date": "2025-04-04", "rates": {"MAD": 9.49}}
+    with pytest.raises(ExtractionError, match="EUR"):
+        parse_exchange_rates(resp, ["MAD", "EUR"])
+
+
+def test_parse_exchange_rates_missing_rates_raises():
+    with pytest.raises(ExtractionError):
+        parse_exchange_rates({"date": "2025-04-04", "result": 9.49}, ["MAD"])
+
+
+@patch('src.fetcher._fetch_json')
+@patch('src.fetcher.get_secret')
+def test_fetch_exchange_rates_batched_makes_one_request(mock_get_secret, mock_fetch):
+    """Test that a multi-symbol endpoint fetches every currency in a single call"""
+    mock_get_secret.return_value = "k"
+    mock_fetch.return_value = {"date": "2025-11-12", "rates": {"MAD": 9.49, "EUR": 0.91}}
+
+    date_iso, rates = fetch_exchange_rates(
+        "http://fx.example/convert?from=USD&to=MAD",
+        ["MAD", "EUR"],
+        date="2025-11-12",
+        rates_url="http://fx.example/{date}?base=USD",
+    )
+
+    assert date_iso == "2025-11-12"
+    assert rates == {"MAD": Decimal("9.49"), "EUR": Decimal("0.91")}
+    mock_fetch.assert_called_once()
+    assert mock_fetch.call_args[0][0] == "http://fx.example/2025-11-12?base=USD&symbols=MAD,EUR"
+    assert mock_fetch.call_args[1]["headers"] == {"apikey": "k"}
+
+
+@patch('src.fetcher._fetch_json')
+@patch('src.fetcher.get_secret')
+def test_fetch_exchange_rates_fans_out_without_batch_endpoint(mock_get_secret, mock_fetch):
+    """Test the concurrent per-currency fallback shares one secret lookup"""
+    mock_get_secret.return_value = "k"
+    fx = {"MAD": 9.49, "EUR": 0.91, "GBP": 0.77}
+
+    def fake_fetch(url, headers=None):
+        currency = url.split("to=")[1].split("&")[0]
+        return {"date": "2025-11-12", "info": {"rate": fx[currency]}}
+
+    mock_fetch.side_effect = fake_fetch
+
+    date_iso, rates = fetch_exchange_rates(
+        "http://fx.example/convert?from=USD&to=MAD&amount=1", ["MAD", "EUR", "GBP"], date="2025-11-12"
+    )
+
+    assert date_iso == "2025-11-12"
+    assert rates == {"MAD": Decimal("9.49"), "EUR": Decimal("0.91"), "GBP": Decimal("0.77")}
+    assert mock_fetch.call_count == 3
+    mock_get_secret.assert_called_once()
+    urls = sorted(call[0][0] for call in mock_fetch.call_args_list)
+    assert urls[0] == "http://fx.example/convert?from=USD&amount=1&to=EUR&date=2025-11-12"
+
+
+@patch('src.fetcher._fetch_json')
+def test_fetch_exchange_rates_rejects_mixed_dates(mock_fetch):
+    def fake_fetch(url, headers=None):
+        day = "2025-11-11" if "to=EUR" in url else "2025-11-12"
+        return {"date": day, "info": {"rate": 1}}
+
+    mock_fetch.side_effect = fake_fetch
+
+    with pytest.raises(ExtractionError, match="different dates"):
+        fetch_exchange_rates("http://fx.example?to=MAD", ["MAD", "EUR"], date="2025-11-12", api_key="k")
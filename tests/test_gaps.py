@@ -0,0 +1,38 @@
+from decimal import Decimal
+
+import src.gaps as gaps
+from src.storage import build_item
+
+
+def test_business_days_skips_weekends():
+    # 2025-08-08 is a Friday
+    assert gaps.business_days("2025-08-08", "2025-08-12") == ["2025-08-08", "2025-08-11", "2025-08-12"]
+    assert gaps.business_days("2025-08-09", "2025-08-10") == []
+
+
+def test_stored_dates_reads_keys_only(oil_table, monkeypatch):
+    oil_table.put_item(Item=build_item("2025-08-11", Decimal("653"), Decimal("9.5")))
+    seen = []
+    original = gaps.iter_range
+
+    def recording_iter_range(*args, **kwargs):
+        for item in original(*args, **kwargs):
+            seen.append(item)
+            yield item
+
+    monkeypatch.setattr(gaps, "iter_range", recording_iter_range)
+
+    assert gaps.stored_dates("OilPrices", "2025-08-01", "2025-08-31") == {"2025-08-11"}
+    assert seen == [{"date": "2025-08-11"}]
+
+
+def test_find_gaps_reports_missing_business_days(oil_table):
+    for day in ("2025-08-04", "2025-08-05", "2025-08-07", "2025-08-11"):
+        oil_table.put_item(Item=build_item(day, Decimal("650"), Decimal("9.5")))
+    oil_table.put_item(Item=build_item("2025-08-06", Decimal("80"), Decimal("9.5"), pk="BRENT_PRICE"))
+
+    # 2025-08-04 (Mon) .. 2025-08-12 (Tue)
+    assert gaps.find_gaps("OilPrices", "2025-08-12", 9) == ["2025-08-06", "2025-08-08", "2025-08-12"]
+    assert gaps.find_gaps("OilPrices", "2025-08-12", 9, pk="BRENT_PRICE") == [
+        "2025-08-04", "2025-08-05", "2025-08-07", "2025-08-08", "2025-08-11", "2025-08-12",
+    ]
@@ -0,0 +1,171 @@
+import gzip
+import json
+import threading
+import urllib.error
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.http_client import HTTPSession
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer writes so headers and body leave in one segment
+    wbufsize = 64 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        payload = json.dumps({"path": self.path, "apikey": self.headers.get("apikey")}).encode()
+        if self.path.startswith("/gzip"):
+            self._send(200, gzip.compress(payload), {"Content-Encoding": "gzip"})
+        elif self.path.startswith("/deflate"):
+            self._send(200, zlib.compress(payload), {"Content-Encoding": "deflate"})
+        elif self.path.startswith("/big"):
+            body = json.dumps({"bars": [[i, i * 1.5] for i in range(5000)]}).encode()
+            self._send(200, gzip.compress(body), {"Content-Encoding": "gzip"})
+        elif self.path.startswith("/redirect"):
+            self._send(302, b"", {"Location": "/plain?redirected=1"})
+        elif self.path.startswith("/drop"):
+            # Answer without "Connection: close", then hang up like an idle-timeout would
+            self._send(200, payload)
+            self.close_connection = True
+        elif self.path.startswith("/missing"):
+            self._send(404, b'{"error": "not found"}')
+        else:
+            self._send(200, payload)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_session_reuses_keep_alive_connection(server):
+    session = HTTPSession()
+
+    for i in range(20):
+        resp = session.get(f"{server}/plain?date={i}", headers={"apikey": "k"})
+        assert json.loads(resp.text()) == {"path": f"/plain?date={i}", "apikey": "k"}
+
+    assert session.requests_sent == 20
+    assert session.connections_opened == 1
+    session.close()
+
+
+@pytest.mark.parametrize("path", ["/gzip", "/deflate"])
+def test_session_decodes_compressed_bodies(server, path):
+    session = HTTPSession()
+
+    resp = session.get(server + path)
+
+    assert json.loads(resp.text())["path"] == path
+    session.close()
+
+
+def test_session_follows_redirects(server):
+    session = HTTPSession()
+
+    resp = session.get(server + "/redirect")
+
+    assert resp.url.endswith("/plain?redirected=1")
+    assert json.loads(resp.text())["path"] == "/plain?redirected=1"
+    session.close()
+
+
+def test_session_raises_http_error(server):
+    session = HTTPSession()
+
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        session.get(server + "/missing")
+
+    assert excinfo.value.code == 404
+    # The connection is still usable after an error response
+    session.get(server + "/plain")
+    assert session.connections_opened == 1
+    session.close()
+
+
+def test_session_reconnects_after_server_closes_idle_connection(server):
+    session = HTTPSession()
+    session.get(server + "/drop")
+
+    resp = session.get(server + "/plain")
+
+    assert resp.status == 200
+    assert session.connections_opened == 2
+    session.close()
+
+
+def test_stream_yields_decoded_chunks_and_reuses_connection(server):
+    session = HTTPSession()
+
+    with session.stream(server + "/big", chunk_size=1024) as chunks:
+        parts = list(chunks)
+
+    assert len(parts) > 1
+    assert json.loads(b"".join(parts))["bars"][-1] == [4999, 4999 * 1.5]
+    session.get(server + "/plain")
+    assert session.connections_opened == 1
+    session.close()
+
+
+def test_stream_closed_early_drops_connection(server):
+    session = HTTPSession()
+
+    with session.stream(server + "/big", chunk_size=1024) as chunks:
+        next(chunks)
+
+    session.get(server + "/plain")
+    assert session.connections_opened == 2
+    session.close()
+
+
+def test_stream_raises_http_error(server):
+    session = HTTPSession()
+
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        with session.stream(server + "/missing"):
+            pass
+
+    assert excinfo.value.code == 404
+    session.close()
+
+
+def test_session_counts_wire_bytes_in_metrics(server):
+    import src.metrics as metrics
+
+    session = HTTPSession()
+    metrics.start_invocation()
+    try:
+        resp = session.get(server + "/big")
+        with session.stream(server + "/big") as chunks:
+            streamed = b"".join(chunks)
+        recorded = metrics.recorded()
+    finally:
+        metrics._current = None
+        session.close()
+
+    assert streamed == resp.body
+    counters = recorded["counters"]
+    assert counters["http_requests"] == 2
+    assert counters["http_connections"] == 1
+    # gzip-encoded on the wire, so fewer bytes than the decoded bodies
+    assert 0 < counters["http_bytes"] < 2 * len(resp.body)
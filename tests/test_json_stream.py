@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from src.json_stream import decode_chunks, iter_array_items
+
+
+def _chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+DOC = {
+    "meta": {"note": "brackets ] and } inside \"strings\"", "list": [1, [2, 3]]},
+    "bars": [
+        ["Mon Aug 11 00:00:00 2025", 653],
+        ["Tue Aug 12 00:00:00 2025", 648.25],
+        ["Wed Aug 13 00:00:00 2025", -1.5e3],
+    ],
+    "marketId": 5910762,
+}
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_iter_array_items_across_chunk_boundaries(size):
+    text = json.dumps(DOC)
+
+    assert list(iter_array_items(_chunked(text, size), "bars")) == DOC["bars"]
+
+
+def test_iter_array_items_does_not_truncate_numbers_at_chunk_end():
+    chunks = ['{"bars": [6', '48.2', '5, 1', '0]}']
+
+    assert list(iter_array_items(chunks, "bars")) == [648.25, 10]
+
+
+def test_iter_array_items_is_lazy():
+    def chunks():
+        yield '{"bars": [1, 2, '
+        raise AssertionError("read past what the consumer needed")
+
+    items = iter_array_items(chunks(), "bars")
+
+    assert next(items) == 1
+    assert next(items) == 2
+
+
+def test_iter_array_items_missing_key_raises():
+    with pytest.raises(KeyError):
+        list(iter_array_items(['{"marketId": 1}'], "bars"))
+
+
+def test_iter_array_items_non_array_raises():
+    with pytest.raises(TypeError):
+        list(iter_array_items(['{"bars": "nope"}'], "bars"))
+
+
+def test_iter_array_items_truncated_document_raises():
+    with pytest.raises(ValueError):
+        list(iter_array_items(['{"bars": [1, 2'], "bars"))
+
+
+def test_decode_chunks_handles_split_multibyte_characters():
+    data = '{"bars": ["é€"]}'.encode("utf-8")
+    chunks = [data[i:i + 1] for i in range(len(data))]
+
+    assert "".join(decode_chunks(chunks)) == '{"bars": ["é€"]}'
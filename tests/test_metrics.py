@@ -0,0 +1,109 @@
+import json
+import threading
+
+import pytest
+
+import src.metrics as metrics
+
+
+@pytest.fixture(autouse=True)
+def no_invocation():
+    metrics._current = None
+    yield
+    metrics._current = None
+
+
+def test_span_outside_invocation_records_nothing():
+    assert metrics.span("ssm") is metrics._NULL_SPAN
+    with metrics.span("ssm"):
+        pass
+    metrics.add("http_bytes", 10)
+
+    assert metrics.recorded() == {}
+    assert metrics.build_record("ns", "fn") is None
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setenv("METRICS_ENABLED", "false")
+    metrics.start_invocation()
+
+    with metrics.span("ssm"):
+        pass
+
+    assert metrics.span("ssm") is metrics._NULL_SPAN
+    assert metrics.recorded() == {}
+
+
+def test_spans_and_counters_accumulate_across_threads():
+    metrics.start_invocation()
+
+    def work():
+        with metrics.span("http"):
+            metrics.add("http_bytes", 100)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with metrics.span("ssm"):
+        pass
+
+    recorded = metrics.recorded()
+    assert recorded["stages"]["http"]["count"] == 4
+    assert recorded["stages"]["ssm"]["count"] == 1
+    assert recorded["counters"] == {"http_bytes": 400}
+
+
+def test_span_records_when_the_block_raises():
+    metrics.start_invocation()
+
+    with pytest.raises(ValueError):
+        with metrics.span("parse"):
+            raise ValueError("bad")
+
+    assert metrics.recorded()["stages"]["parse"]["count"] == 1
+
+
+def test_build_record_is_embedded_metric_format():
+    metrics.start_invocation()
+    with metrics.span("ssm"):
+        pass
+    metrics.add("http_bytes", 2048)
+    metrics.add("retries", 2)
+
+    record = metrics.build_record("OilPriceFetcher", "fetcher", {"status": "ok", "mode": "daily"})
+
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "OilPriceFetcher"
+    assert directive["Dimensions"] == [["Function"]]
+    assert {m["Name"]: m["Unit"] for m in directive["Metrics"]} == {
+        "total_ms": "Milliseconds",
+        "ssm_ms": "Milliseconds",
+        "http_bytes": "Bytes",
+        "retries": "Count",
+    }
+    assert isinstance(record["_aws"]["Timestamp"], int)
+    assert record["Function"] == "fetcher"
+    assert record["ssm_calls"] == 1
+    assert record["http_bytes"] == 2048
+    assert record["retries"] == 2
+    assert record["status"] == "ok"
+    assert record["total_ms"] >= record["ssm_ms"] >= 0
+    # The invocation is finished
+    assert metrics.recorded() == {}
+
+
+def test_emit_prints_one_json_line(monkeypatch, capsys):
+    monkeypatch.setenv("METRICS_NAMESPACE", "Custom")
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "oil-fetcher")
+    metrics.start_invocation()
+
+    record = metrics.emit(None, {"status": "ok"})
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0]) == record
+    assert record["Function"] == "oil-fetcher"
+    assert record["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "Custom"
+    assert metrics.emit(None) is None
@@ -0,0 +1,161 @@
+import asyncio
+import io
+import urllib.error
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import src.fetcher as fetchermod
+import src.rate_limit as rate_limit
+import src.retry as retry
+from src.http_client import Response
+from src.rate_limit import TokenBucket, configure_rate_limits, limiter_for
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Fake monotonic clock; sleeping advances it.
+    """
+    now = {"t": 1000.0}
+    sleeps = []
+
+    def sleep(delay):
+        sleeps.append(delay)
+        now["t"] += delay
+
+    async def async_sleep(delay):
+        sleep(delay)
+
+    monkeypatch.setattr(rate_limit, "_clock", lambda: now["t"])
+    monkeypatch.setattr(rate_limit, "_sleep", sleep)
+    monkeypatch.setattr(rate_limit, "_async_sleep", async_sleep)
+    monkeypatch.setattr(retry, "_deadline", None)
+    now["sleeps"] = sleeps
+    yield now
+    configure_rate_limits(None)
+
+
+def _throttled(retry_after=None):
+    headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+    return urllib.error.HTTPError("http://fx", 429, "Too Many Requests", headers, io.BytesIO(b""))
+
+
+def test_bucket_allows_a_burst_then_paces_requests(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    waits = [bucket.acquire() for _ in range(6)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3:] == pytest.approx([0.5, 0.5, 0.5])
+    assert clock["t"] == pytest.approx(1001.5)
+
+
+def test_concurrent_reservations_are_queued_in_order(clock):
+    bucket = TokenBucket(rate=4, burst=1)
+
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0, 0.25, 0.5, 0.75])
+
+
+def test_throttle_halves_the_rate_and_recovers(clock):
+    bucket = TokenBucket(rate=10, burst=1, recovery_seconds=20)
+
+    assert bucket.observe(_throttled())
+    assert bucket.rate() == pytest.approx(5)
+    bucket.throttled()
+    assert bucket.rate() == pytest.approx(2.5)
+    clock["t"] += 10
+    assert bucket.rate() == pytest.approx(6.25)
+    clock["t"] += 10
+    assert bucket.rate() == 10
+    assert bucket.throttled_count == 2
+
+
+def test_throttle_never_goes_below_min_rate(clock):
+    bucket = TokenBucket(rate=4, min_rate=1)
+    for _ in range(5):
+        bucket.throttled()
+    assert bucket.rate() == 1
+
+
+def test_retry_after_pauses_every_caller(clock):
+    bucket = TokenBucket(rate=100, burst=100)
+
+    bucket.observe(_throttled(retry_after=3))
+
+    assert bucket.acquire() == pytest.approx(3)
+    assert bucket.acquire() == pytest.approx(0.02)
+
+
+def test_other_errors_do_not_throttle(clock):
+    bucket = TokenBucket(rate=5)
+    error = urllib.error.HTTPError("http://fx", 503, "Unavailable", {}, io.BytesIO(b""))
+
+    assert not bucket.observe(error)
+    assert bucket.rate() == 5
+
+
+def test_acquire_fails_fast_when_the_wait_exceeds_the_budget(clock, monkeypatch):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire()
+    monkeypatch.setattr(rate_limit, "remaining_time", lambda: 0.5)
+
+    with pytest.raises(retry.DeadlineExceeded):
+        bucket.acquire()
+    clock["t"] += 1
+    assert bucket.acquire() == 0
+
+
+def test_acquire_async_waits_without_blocking(clock):
+    bucket = TokenBucket(rate=2, burst=1)
+
+    async def run():
+        return [await bucket.acquire_async() for _ in range(3)]
+
+    assert asyncio.run(run()) == pytest.approx([0, 0.5, 0.5])
+
+
+def test_configure_rate_limits_by_host_and_port(clock):
+    configure_rate_limits({"API.fx.example": 5, "api.fx.example:8443": {"rate": 1, "burst": 2}})
+
+    assert limiter_for("https://api.fx.example/convert?to=MAD").configured_rate == 5
+    assert limiter_for("https://api.fx.example:8443/convert").burst == 2
+    assert limiter_for("https://oil.example/bars") is None
+
+
+def test_configure_keeps_state_of_unchanged_buckets(clock):
+    configure_rate_limits({"fx": 5, "oil": 2})
+    fx = limiter_for("http://fx/")
+    fx.throttled()
+
+    configure_rate_limits({"fx": 5, "oil": 3})
+
+    assert limiter_for("http://fx/") is fx
+    assert limiter_for("http://oil/").configured_rate == 3
+    configure_rate_limits({})
+    assert limiter_for("http://fx/") is None
+
+
+@pytest.mark.parametrize("limits", [[1], {"fx": 0}, {"fx": "fast"}, {"fx": {"burst": 2}}, {"fx": {"rate": 1, "max": 2}}])
+def test_configure_rejects_malformed_limits(clock, limits):
+    with pytest.raises(ValueError):
+        configure_rate_limits(limits)
+
+
+def test_fetch_json_paces_requests_and_backs_off_on_429(clock):
+    configure_rate_limits({"fx.example": {"rate": 2, "burst": 1}})
+    headers = MagicMock()
+    headers.get_content_charset.return_value = "utf-8"
+    ok = Response("http://fx.example", 200, headers, b'{"ok": true}')
+
+    with patch("src.fetcher.get_session") as get_session, patch("src.retry._sleep", rate_limit._sleep):
+        get_session.return_value.get.side_effect = [ok, _throttled(retry_after=1), ok]
+        assert fetchermod._fetch_json("http://fx.example/convert?date=1") == {"ok": True}
+        assert fetchermod._fetch_json("http://fx.example/convert?date=2") == {"ok": True}
+
+    bucket = limiter_for("http://fx.example/")
+    assert bucket.throttled_count == 1
+    assert bucket._floor_rate == pytest.approx(1)
+    # Paced second request, then the Retry-After wait in the retry loop; the pause
+    # has ended by the time the retry takes its token
+    assert clock["sleeps"] == pytest.approx([0.5, 1.0])
@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import src.fetcher as fetchermod
+from src.response_cache import ResponseCache, freshness, get_response_cache, normalize_url
+
+
+def test_normalize_url_sorts_query_and_lowercases_host():
+    a = normalize_url("HTTPS://Api.Example.com/convert?to=MAD&from=USD&date=2025-08-13#x")
+    b = normalize_url("https://api.example.com/convert?date=2025-08-13&from=USD&to=MAD")
+    assert a == b
+    assert a != normalize_url("https://api.example.com/convert?date=2025-08-12&from=USD&to=MAD")
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, (True, 0)),
+    ("max-age=300", (True, 300)),
+    ("public, max-age=60, must-revalidate", (True, 60)),
+    ("no-cache, max-age=60", (True, 0)),
+    ("no-store", (False, 0)),
+])
+def test_freshness(header, expected):
+    assert freshness(header) == expected
+
+
+def test_put_get_round_trip_survives_a_new_instance(tmp_path):
+    cache = ResponseCache(str(tmp_path), 1024 * 1024)
+    cache.put("http://x/a?b=1", '{"v": 1}', etag='"e1"', expires=time.time() + 60)
+
+    entry = ResponseCache(str(tmp_path), 1024 * 1024).get("http://x/a?b=1")
+
+    assert entry.body == '{"v": 1}'
+    assert entry.etag == '"e1"'
+    assert entry.is_fresh()
+    assert cache.get("http://x/other") is None
+
+
+def test_pinned_entry_never_expires(tmp_path):
+    cache = ResponseCache(str(tmp_path), 1024 * 1024)
+    cache.put("http://x/a", "{}", expires=0.0)
+    assert not cache.get("http://x/a").is_fresh()
+
+    assert cache.update("http://x/a", pin=True)
+
+    assert cache.get("http://x/a").expires is None
+    assert cache.get("http://x/a").is_fresh()
+    assert not cache.update("http://x/missing", pin=True)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    body = "x" * 200
+    cache = ResponseCache(str(tmp_path), 800)
+    for name in ("a", "b", "c"):
+        cache.put(f"http://x/{name}", body)
+        time.sleep(0.01)
+    cache.get("http://x/a")
+    time.sleep(0.01)
+
+    cache.put("http://x/d", body)
+
+    assert cache.get("http://x/b") is None
+    assert cache.get("http://x/a") is not None
+    assert cache.get("http://x/d") is not None
+    assert cache.stats()["bytes"] <= 800
+
+
+def test_unreadable_entry_is_dropped(tmp_path):
+    cache = ResponseCache(str(tmp_path), 1024 * 1024)
+    cache.put("http://x/a", "{}")
+    (path,) = tmp_path.iterdir()
+    path.write_text("not json")
+
+    assert cache.get("http://x/a") is None
+    assert not path.exists()
+
+
+def test_cache_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("RESPONSE_CACHE", raising=False)
+    assert get_response_cache() is None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        _Handler.requests.append((self.path, self.headers.get("If-None-Match")))
+        parsed = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        if parsed.path == "/max-age":
+            self._send(200, b'{"v": "max-age"}', {"Cache-Control": "max-age=300"})
+        elif parsed.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304, headers={"ETag": '"v1"'})
+            else:
+                self._send(200, b'{"v": "etag"}', {"ETag": '"v1"'})
+        elif parsed.path == "/no-store":
+            self._send(200, b'{"v": "no-store"}', {"Cache-Control": "no-store, max-age=300"})
+        elif parsed.path == "/convert":
+            # The provider answers for the day before the one requested when asked about "today"
+            day = query["date"] if query["date"] != "2025-08-14" else "2025-08-13"
+            self._send(200, json.dumps({"date": day, "info": {"rate": 9.49}}).encode())
+        else:
+            self._send(404, b"{}")
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setenv("RESPONSE_CACHE", "true")
+    monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path / "cache"))
+    _Handler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_json_serves_fresh_entries_without_a_request(server):
+    assert fetchermod._fetch_json(server + "/max-age?a=1&b=2") == {"v": "max-age"}
+    assert fetchermod._fetch_json(server + "/max-age?b=2&a=1") == {"v": "max-age"}
+
+    assert len(_Handler.requests) == 1
+
+
+def test_fetch_json_revalidates_with_etag(server):
+    assert fetchermod._fetch_json(server + "/etag") == {"v": "etag"}
+    assert fetchermod._fetch_json(server + "/etag") == {"v": "etag"}
+
+    assert _Handler.requests == [("/etag", None), ("/etag", '"v1"')]
+
+
+def test_fetch_json_does_not_store_no_store_responses(server):
+    fetchermod._fetch_json(server + "/no-store")
+    fetchermod._fetch_json(server + "/no-store")
+
+    assert len(_Handler.requests) == 2
+
+
+def test_historical_exchange_rates_are_cached_indefinitely(server, monkeypatch):
+    monkeypatch.setattr(fetchermod, "get_today_date", lambda: "2025-08-14")
+    url = server + "/convert?from=USD&to=MAD"
+
+    first = fetchermod.fetch_exchange_data(url, date="2025-08-13", api_key="k")
+    second = fetchermod.fetch_exchange_data(url, date="2025-08-13", api_key="k")
+
+    assert first == second == ("2025-08-13", fetchermod.Decimal("9.49"))
+    assert len(_Handler.requests) == 1
+
+
+def test_exchange_response_for_another_day_is_not_pinned(server, monkeypatch):
+    monkeypatch.setattr(fetchermod, "get_today_date", lambda: "2025-08-15")
+    url = server + "/convert?from=USD&to=MAD"
+
+    fetchermod.fetch_exchange_data(url, date="2025-08-14", api_key="k")
+    date_iso, _ = fetchermod.fetch_exchange_data(url, date="2025-08-14", api_key="k")
+
+    assert date_iso == "2025-08-13"
+    assert len(_Handler.requests) == 2
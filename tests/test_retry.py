@@ -0,0 +1,139 @@
+import io
+import sys
+import types
+import urllib.error
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+import src.retry as retry
+from src.retry import RetryPolicy, call_with_retry, is_retryable
+
+
+def _http_error(code):
+    return urllib.error.HTTPError("http://api", code, "err", {}, io.BytesIO(b""))
+
+
+def _client_error(code, status=400):
+    return ClientError(
+        {"Error": {"Code": code, "Message": "m"}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        "GetParameter",
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry, "_sleep", sleeps.append)
+    monkeypatch.setattr(retry, "_deadline", None)
+    return sleeps
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (_http_error(502), True),
+    (_http_error(429), True),
+    (_http_error(404), False),
+    (_http_error(401), False),
+    (_client_error("ThrottlingException"), True),
+    (_client_error("InternalFailure", status=500), True),
+    (_client_error("ParameterNotFound"), False),
+    (EndpointConnectionError(endpoint_url="https://ssm"), True),
+    (ConnectionResetError(), True),
+    (TimeoutError(), True),
+    (ValueError("bad json"), False),
+])
+def test_is_retryable_classification(exc, expected):
+    assert is_retryable(exc) is expected
+
+
+def test_asyncio_timeouts_are_retryable(monkeypatch):
+    # Before Python 3.11 asyncio.TimeoutError is its own class, not TimeoutError
+    class AsyncioTimeoutError(Exception):
+        pass
+
+    monkeypatch.setitem(sys.modules, "asyncio", types.SimpleNamespace(TimeoutError=AsyncioTimeoutError))
+
+    assert is_retryable(AsyncioTimeoutError()) is True
+
+
+def test_call_with_retry_recovers_from_transient_error(no_sleep):
+    fn = MagicMock(side_effect=[_http_error(502), _http_error(503), "ok"])
+
+    result = call_with_retry(fn, "a", policy=RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=1))
+
+    assert result == "ok"
+    assert fn.call_count == 3
+    assert len(no_sleep) == 2
+    assert all(0 <= d <= 0.2 for d in no_sleep)
+    assert retry.retry_count() >= 2
+
+
+def test_call_with_retry_does_not_retry_permanent_error():
+    fn = MagicMock(side_effect=_http_error(404))
+
+    with pytest.raises(urllib.error.HTTPError):
+        call_with_retry(fn, policy=RetryPolicy(max_attempts=5))
+
+    assert fn.call_count == 1
+
+
+def test_call_with_retry_gives_up_after_max_attempts():
+    fn = MagicMock(side_effect=_http_error(500))
+
+    with pytest.raises(urllib.error.HTTPError):
+        call_with_retry(fn, policy=RetryPolicy(max_attempts=3))
+
+    assert fn.call_count == 3
+
+
+def test_call_with_retry_respects_invocation_deadline(monkeypatch):
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 1300
+    monkeypatch.setenv("RETRY_DEADLINE_MARGIN_MS", "1000")
+    retry.set_deadline_from_context(context)
+    fn = MagicMock(side_effect=_http_error(503))
+    # Full jitter could otherwise draw a delay that fits the budget
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+
+    # 0.3s of budget cannot fit a backoff of up to 5s
+    with pytest.raises(urllib.error.HTTPError):
+        call_with_retry(fn, policy=RetryPolicy(max_attempts=5, base_delay=5, max_delay=5))
+
+    assert fn.call_count == 1
+
+
+def test_call_with_retry_raises_when_budget_already_spent(monkeypatch):
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 500
+    retry.set_deadline_from_context(context)
+    fn = MagicMock()
+
+    with pytest.raises(retry.DeadlineExceeded):
+        call_with_retry(fn)
+
+    fn.assert_not_called()
+
+
+def test_set_deadline_without_context_disables_budget():
+    retry.set_deadline_from_context(None)
+    assert retry.remaining_time() is None
+
+
+def test_call_with_retry_waits_for_retry_after(no_sleep):
+    throttled = urllib.error.HTTPError("http://api", 429, "Too Many Requests", {"Retry-After": "2"}, io.BytesIO(b""))
+    fn = MagicMock(side_effect=[throttled, "ok"])
+
+    assert call_with_retry(fn, policy=RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=1)) == "ok"
+    assert no_sleep == [2.0]
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "3"}, 3.0),
+    ({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+    ({"Retry-After": "soon"}, None),
+    ({}, None),
+])
+def test_retry_after_parses_seconds_and_dates(headers, expected):
+    exc = urllib.error.HTTPError("http://api", 429, "Too Many Requests", headers, io.BytesIO(b""))
+    assert retry.retry_after(exc) == expected
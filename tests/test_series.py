@@ -0,0 +1,105 @@
+from array import array
+from decimal import Decimal
+
+import pytest
+
+from src.fetcher import ExtractionError, parse_oil_series
+from src.series import MAX_PRICE_PLACES, PRICE_PLACES, OilSeries
+
+
+def test_parse_oil_series_builds_compact_arrays():
+    resp = {
+        "bars": [
+            ["Mon Aug 11 00:00:00 2025", 653],
+            ["Tue Aug 12 00:00:00 2025", 648.25],
+            ["Wed Aug 13 00:00:00 2025", "639.2567"],
+        ]
+    }
+
+    series = parse_oil_series(resp)
+
+    assert isinstance(series.ordinals, array) and series.ordinals.typecode == "i"
+    assert isinstance(series.prices, array) and series.prices.typecode == "q"
+    assert series.places == PRICE_PLACES
+    assert list(series.prices) == [6530000, 6482500, 6392567]
+    assert series.dates() == ["2025-08-11", "2025-08-12", "2025-08-13"]
+    assert series.last() == ("2025-08-13", Decimal("639.2567"))
+
+
+def test_parse_oil_series_deduplicates_and_sorts():
+    resp = {
+        "bars": [
+            ["Tue Aug 12 00:00:00 2025", 648.25],
+            ["Mon Aug 11 00:00:00 2025", 653],
+            ["Tue Aug 12 00:00:00 2025", 650],
+        ]
+    }
+
+    series = parse_oil_series(resp)
+
+    assert list(series.items()) == [("2025-08-11", Decimal("653")), ("2025-08-12", Decimal("650"))]
+
+
+def test_parse_oil_series_keeps_last_of_consecutive_duplicates():
+    series = OilSeries.from_pairs([("2025-08-11", 1), ("2025-08-11", 2), ("2025-08-12", 3)])
+
+    assert list(series.items()) == [("2025-08-11", Decimal("2")), ("2025-08-12", Decimal("3"))]
+
+
+@pytest.mark.parametrize("bars, match", [
+    ([["bad"]], "bar 0"),
+    ([["not a date", 1]], "unable to parse date"),
+    ([["Mon Aug 11 00:00:00 2025", "abc"]], "price"),
+    ([["Mon Aug 11 00:00:00 2025", float("nan")]], "price"),
+])
+def test_parse_oil_series_malformed_bars_raise(bars, match):
+    with pytest.raises(ExtractionError, match=match):
+        parse_oil_series({"bars": bars})
+
+
+def test_series_slice_and_membership():
+    series = OilSeries.from_pairs([
+        ("2025-08-08", 660), ("2025-08-11", 653), ("2025-08-12", 648.25), ("2025-08-13", 639.25),
+    ])
+
+    window = series.slice("2025-08-09", "2025-08-12")
+
+    assert window.dates() == ["2025-08-11", "2025-08-12"]
+    assert "2025-08-12" in series
+    assert "2025-08-10" not in series
+    assert len(series.slice(end_iso="2025-08-08")) == 1
+    assert len(series.slice("2025-09-01")) == 0
+
+
+def test_series_to_numpy():
+    np = pytest.importorskip("numpy")
+    series = OilSeries.from_pairs([("2025-08-11", 653), ("2025-08-12", 648.25)])
+
+    dates, prices = series.to_numpy()
+
+    assert str(dates[0]) == "2025-08-11"
+    assert prices.tolist() == [653.0, 648.25]
+    assert np.issubdtype(dates.dtype, np.datetime64)
+
+
+def test_parse_oil_series_keeps_every_price_exactly():
+    resp = {
+        "bars": [
+            ["Fri Aug 08 00:00:00 2025", 660.5],
+            ["Mon Aug 11 00:00:00 2025", "61.234567"],
+            ["Tue Aug 12 00:00:00 2025", 61.2345678],
+            ["Wed Aug 13 00:00:00 2025", "1.12345678901234"],
+        ]
+    }
+
+    series = parse_oil_series(resp)
+
+    # The scale grows to the finest price, capped at MAX_PRICE_PLACES like the daily parser
+    assert series.places == MAX_PRICE_PLACES
+    assert list(series.items()) == [
+        ("2025-08-08", Decimal("660.5")),
+        ("2025-08-11", Decimal("61.234567")),
+        ("2025-08-12", Decimal("61.2345678")),
+        ("2025-08-13", Decimal("1.123456789012")),
+    ]
+    assert series.slice("2025-08-11", "2025-08-11").last() == ("2025-08-11", Decimal("61.234567"))
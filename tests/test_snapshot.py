@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+import pytest
+
+import src.aws_clients as aws_clients
+import src.snapshot as snapshot
+import src.storage as storage
+from src.storage import build_item
+
+
+@pytest.fixture
+def bucket(oil_table, monkeypatch):
+    monkeypatch.setattr(storage, "_published_hashes", {})
+    aws_clients.get_client("s3").create_bucket(
+        Bucket="snapshots", CreateBucketConfiguration={"LocationConstraint": "eu-west-1"}
+    )
+    for day, price in (("2025-08-11", "653"), ("2025-08-12", "648.25"), ("2025-08-13", "639.25")):
+        oil_table.put_item(Item=build_item(day, Decimal(price), Decimal("9.5")))
+    return "snapshots"
+
+
+def test_build_snapshot_days_and_stats():
+    items = [
+        {"date": "2025-08-11", "oil_price": Decimal("653"), "exchange_rate": Decimal("9.5")},
+        {"date": "2025-08-12", "oil_price": Decimal("648.25"), "exchange_rate": Decimal("9.4")},
+    ]
+
+    result = snapshot.build_snapshot(items)
+
+    assert result["as_of"] == "2025-08-12"
+    assert result["days"][1] == {"date": "2025-08-12", "oil_price": Decimal("648.25"), "exchange_rate": Decimal("9.4")}
+    assert result["stats"]["oil_price"] == {
+        "min": Decimal("648.25"),
+        "max": Decimal("653"),
+        "mean": Decimal("650.6250"),
+        "change": Decimal("-4.75"),
+    }
+
+
+def test_build_snapshot_empty():
+    assert snapshot.build_snapshot([]) == {"pk": "OIL_PRICE", "as_of": None, "days": [], "stats": {}}
+
+
+def test_snapshot_key_per_source(monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_KEY", "public/latest.json")
+    assert snapshot.snapshot_key() == "public/latest.json"
+    assert snapshot.snapshot_key("brent") == "public/latest-brent.json"
+
+
+def test_publish_snapshot_uploads_only_changed_content(bucket, oil_table, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_MAX_AGE", "120")
+    s3 = aws_clients.get_client("s3")
+
+    assert snapshot.publish_snapshot("OilPrices", bucket, "latest.json", days=2) == "uploaded"
+
+    obj = s3.get_object(Bucket=bucket, Key="latest.json")
+    assert obj["CacheControl"] == "public, max-age=120"
+    assert obj["ContentType"] == "application/json"
+    body = obj["Body"].read()
+    assert body.startswith(b'{"as_of":"2025-08-13","days":[{"date":"2025-08-12"')
+    first_etag = obj["ETag"]
+
+    # Same content: answered from this container's hash, then from the object metadata
+    assert snapshot.publish_snapshot("OilPrices", bucket, "latest.json", days=2) == "unchanged"
+    storage._published_hashes.clear()
+    assert snapshot.publish_snapshot("OilPrices", bucket, "latest.json", days=2) == "unchanged"
+
+    oil_table.put_item(Item=build_item("2025-08-14", Decimal("641"), Decimal("9.5")))
+    assert snapshot.publish_snapshot("OilPrices", bucket, "latest.json", days=2) == "uploaded"
+    assert s3.head_object(Bucket=bucket, Key="latest.json")["ETag"] != first_etag
+
+
+def test_build_snapshot_columnar_layout():
+    items = [
+        {"date": "2025-08-11", "oil_price": Decimal("653"), "exchange_rate": Decimal("9.5"),
+         "exchange_rates": {"MAD": Decimal("9.5"), "EUR": Decimal("0.91")}},
+        {"date": "2025-08-12", "oil_price": Decimal("648.25"), "exchange_rate": Decimal("9.4")},
+    ]
+
+    result = snapshot.build_snapshot(items, layout="columnar")
+
+    assert result["layout"] == "columnar"
+    assert result["days"] == {
+        "date": ["2025-08-11", "2025-08-12"],
+        "oil_price": [Decimal("653"), Decimal("648.25")],
+        "exchange_rate": [Decimal("9.5"), Decimal("9.4")],
+        "exchange_rates": {"EUR": [Decimal("0.91"), None], "MAD": [Decimal("9.5"), None]},
+    }
+    assert result["stats"] == snapshot.build_snapshot(items)["stats"]
+
+
+def test_build_snapshot_rejects_unknown_layout():
+    with pytest.raises(ValueError):
+        snapshot.build_snapshot([], layout="csv")
+
+
+def test_publish_snapshot_gzip_columnar_is_smaller(bucket, oil_table, monkeypatch):
+    import gzip
+    import json
+    from datetime import date, timedelta
+
+    start = date(2025, 5, 1)
+    with oil_table.batch_writer() as batch:
+        for i in range(90):
+            day = (start + timedelta(days=i)).isoformat()
+            batch.put_item(Item=build_item(day, Decimal("600.25") + i, Decimal("9.4871")))
+    s3 = aws_clients.get_client("s3")
+
+    snapshot.publish_snapshot("OilPrices", bucket, "rows.json", days=90)
+    monkeypatch.setenv("SNAPSHOT_LAYOUT", "columnar")
+    monkeypatch.setenv("SNAPSHOT_GZIP", "true")
+    assert snapshot.publish_snapshot("OilPrices", bucket, "columnar.json", days=90) == "uploaded"
+
+    rows = s3.get_object(Bucket=bucket, Key="rows.json")["Body"].read()
+    obj = s3.get_object(Bucket=bucket, Key="columnar.json")
+    assert obj["ContentEncoding"] == "gzip"
+    compressed = obj["Body"].read()
+    columnar = json.loads(gzip.decompress(compressed))
+    assert columnar["days"]["date"][-1] == "2025-08-13"
+    assert len(columnar["days"]["oil_price"]) == 90
+    assert len(compressed) * 4 < len(rows)
+
+    # Same content and encoding: nothing to upload; switching encoding re-uploads
+    storage._published_hashes.clear()
+    assert snapshot.publish_snapshot("OilPrices", bucket, "columnar.json", days=90) == "unchanged"
+    monkeypatch.setenv("SNAPSHOT_GZIP", "false")
+    assert snapshot.publish_snapshot("OilPrices", bucket, "columnar.json", days=90) == "uploaded"
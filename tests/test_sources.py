@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+import pytest
+
+import src.sources as sources
+from src.sources import Source, default_pk, load_sources
+
+
+def test_load_sources_applies_defaults():
+    loaded = load_sources([
+        {"name": "brent", "url": "http://brent", "pk": "OIL_PRICE"},
+        {"name": "wti-crude", "url": "http://wti"},
+    ])
+
+    assert [s.name for s in loaded] == ["brent", "wti-crude"]
+    assert loaded[0].pk == "OIL_PRICE"
+    assert loaded[1].pk == "WTI_CRUDE_PRICE"
+    assert loaded[1].parser == "bars"
+
+
+@pytest.mark.parametrize("raw, message", [
+    ([], "non-empty"),
+    ({"name": "brent"}, "non-empty"),
+    (["brent"], "must be an object"),
+    ([{"url": "http://brent"}], "'name'"),
+    ([{"name": "brent"}], "'url'"),
+    ([{"name": "brent", "url": "http://b", "parser": "csv"}], "unknown source parser"),
+    ([{"name": "brent", "url": "http://a"}, {"name": "brent", "url": "http://b"}], "duplicate source name"),
+    ([{"name": "a", "url": "http://a", "pk": "X"}, {"name": "b", "url": "http://b", "pk": "X"}], "duplicate source pk"),
+])
+def test_load_sources_rejects_malformed_config(raw, message):
+    with pytest.raises(ValueError, match=message):
+        load_sources(raw)
+
+
+def test_registered_parser_is_used_by_fetch(monkeypatch):
+    monkeypatch.setattr(sources, "_parsers", dict(sources._parsers))
+    sources.register_parser("fixed", lambda url: ("2025-08-13", Decimal(url.rsplit("/", 1)[1])))
+
+    source = load_sources([{"name": "gold", "url": "http://gold/2400.5", "parser": "fixed"}])[0]
+
+    assert source.fetch() == ("2025-08-13", Decimal("2400.5"))
+    assert source.pk == default_pk("gold") == "GOLD_PRICE"
+
+
+def test_source_repr_omits_url():
+    assert "http" not in repr(Source("brent", "http://secret-token@brent"))
@@ -0,0 +1,104 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+import src.ssm_resolver as resolver
+from src.ttl_cache import TTLCache, cache_stats
+
+
+@pytest.fixture
+def fake_ssm(monkeypatch, tmp_path):
+    config = tmp_path / "store_ssm.json"
+    config.write_text(json.dumps({"store_param": "/test/store"}))
+    client = MagicMock()
+    client.get_parameter.return_value = {
+        "Parameter": {"Value": json.dumps({"oil_api": "http://oil", "exchange_api": "http://fx"})}
+    }
+    monkeypatch.setattr(resolver, "get_client", lambda name: client)
+    resolver.invalidate_store_urls()
+    yield client, str(config)
+    resolver.invalidate_store_urls()
+
+
+def test_get_store_urls_cached_across_calls(fake_ssm):
+    client, config = fake_ssm
+
+    first = resolver.get_store_urls(config)
+    second = resolver.get_store_urls(config)
+
+    assert first == second == {"oil_api": "http://oil", "exchange_api": "http://fx"}
+    client.get_parameter.assert_called_once_with(Name="/test/store", WithDecryption=True)
+
+
+def test_get_store_urls_returns_copy_of_cached_store(fake_ssm):
+    _, config = fake_ssm
+
+    resolver.get_store_urls(config)["oil_api"] = "mutated"
+    assert resolver.get_store_urls(config)["oil_api"] == "http://oil"
+
+
+def test_invalidate_store_urls_forces_ssm_read(fake_ssm):
+    client, config = fake_ssm
+
+    resolver.get_store_urls(config)
+    resolver.invalidate_store_urls()
+    resolver.get_store_urls(config)
+
+    assert client.get_parameter.call_count == 2
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("src.ttl_cache.time.monotonic", lambda: clock["now"])
+    monkeypatch.setenv("TEST_CACHE_TTL", "10")
+    cache = TTLCache("test_expiry", "TEST_CACHE_TTL")
+
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    clock["now"] += 11
+    assert cache.get("k") is None
+    assert cache_stats()["test_expiry"] == {"hits": 1, "misses": 1, "size": 0}
+
+
+def test_get_store_urls_passes_sources_through(fake_ssm):
+    client, config = fake_ssm
+    sources = [{"name": "brent", "url": "http://brent"}]
+    client.get_parameter.return_value = {
+        "Parameter": {"Value": json.dumps({"exchange_api": "http://fx", "sources": sources})}
+    }
+
+    assert resolver.get_store_urls(config) == {"exchange_api": "http://fx", "sources": sources}
+
+
+@pytest.mark.parametrize("store", [
+    {"exchange_api": "http://fx"},
+    {"oil_api": "http://oil"},
+    {"sources": [{"name": "brent", "url": "http://brent"}]},
+])
+def test_get_store_urls_requires_exchange_api_and_oil_api_or_sources(fake_ssm, store):
+    client, config = fake_ssm
+    client.get_parameter.return_value = {"Parameter": {"Value": json.dumps(store)}}
+
+    with pytest.raises(ValueError, match="'exchange_api' and either 'oil_api' or 'sources'"):
+        resolver.get_store_urls(config)
+
+
+def test_get_store_urls_rejects_empty_sources(fake_ssm):
+    client, config = fake_ssm
+    client.get_parameter.return_value = {
+        "Parameter": {"Value": json.dumps({"exchange_api": "http://fx", "sources": []})}
+    }
+
+    with pytest.raises(ValueError):
+        resolver.get_store_urls(config)
+
+
+def test_get_store_urls_passes_rate_limits_through(fake_ssm):
+    client, config = fake_ssm
+    limits = {"api.fx.example": 5}
+    client.get_parameter.return_value = {
+        "Parameter": {"Value": json.dumps({"oil_api": "http://oil", "exchange_api": "http://fx", "rate_limits": limits})}
+    }
+
+    assert resolver.get_store_urls(config)["rate_limits"] == limits
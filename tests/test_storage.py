@@ -0,0 +1,258 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+import src.storage as storage
+
+
+@pytest.fixture
+def fake_dynamodb(monkeypatch):
+    resource = MagicMock()
+    resource.batch_write_item.return_value = {"UnprocessedItems": {}}
+    monkeypatch.setattr(storage, "get_resource", lambda name: resource)
+    monkeypatch.setattr(storage, "_tables", {})
+    monkeypatch.setattr(storage, "_known_items", {})
+    monkeypatch.setattr("src.retry._sleep", lambda delay: None)
+    return resource
+
+
+def _records(n):
+    start = date(2025, 1, 1)
+    return [((start + timedelta(days=i)).isoformat(), Decimal("600") + i, Decimal("9.5")) for i in range(n)]
+
+
+def test_write_batch_groups_records_into_25_item_requests(fake_dynamodb):
+    stats = storage.write_batch("OilPrices", _records(40))
+
+    assert stats == {"written": 40, "failed": 0, "requests": 2}
+    sizes = [len(call[1]["RequestItems"]["OilPrices"]) for call in fake_dynamodb.batch_write_item.call_args_list]
+    assert sizes == [25, 15]
+    first_item = fake_dynamodb.batch_write_item.call_args_list[0][1]["RequestItems"]["OilPrices"][0]["PutRequest"]["Item"]
+    assert first_item["pk"] == "OIL_PRICE"
+    assert first_item["date"] == "2025-01-01"
+    assert first_item["oil_price"] == Decimal("600")
+
+
+def test_write_batch_retries_unprocessed_items(fake_dynamodb):
+    def batch_write_item(RequestItems):
+        pending = RequestItems["OilPrices"]
+        if fake_dynamodb.batch_write_item.call_count == 1:
+            return {"UnprocessedItems": {"OilPrices": pending[:3]}}
+        return {"UnprocessedItems": {}}
+
+    fake_dynamodb.batch_write_item.side_effect = batch_write_item
+
+    stats = storage.write_batch("OilPrices", _records(10))
+
+    assert stats == {"written": 10, "failed": 0, "requests": 2}
+    assert len(fake_dynamodb.batch_write_item.call_args_list[1][1]["RequestItems"]["OilPrices"]) == 3
+
+
+def test_write_batch_reports_items_still_unprocessed(fake_dynamodb):
+    fake_dynamodb.batch_write_item.side_effect = lambda RequestItems: {
+        "UnprocessedItems": {"OilPrices": RequestItems["OilPrices"][:2]}
+    }
+
+    stats = storage.write_batch("OilPrices", _records(5), max_attempts=3)
+
+    assert stats == {"written": 3, "failed": 2, "requests": 3}
+
+
+def test_write_batch_deduplicates_dates(fake_dynamodb):
+    records = [
+        ("2025-01-01", Decimal("600"), Decimal("9.5")),
+        ("2025-01-01", Decimal("601"), Decimal("9.6")),
+    ]
+
+    stats = storage.write_batch("OilPrices", records)
+
+    assert stats["written"] == 1
+    sent = fake_dynamodb.batch_write_item.call_args[1]["RequestItems"]["OilPrices"]
+    assert sent[0]["PutRequest"]["Item"]["oil_price"] == Decimal("601")
+
+
+def test_save_to_dynamodb_reuses_table_handle(fake_dynamodb):
+    storage.save_to_dynamodb("OilPrices", "2025-01-01", Decimal("600"), Decimal("9.5"))
+    storage.save_to_dynamodb("OilPrices", "2025-01-02", Decimal("601"), Decimal("9.5"))
+
+    fake_dynamodb.Table.assert_called_once_with("OilPrices")
+    assert fake_dynamodb.Table.return_value.put_item.call_count == 2
+
+
+def _conditional_check_failed():
+    return ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException", "Message": "m"}}, "PutItem"
+    )
+
+
+def test_save_to_dynamodb_reports_new_and_changed(fake_dynamodb):
+    table = fake_dynamodb.Table.return_value
+    table.put_item.side_effect = [{}, {"Attributes": {"oil_price": Decimal("600")}}]
+
+    assert storage.save_to_dynamodb("OilPrices", "2025-01-01", Decimal("600"), Decimal("9.5")) == "new"
+    assert storage.save_to_dynamodb("OilPrices", "2025-01-01", Decimal("601"), Decimal("9.5")) == "changed"
+    assert "ConditionExpression" not in table.put_item.call_args[1]
+
+
+def test_idempotent_save_uses_condition_and_reports_noop(fake_dynamodb):
+    table = fake_dynamodb.Table.return_value
+    table.put_item.side_effect = _conditional_check_failed()
+
+    status = storage.save_to_dynamodb(
+        "OilPrices", "2025-01-01", Decimal("600"), Decimal("9.5"), idempotent=True
+    )
+
+    assert status == "noop"
+    kwargs = table.put_item.call_args[1]
+    assert "attribute_not_exists(#d)" in kwargs["ConditionExpression"]
+    assert set(kwargs["ExpressionAttributeValues"].values()) == {Decimal("600"), Decimal("9.5")}
+
+
+def test_idempotent_save_skips_request_for_known_values(fake_dynamodb):
+    table = fake_dynamodb.Table.return_value
+    table.put_item.return_value = {}
+
+    assert storage.save_to_dynamodb("OilPrices", "2025-01-01", Decimal("600"), Decimal("9.5"), idempotent=True) == "new"
+    assert storage.save_to_dynamodb("OilPrices", "2025-01-01", Decimal("600"), Decimal("9.5"), idempotent=True) == "noop"
+    assert table.put_item.call_count == 1
+
+
+def test_idempotent_save_rejects_other_client_errors(fake_dynamodb):
+    table = fake_dynamodb.Table.return_value
+    table.put_item.side_effect = ClientError(
+        {"Error": {"Code": "ValidationException", "Message": "m"}}, "PutItem"
+    )
+
+    with pytest.raises(ClientError):
+        storage.save_to_dynamodb("OilPrices", "2025-01-01", Decimal("600"), Decimal("9.5"), idempotent=True)
+
+
+def test_get_stored_day_reads_once_then_uses_known_items(fake_dynamodb):
+    table = fake_dynamodb.Table.return_value
+    table.get_item.return_value = {
+        "Item": {"date": "2025-01-01", "oil_price": Decimal("600"), "exchange_rate": Decimal("9.5")}
+    }
+
+    first = storage.get_stored_day("OilPrices", "2025-01-01")
+    second = storage.get_stored_day("OilPrices", "2025-01-01")
+
+    assert first == second == {"oil_price": Decimal("600"), "exchange_rate": Decimal("9.5")}
+    table.get_item.assert_called_once()
+    assert table.get_item.call_args[1]["Key"] == {"pk": "OIL_PRICE", "date": "2025-01-01"}
+
+
+def test_get_stored_day_missing_returns_none(fake_dynamodb):
+    fake_dynamodb.Table.return_value.get_item.return_value = {}
+
+    assert storage.get_stored_day("OilPrices", "2025-01-01") is None
+
+
+def test_save_to_dynamodb_stores_exchange_rates_map(fake_dynamodb):
+    table = fake_dynamodb.Table.return_value
+    table.put_item.return_value = {}
+
+    storage.save_to_dynamodb(
+        "OilPrices", "2025-01-01", Decimal("600"), Decimal("9.5"),
+        exchange_rates={"MAD": Decimal("9.5"), "EUR": 0.91},
+    )
+
+    item = table.put_item.call_args[1]["Item"]
+    assert item["exchange_rate"] == Decimal("9.5")
+    assert item["exchange_rates"] == {"MAD": Decimal("9.5"), "EUR": Decimal("0.91")}
+    assert storage.get_stored_day("OilPrices", "2025-01-01")["exchange_rates"]["EUR"] == Decimal("0.91")
+    table.get_item.assert_not_called()
+
+
+def test_write_batch_accepts_exchange_rates(fake_dynamodb):
+    storage.write_batch("OilPrices", [
+        ("2025-01-01", Decimal("600"), Decimal("9.5"), {"MAD": Decimal("9.5"), "EUR": Decimal("0.91")}),
+        ("2025-01-02", Decimal("601"), Decimal("9.6")),
+    ])
+
+    requests = fake_dynamodb.batch_write_item.call_args[1]["RequestItems"]["OilPrices"]
+    items = [r["PutRequest"]["Item"] for r in requests]
+    assert items[0]["exchange_rates"] == {"MAD": Decimal("9.5"), "EUR": Decimal("0.91")}
+    assert "exchange_rates" not in items[1]
+
+
+def test_write_items_batches_several_partition_keys(fake_dynamodb):
+    items = [
+        storage.build_item("2025-01-01", Decimal("80"), Decimal("9.5"), pk="BRENT_PRICE"),
+        storage.build_item("2025-01-01", Decimal("76"), Decimal("9.5"), pk="WTI_PRICE"),
+        storage.build_item("2025-01-01", Decimal("77"), Decimal("9.5"), pk="WTI_PRICE"),
+    ]
+
+    stats = storage.write_items("OilPrices", items)
+
+    assert stats == {"written": 2, "failed": 0, "requests": 1}
+    sent = fake_dynamodb.batch_write_item.call_args[1]["RequestItems"]["OilPrices"]
+    assert [(r["PutRequest"]["Item"]["pk"], r["PutRequest"]["Item"]["oil_price"]) for r in sent] == [
+        ("BRENT_PRICE", Decimal("80")),
+        ("WTI_PRICE", Decimal("77")),
+    ]
+    assert storage.get_stored_day("OilPrices", "2025-01-01", pk="WTI_PRICE")["oil_price"] == Decimal("77")
+    fake_dynamodb.Table.return_value.get_item.assert_not_called()
+
+
+@pytest.fixture
+def aggregating_table(oil_table, monkeypatch):
+    monkeypatch.setenv("ROLLING_AGGREGATES", "true")
+    monkeypatch.setenv("AGGREGATE_WINDOWS", "3,5")
+    monkeypatch.setattr(storage, "_tables", {})
+    monkeypatch.setattr(storage, "_known_items", {})
+    monkeypatch.setattr(storage, "_aggregates", {})
+    return oil_table
+
+
+def test_save_to_dynamodb_maintains_rolling_aggregates(aggregating_table):
+    for i, price in enumerate(("653", "648.25", "639.25", "641")):
+        storage.save_to_dynamodb("OilPrices", f"2025-08-1{i}", Decimal(price), Decimal("9.5"))
+
+    aggregates = storage.get_aggregates("OilPrices")
+    assert aggregates["as_of"] == "2025-08-13"
+    assert aggregates["oil_price"]["3"] == {
+        "count": Decimal(3), "mean": Decimal("642.8333"), "min": Decimal("639.25"), "max": Decimal("648.25"),
+    }
+    assert aggregates["oil_price"]["change"] == Decimal("1.75")
+    item = aggregating_table.get_item(Key={"pk": "AGG#OIL_PRICE", "date": "latest"})["Item"]
+    assert item["version"] == 4
+
+
+def test_aggregates_recover_from_concurrent_writer(aggregating_table):
+    storage.save_to_dynamodb("OilPrices", "2025-08-10", Decimal("600"), Decimal("9.5"))
+    stale = dict(storage._aggregates)
+
+    # Another container adds a day; this container's cached state is now behind
+    storage._aggregates.clear()
+    storage.save_to_dynamodb("OilPrices", "2025-08-11", Decimal("610"), Decimal("9.5"))
+    storage._aggregates.clear()
+    storage._aggregates.update(stale)
+
+    storage.save_to_dynamodb("OilPrices", "2025-08-12", Decimal("620"), Decimal("9.5"))
+
+    aggregates = storage.get_aggregates("OilPrices")
+    assert aggregates["oil_price"]["3"]["count"] == 3
+    assert aggregates["oil_price"]["3"]["mean"] == Decimal("610.0000")
+
+
+def test_write_batch_updates_aggregates_once_per_partition(aggregating_table):
+    stats = storage.write_batch("OilPrices", _records(8))
+    storage.write_batch("OilPrices", _records(2), pk="BRENT_PRICE")
+
+    assert stats["written"] == 8
+    oil = storage.get_aggregates("OilPrices")
+    assert oil["as_of"] == "2025-01-08"
+    assert oil["oil_price"]["5"]["mean"] == Decimal("605.0000")
+    assert storage.get_aggregates("OilPrices", pk="BRENT_PRICE")["oil_price"]["3"]["count"] == 2
+    assert storage.get_aggregates("OilPrices", pk="WTI_PRICE") is None
+
+
+def test_aggregates_disabled_by_default(oil_table, monkeypatch):
+    monkeypatch.delenv("ROLLING_AGGREGATES", raising=False)
+    monkeypatch.setattr(storage, "_tables", {})
+    storage.save_to_dynamodb("OilPrices", "2025-08-10", Decimal("600"), Decimal("9.5"))
+
+    assert storage.get_aggregates("OilPrices") is None
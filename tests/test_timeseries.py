@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+import src.timeseries as timeseries
+from src.storage import build_item
+
+
+@pytest.fixture
+def table(oil_table):
+    start = date(2025, 1, 1)
+    with oil_table.batch_writer() as batch:
+        for i in range(60):
+            day = (start + timedelta(days=i)).isoformat()
+            batch.put_item(Item=build_item(day, Decimal("600") + i, Decimal("9.5")))
+        batch.put_item(Item=build_item("2025-01-15", Decimal("80"), Decimal("9.5"), pk="BRENT_PRICE"))
+    return oil_table
+
+
+def test_iter_range_is_inclusive_and_ordered(table):
+    items = list(timeseries.iter_range("OilPrices", "2025-01-10", "2025-01-20"))
+
+    assert [i["date"] for i in items] == [f"2025-01-{d:02d}" for d in range(10, 21)]
+    assert items[0]["oil_price"] == Decimal("609")
+    assert items[0]["pk"] == "OIL_PRICE"
+
+
+def test_iter_range_open_bounds(table):
+    assert len(list(timeseries.iter_range("OilPrices", start_date="2025-02-25"))) == 5
+    assert len(list(timeseries.iter_range("OilPrices", end_date="2025-01-05"))) == 5
+    assert len(list(timeseries.iter_range("OilPrices"))) == 60
+
+
+def test_iter_range_projects_requested_attributes(table):
+    item = next(timeseries.iter_range("OilPrices", "2025-01-10", attributes=["oil_price"]))
+
+    assert item == {"date": "2025-01-10", "oil_price": Decimal("609")}
+
+
+def test_iter_range_follows_pages_lazily(table, monkeypatch):
+    calls = []
+    original = table.meta.client.query
+
+    def counting_query(**kwargs):
+        calls.append(kwargs.get("ExclusiveStartKey"))
+        return original(**kwargs)
+
+    monkeypatch.setattr(table.meta.client, "query", counting_query)
+
+    items = timeseries.iter_range("OilPrices", "2025-01-01", "2025-01-31", page_size=7)
+    first = next(items)
+    assert first["date"] == "2025-01-01"
+    assert len(calls) == 1
+
+    rest = list(items)
+    assert len(rest) == 30
+    assert len(calls) == 5
+    assert calls[1] == {"pk": "OIL_PRICE", "date": "2025-01-07"}
+
+
+def test_iter_range_limit_and_newest_first(table):
+    items = timeseries.query_range("OilPrices", newest_first=True, limit=3)
+
+    assert [i["date"] for i in items] == ["2025-03-01", "2025-02-28", "2025-02-27"]
+
+
+def test_latest_returns_oldest_first(table):
+    items = timeseries.latest("OilPrices", 2, attributes=["oil_price"])
+
+    assert items == [
+        {"date": "2025-02-28", "oil_price": Decimal("658")},
+        {"date": "2025-03-01", "oil_price": Decimal("659")},
+    ]
+
+
+def test_iter_range_reads_other_partitions(table):
+    items = timeseries.query_range("OilPrices", pk="BRENT_PRICE")
+
+    assert [(i["date"], i["oil_price"]) for i in items] == [("2025-01-15", Decimal("80"))]